@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Render many deals in one run, spreading the work over a pool of processes.
+
+The manifest lists one item per deal source (a BBO url, a pbn or lin file, or a json file saved by an earlier run).
+It is either
+    a json file holding a list of items, e.g.
+        [ { "input": "https://www.bridgebase.com/tools/handviewer.html?lin=...", "options": "-nsewa -p4", "output": "board1" },
+          { "input": "session.pbn", "options": ["-s", "-a"] } ]
+    or a text file with one item per line, written exactly as the arguments to main.py, e.g.
+        session.pbn -nsewa -o session
+        "https://www.bridgebase.com/tools/handviewer.html?lin=..." -s -p4 -o board1
+Blank lines and lines beginning with # are ignored.
+
+Items are parsed, built and written in worker processes.  Results are reported in manifest order,
+and an item that fails is reported without stopping the rest of the run.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import io
+import json
+import main
+import os
+import profiling
+import shlex
+import sys
+import traceback
+
+from typing import Iterable, Iterator, List
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter batch tool')
+    parser.add_argument('manifest', help='json or text file listing the deals to render')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('-q', '--queue', type=int, default=0, help='maximum number of items in flight (default: twice the number of jobs)')
+    parser.add_argument('-d', '--directory', default='', help='directory for output files without a directory of their own')
+    parser.add_argument('--report', default='', help='write a json report of every item to this file')
+    parser.add_argument('--profile', action='store_true', help='time the stages of every item (main.py --profile) and report them together')
+    parser.add_argument('--profile-output', default='batch-profile.json', help='file for the combined metrics of --profile')
+    return parser.parse_args(argv)
+
+def has_output(options: List[str]) -> bool:
+    # True if options set main.py's output, in any of the forms argparse takes (-o name, -oname, -so name,
+    #   --output=name, --out name, ...), found by parsing them as main.py does after an output of their own,
+    #   which they replace if they set it
+    # options main.py does not take are left for render_item to report
+    # (no argument on a command line can hold a NUL, so the options cannot give that output themselves)
+    unset = '\0'
+    with contextlib.redirect_stderr(io.StringIO()):
+        try:
+            args = main.parse_args(['-', '-o', unset] + list(options))
+        except SystemExit:
+            return False
+    return args.output != unset
+
+def item_argv(item: dict, index: int) -> List[str]:
+    # convert a manifest item into the argument list for main.py
+    # input:  { "input": "session.pbn", "options": "-nsewa", "output": "session" }
+    # output: ['session.pbn', '-nsewa', '-o', 'session']
+    options = item.get('options', [])
+    if isinstance(options, str):
+        options = shlex.split(options)
+    argv = [item['input']] + list(options)
+    if 'output' in item:
+        argv += ['-o', item['output']]
+    elif not has_output(options):
+        # give every item its own output files
+        argv += ['-o', f'output-{index}']
+    return argv
+
+def read_manifest(path: str) -> Iterator[dict]:
+    # yield the items listed in a manifest file
+    if path.lower().endswith('.json'):
+        with open(path, 'r') as mf:
+            yield from json.load(mf)
+        return
+    with open(path, 'r') as mf:
+        for line in mf:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                argv = shlex.split(line)
+                yield { 'input': argv[0], 'options': argv[1:] }
+
+def render_item(argv: List[str], directory: str = '', profile: bool = False) -> dict:
+    # run main.py on a single item, returning the files written or the error raised
+    # if profile is set or the item has --profile, the result also holds the metrics of the run
+    result = { 'argv': argv }
+    try:
+        with contextlib.redirect_stderr(io.StringIO()):
+            args = main.parse_args(argv)
+        assert args.input not in ('*', ''), 'Console input is not available in batch mode'
+        if directory and not os.path.dirname(args.output):
+            args.output = os.path.join(directory, args.output)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if profile or args.profile:
+                args.profile = True
+                files, result['metrics'] = main.run_profiled(args)
+            else:
+                files = main.main(args)
+            result['files'] = files or []
+    except SystemExit:
+        # argparse reports bad options by exiting
+        result['error'] = 'Invalid options: ' + ' '.join(argv[1:])
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        result['traceback'] = traceback.format_exc()
+    return result
+
+def run(items: Iterable[dict], jobs: int = None, queue: int = 0, directory: str = '', profile: bool = False) -> Iterator[dict]:
+    # render each item in a worker process, yielding results in the order of the items
+    # no more than 'queue' items are submitted to the pool at any time
+    jobs = jobs or os.cpu_count() or 1
+    queue = queue or 2 * jobs
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = collections.deque()
+        for index, item in enumerate(items, 1):
+            try:
+                argv = item_argv(item, index)
+            except (KeyError, TypeError):
+                argv = None
+            if argv is None:
+                future = concurrent.futures.Future()
+                future.set_result({ 'argv': [], 'error': f'Invalid manifest item: {item!r}' })
+            else:
+                future = pool.submit(render_item, argv, directory, profile)
+            pending.append((index, future))
+            if len(pending) >= queue:
+                yield finish(*pending.popleft())
+        while pending:
+            yield finish(*pending.popleft())
+
+def finish(index: int, future: concurrent.futures.Future) -> dict:
+    try:
+        result = future.result()
+    except Exception as e:
+        # the worker process itself failed
+        result = { 'argv': [], 'error': f'{type(e).__name__}: {e}' }
+    result['item'] = index
+    return result
+
+def batch(args) -> int:
+    if args.directory:
+        os.makedirs(args.directory, exist_ok=True)
+    results = []
+    for result in run(read_manifest(args.manifest), args.jobs, args.queue, args.directory, args.profile):
+        if 'error' in result:
+            print(f"Item {result['item']} failed: {result['error']}")
+        else:
+            print(f"Item {result['item']}: {len(result['files'])} file(s) written")
+        results.append(result)
+
+    errors = [result for result in results if 'error' in result]
+    print(f"{len(results)} item(s) processed, {len(errors)} failed")
+    if args.report:
+        with open(args.report, 'w') as rf:
+            json.dump(results, rf, indent=2)
+        print(f"Report written to {args.report}")
+    metrics = [result['metrics'] for result in results if 'metrics' in result]
+    if metrics:
+        # stage times add up over the items, so with several jobs they exceed the time of the batch
+        total = profiling.aggregate(metrics)
+        print(profiling.summary(total))
+        with open(args.profile_output, 'w') as pf:
+            json.dump(total, pf, indent=2)
+        print(f"Metrics written to {args.profile_output}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(batch(parse_args(sys.argv[1:])))
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the hot paths of the formatter, run against a synthetic corpus of deals.
+
+    python benchmark.py [--sizes 10,100,1000] [--seed 1] [--output benchmark.json] [--compare old.json]
+
+The corpus is generated from the seed, so runs with the same seed and sizes time the same work.
+For each benchmark and size, the report gives the elapsed time, the throughput in items per second
+and the peak memory allocated while it ran.  The report is saved as json; --compare prints the change
+in throughput against an earlier report.
+"""
+
+import argparse
+import buildhtml
+import contextlib
+import copy
+import dealmodel
+import globals
+import io
+import json
+import main
+import os
+import parsepbn
+import parseurl
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.parse
+
+from typing import Callable, List
+
+globals.initialize()
+
+# option combinations for buildhtml.build
+BUILD_OPTIONS = ['-nsewa', '-nsewA -r2', '-s', '-sv', '-ns -g -p7', '-nsewa -W -p13', '-nsew -c -x hc -p5']
+
+PBN_SEATS = 'NESW'
+
+
+def random_deal(rng: random.Random, board: int, annotated: bool = False) -> dict:
+    # a deal with random hands, a plausible auction and a complete legal play
+    cards = list(range(52))
+    rng.shuffle(cards)
+    masks = [dealmodel.cards_mask(dealmodel.card_name(index) for index in cards[13 * i:13 * (i + 1)]) for i in range(4)]
+    seats = []
+    for direction, mask in zip(globals.directions, masks):
+        hand = dealmodel.Hand(mask)
+        # deliver suits unsorted, as they may come from a console or a url
+        suits = [''.join(rng.sample(hand.suit(suit), len(hand.suit(suit)))) for suit in range(4)]
+        seats.append({ 'Player': f'Player{rng.randrange(1000)}', 'Direction': direction, 'Hand': globals.build_hand(suits) })
+
+    dealer = rng.randrange(4)
+    level = rng.randint(1, 7)
+    strain = rng.choice('CDHSN')
+    auction = ['P'] * rng.randrange(4) + [f'{level}{strain}'] + ['P', 'P', 'P']
+    declarer = (dealer + len(auction) - 4) % 4
+    deal = { 'Board number': board,
+            'Dealer': globals.directions[dealer],
+            'Auction': auction,
+            'Seats': seats,
+            'Play': random_play(rng, masks, (declarer + 1) % 4, strain)
+            }
+    if annotated:
+        deal['Notes'] = ' '.join(rng.choice(['forcing', 'natural', '15-17 HCP', 'Stayman', 'transfer']) for _ in range(40))
+    return deal
+
+def random_play(rng: random.Random, masks: List[int], leader: int, strain: str) -> list:
+    # play 13 tricks, each seat following suit when it can
+    masks = list(masks)
+    play = []
+    for trick in range(13):
+        cards = []
+        for i in range(4):
+            seat = (leader + i) % 4
+            choices = list(dealmodel.mask_indexes(masks[seat]))
+            if cards:
+                following = [index for index in choices if index // 13 == dealmodel.card_index(cards[0]) // 13]
+                choices = following or choices
+            index = rng.choice(choices)
+            masks[seat] &= ~(1 << index)
+            cards.append(dealmodel.card_name(index))
+        play.extend(cards)
+        leader = (leader + parsepbn.trick_winner(cards, strain)) % 4
+    return play
+
+def deal_url(deal: dict) -> str:
+    # a BBO handviewer url for the deal, with each call annotated if the deal has notes
+    seats = dict([(seat['Direction'], seat) for seat in deal['Seats']])
+    order = ['South', 'West', 'North', 'East']
+    dealer = str((globals.directions.index(deal['Dealer']) + 1) % 4 + 1)
+    hands = []
+    for i, direction in enumerate(order):
+        hand = seats[direction]['Hand']
+        hands.append((dealer if i == 0 else '') + ''.join(suit[0] + hand[suit] for suit in globals.suits))
+    lin = f"pn|{','.join(seats[direction]['Player'] for direction in order)}|st||md|{','.join(hands)}|sv|n|rh||ah|Board {deal['Board number']}|"
+    for call in deal['Auction']:
+        lin += f'mb|{call}|'
+        if 'Notes' in deal:
+            lin += f"an|{deal['Notes']}|"
+    lin += ''.join(f'pc|{card}|' for card in deal['Play'])
+    return 'https://www.bridgebase.com/tools/handviewer.html?lin=' + urllib.parse.quote(lin, safe='|,')
+
+def deal_pbn(deal: dict) -> str:
+    # the deal as a PBN game
+    seats = dict([(seat['Direction'][0], seat) for seat in deal['Seats']])
+    hands = ' '.join('.'.join(seats[seat]['Hand'][suit] for suit in globals.suits) for seat in PBN_SEATS)
+    calls = [call.replace('N', 'NT') if len(call) == 2 else { 'P': 'Pass', 'D': 'X', 'R': 'XX' }.get(call, call) for call in deal['Auction']]
+    lines = [f'[Board "{deal["Board number"]}"]', f'[Dealer "{deal["Dealer"][0]}"]', f'[Deal "N:{hands}"]']
+    lines += [f'[{direction} "{seats[direction[0]]["Player"]}"]' for direction in ['North', 'East', 'South', 'West']]
+    contract = deal['Auction'][-4]
+    declarer = globals.directions[(globals.directions.index(deal['Dealer']) + len(deal['Auction']) - 4) % 4]
+    lines += [f'[Contract "{contract}"]', f'[Declarer "{declarer[0]}"]', f'[Auction "{deal["Dealer"][0]}"]']
+    lines += [' '.join(calls[i:i + 4]) for i in range(0, len(calls), 4)]
+    # the play section has a column per seat, beginning with the opening leader
+    leader = parsepbn.shift(declarer, 1)
+    lines.append(f'[Play "{leader[0]}"]')
+    holders = dict([(index, seat['Direction']) for seat in deal['Seats']
+                    for index in dealmodel.mask_indexes(dealmodel.Hand.from_dict(seat['Hand']).mask)])
+    for trick in range(13):
+        cards = deal['Play'][4 * trick:4 * trick + 4]
+        by_seat = dict([(holders[dealmodel.card_index(card)], card) for card in cards])
+        lines.append(' '.join(by_seat[parsepbn.shift(leader, i)] for i in range(4)))
+    return '\n'.join(lines) + '\n\n'
+
+def corpus(seed: int, size: int, annotated: bool = False) -> list:
+    rng = random.Random(f'{seed}-{size}-{annotated}')
+    return [random_deal(rng, board, annotated) for board in range(1, size + 1)]
+
+
+def measure(function: Callable[[], int]) -> dict:
+    # run function (which returns the number of items it processed) once for time and once for memory
+    start = time.perf_counter()
+    count = function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return { 'items': count,
+            'seconds': round(seconds, 6),
+            'per_second': round(count / seconds, 1) if seconds else None,
+            'peak_bytes': peak
+            }
+
+def benchmarks(seed: int, size: int, directory: str) -> dict:
+    deals = corpus(seed, size)
+    urls = [deal_url(deal) for deal in deals]
+    annotated_urls = [deal_url(deal) for deal in corpus(seed, size, annotated=True)]
+    pbn_path = os.path.join(directory, f'corpus-{size}.pbn')
+    with open(pbn_path, 'w') as f:
+        f.writelines(deal_pbn(deal) for deal in deals)
+    unsorted_deals = copy.deepcopy(deals)
+    sorted_deals = [dealmodel.sort_hands(copy.deepcopy(deal)) for deal in deals]
+
+    def parse_urls(urls):
+        return lambda: len([parseurl.parse(url) for url in urls])
+
+    def parse_pbn():
+        return sum(1 for deal in parsepbn.parse(pbn_path))
+
+    def main_pbn():
+        args = main.parse_args([pbn_path, '-nsewa', '-o', os.path.join(directory, 'out'), '--no-cache', '--no-library'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            return len(main.main(args))
+
+    def sort_suits():
+        for deal in unsorted_deals:
+            dealmodel.sort_hands(deal)
+        return len(unsorted_deals)
+
+    def build(options):
+        args = main.parse_args(['-'] + options.split())
+        return lambda: len([buildhtml.build(deal, args) for deal in sorted_deals])
+
+    def play_sequence():
+        args = main.parse_args(['-', '-nsewa', '-p', '-1'])
+        return sum(1 for deal in sorted_deals for frame in buildhtml.build_play_sequence(deal, args))
+
+    results = { 'parseurl.parse': measure(parse_urls(urls)),
+            'parseurl.parse (annotated)': measure(parse_urls(annotated_urls)),
+            'parsepbn.parse': measure(parse_pbn),
+            'main.main (pbn)': measure(main_pbn),
+            'suit sort': measure(sort_suits),
+            'played -1 sequence': measure(play_sequence)
+            }
+    for options in BUILD_OPTIONS:
+        results[f'buildhtml.build {options}'] = measure(build(options))
+    return results
+
+def compare(report: dict, previous: dict):
+    # print the change in throughput against an earlier report
+    for size, results in report['results'].items():
+        for name, result in results.items():
+            old = previous.get('results', {}).get(size, {}).get(name)
+            if old and old.get('per_second') and result['per_second']:
+                change = 100 * (result['per_second'] / old['per_second'] - 1)
+                print(f'{size:>6} {name:<40} {change:+7.1f}%')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter benchmarks')
+    parser.add_argument('--sizes', default='10,100,1000', help='comma separated numbers of deals in the corpus')
+    parser.add_argument('--seed', type=int, default=1, help='seed for the synthetic corpus')
+    parser.add_argument('--output', default='benchmark.json', help='file for the json report')
+    parser.add_argument('--compare', default='', help='earlier json report to compare against')
+    return parser.parse_args(argv)
+
+def run(args):
+    report = { 'seed': args.seed, 'python': platform.python_version(), 'results': {} }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            results = benchmarks(args.seed, size, directory)
+            report['results'][str(size)] = results
+            for name, result in results.items():
+                print(f"{size:>6} {name:<40} {result['per_second']:>10} items/s  {result['peak_bytes'] / 1024:>10.0f} KiB")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Report written to {args.output}')
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
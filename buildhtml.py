@@ -1,9 +1,12 @@
 import constants
 import copy
 import globals
-import main
+import layout
+import playengine
+import profiling
+import templates
 
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, TextIO, Tuple
 
 """
 The build method of this module takes as input a dictionary describing a deal in the following format:
@@ -46,17 +49,12 @@ pips = { 'S': '&#9824;',
         }
 
 
-def shift(direction: str, n: int) -> str:
-    # returns direction n places clockwise from specified direction
-    # shift("South", 1) returns "West"
-    return globals.directions[(globals.directions.index(direction) + n) % 4]
+# the rotation of a deal is part of its layout
+shift = layout.shift
+rotate_deal = layout.rotate_deal
 
-def rotate_deal(deal: dict, n: int) -> dict:
-    # rotates deal n seats counter-clockwise
-    deal["Dealer"] = shift(deal["Dealer"], n)
-    for seat in deal['Seats']:
-        seat["Direction"] = shift(seat["Direction"], n)
-    return deal
+# the html of a card once it is played, for each state layout.hand_suits can give it
+PLAYED_CARDS = { layout.GRAY: '<span style="color: #aaa;">{}</span>', layout.WHITE: '<span style="color: #fff;">{}</span>' }
 
 def format_hand(hand: Dict[str, str], args=None, deal=None, with_breaks: bool = True, indent: int = 0) -> str:
     # convert dictionary of holdings by suit into an html string displaying the hand
@@ -67,60 +65,20 @@ def format_hand(hand: Dict[str, str], args=None, deal=None, with_breaks: bool =
     #     <span style="color: rgb(192, 22, 22);">&#9830;</span> K Q J 2<br />
     #     &#9827; A J 10 6<br />'
 
-    br = '<br />\n' if with_breaks else '&nbsp;&nbsp;'
-
-    # Determine played cards if args.played > 0
-    played_cards = set()
-    if args and hasattr(args, 'played') and getattr(args, 'played', 0) > 0 and deal and 'Play' in deal:
-        played_cards = set(deal['Play'][:args.played])
-
-    def card_html(card, played):
-        if played:
-            if args and getattr(args, 'white', False):
-                return f'<span style="color: #fff;">{card}</span>'
-            if args and getattr(args, 'gray', False):
-                return f'<span style="color: #aaa;">{card}</span>'
-            return card
-        return card
+    suits = layout.hand_suits(hand, layout.played_mask(deal, args), layout.card_mode(args), layout.excluded(args))
+    return format_suits(suits, with_breaks=with_breaks, indent=indent)
 
+def format_suits(suits: list, with_breaks: bool = True, indent: int = 0) -> str:
+    # the html of the suits of a hand as layout.hand_suits lays them out, with the played cards grayed or whited
+    br = '<br />\n' if with_breaks else '&nbsp;&nbsp;'
     suit_str = []
-    exclude_raw = getattr(args, 'exclude', '')
-    exclude = set(exclude_raw.lower()) if exclude_raw else set()
-    for pip, suit in zip(pips.values(), globals.suits):
-        suit_letter = suit[0].lower()
-        if suit_letter in exclude:
-            continue  # Skip excluded suit, no break after
-        cards = hand[suit]
+    for suit, cards in suits:
         display = []
-        white_display = []
-        i = 0
-        while i < len(cards):
-            card = cards[i]
-            # Handle '10' as 'T'
-            if card == 'T':
-                card_str = '10'
-            else:
-                card_str = card
-            # Build suit+rank string (e.g. 'CK')
-            card_id = f'{suit[0]}{card}'
-            played = card_id in played_cards
-            # If played and neither gray nor white, remove it
-            if played and not (args and (getattr(args, 'gray', False) or getattr(args, 'white', False))):
-                i += 1
-                continue
-
-            # If whited, collect to append at end; if grayed, keep in-place
-            if played and args and getattr(args, 'white', False):
-                white_display.append(card_html(card_str, played))
-            else:
-                display.append(card_html(card_str, played))
-
-            i += 1
-
-        # Whited cards should appear at the end of the suit
-        full_display = display + white_display
-        suit_line = (' ' * indent) + pip + ' ' + ' '.join(full_display) if full_display else (' ' * indent) + pip + ' --'
-        suit_str.append(suit_line)
+        for rank, state in cards:
+            # Handle 'T' as '10'
+            card = '10' if rank == 'T' else rank
+            display.append(PLAYED_CARDS[state].format(card) if state in PLAYED_CARDS else card)
+        suit_str.append((' ' * indent) + pips[suit] + ' ' + (' '.join(display) if display else '--'))
     return br.join(suit_str) + br
 
 def format_hand_diagram(hand_info: dict, args=None, deal=None) -> str:
@@ -134,14 +92,19 @@ def format_hand_diagram(hand_info: dict, args=None, deal=None) -> str:
     #   <span style="color: #c01616;">♦</span> 10 3<br />
     #   ♣ 6<br />
     # 
-    diagram = constants.HAND_DIRECTION_TEMPLATE.format(direction=hand_info["Direction"].upper())
-    # diagram = f'          <div class="hand-title">{hand_info["Direction"].upper()}</div>\n'
-    if "Player" in hand_info:
-        diagram += constants.HAND_NAME_TEMPLATE.format(name=hand_info["Player"])
-    if "Hand" in hand_info:
-        diagram += f'{format_hand(hand_info["Hand"], args=args, deal=deal, indent=10)}'
-    return diagram
-    
+    return format_hand_box(layout.hand_box(hand_info, args, layout.played_mask(deal, args), getattr(args, 'stats', False)))
+
+def format_hand_box(box: layout.HandBox, format_cards=format_suits) -> str:
+    # the html of a hand of a diagram as layout.hand_box lays it out, its suits formatted by format_cards
+    diagram = []
+    templates.HAND_DIRECTION.render_into(diagram, direction=box.direction.upper())
+    if box.player is not None:
+        templates.HAND_NAME.render_into(diagram, name=box.player)
+    if box.suits is not None:
+        if box.stats:
+            templates.HAND_STATS.render_into(diagram, hcp=box.stats[0], shape=box.stats[1])
+        diagram.append(format_cards(box.suits, indent=10))
+    return ''.join(diagram)
     
 def format_hand_diagrams(hands: dict, args=None, deal=None) -> dict:
     # convert list of hands into a dictionary of hand diagrams, keyed by direction
@@ -157,44 +120,45 @@ def format_call(call: str) -> str:
             call = call.replace(suit, ' ' + pip)
     return call.replace('P', 'Pass').replace('D', 'Double').replace('R', 'Redouble').replace('N', ' NT')
 
+def format_cell(cell: str) -> str:
+    # the html of a cell of the auction as layout.auction_cells lays it out
+    if cell == layout.ALL_PASS:
+        return cell
+    return format_call(cell) if cell else ' '
+
+def format_calls(auction: List[str]) -> list:
+    # convert list of call abbreviations into a list of displayable calls, ending with (All pass)
+    # input: ['1C', 'P', '2C', 'P', '3N', 'P', 'P', 'P']
+    # output: ['1 &#9827;', 'Pass', '2 &#9827;', 'Pass', '3 NT', '(All pass)']
+    return [format_cell(call) for call in layout.auction_calls(auction)]
+
 def format_auction_calls(auction: List[str], dealer: str) -> list:
     # convert list of call  abbreviations into a  list of displayable calls with the first call being West
     # input: ['1C', 'Pass', '2C', 'Pass', '2S', 'Pass', '3 NT', 'Pass', 'Pass', 'Pass'], North dealer
     # output: [' ', '1 &#9827;', 'Pass', '2 &#9827;',
     #     'Pass', '2 &#9824;', 'Pass', '3 NT', 
     #     '(All pass)']
-        
-    # translate abbreviations to full calls
-    call_list = [format_call(call) for call in auction]
-    
-    # replace three or four final passes with (All pass)
-    if len(call_list) > 3:
-        if call_list[-3:] == ['Pass', 'Pass', 'Pass']:
-            call_list[-3:] = ['(All pass)']
-        if call_list[-1] == 'Pass':
-            del call_list[-1]
-         
-    # determine how many empty cells should begin the auction
-    new_auction = ([' '] * ((globals.directions.index(dealer)) % 4))
-    new_auction.extend(call_list)
-    return new_auction
+    return [format_cell(cell) for cell in layout.auction_cells(auction, dealer)]
 
 def format_auction_header(deal: dict, include_directions: bool = True) -> str:
     # construct auction heading from list of players (West first)
     # input: each player's name can be found in deal[direction]["PLayer"]
+    return format_auction_names(layout.player_names(deal), include_directions)
 
-    players = dict([(seat['Direction'], seat.get('Player', '')) for seat in deal['Seats']])
-    auction_header = ''
+def format_auction_names(names: List[str], include_directions: bool = True) -> str:
+    # the auction heading of the names of the players, West first
+    auction_header = []
     if include_directions:
-        auction_header = '    <tr>\n'
+        auction_header.append('    <tr>\n')
         for direction in globals.directions:
-            auction_header += constants.AUCTION_DIRECTIONS_TEMPLATE.format(direction=direction)
-        auction_header += '    </tr>\n'
+            templates.AUCTION_DIRECTIONS.render_into(auction_header, direction=direction)
+        auction_header.append('    </tr>\n')
     
-    auction_header += '    <tr>\n'
-    for direction in globals.directions:
-        auction_header += constants.AUCTION_NAMES_TEMPLATE.format(name=players[direction])
-    return auction_header + '    </tr>'
+    auction_header.append('    <tr>\n')
+    for name in names:
+        templates.AUCTION_NAMES.render_into(auction_header, name=name)
+    auction_header.append('    </tr>')
+    return ''.join(auction_header)
     
     
 def format_auction(auction: List[str]) -> str:
@@ -204,114 +168,254 @@ def format_auction(auction: List[str]) -> str:
     auction.extend([' '] * (4 - len(auction) % 4))
     
     # build rows
-    auction_html = ''
+    auction_html = []
     for i in range(len(auction)):
         if 0 == i % 4:
-            auction_html += '    <tr>\n'
-        auction_html += constants.CALL_TEMPLATE.format(call=auction[i])
+            auction_html.append('    <tr>\n')
+        templates.CALL.render_into(auction_html, call=auction[i])
         if 3 == i % 4:
-            auction_html += '    </tr>\n'
-    return auction_html
+            auction_html.append('    </tr>\n')
+    return ''.join(auction_html)
+
+def format_auction_table(auction: layout.Auction, width: int = 350) -> str:
+    # the html of an auction as layout.auction lays it out
+    header = format_auction_names(auction.names, auction.directions)
+    rows = format_auction([format_cell(cell) for cell in auction.cells])
+    return templates.AUCTION.render(width=width, header=header, auction=rows)
 
 def build_auction_table(deal: dict, width: int = 350) -> str:
-    header = format_auction_header(deal)
-    auction = format_auction((format_auction_calls(deal["Auction"], deal["Dealer"])))
-    return constants.AUCTION_TEMPLATE.format(width=width, header=header, auction=auction)
+    cells = layout.auction_cells(deal["Auction"], deal["Dealer"])
+    return format_auction_table(layout.Auction(True, layout.player_names(deal), cells), width)
 
 def build_auction_table_no_header(deal: dict, width: int = 350) -> str:
     # Build auction table with player names but without direction row
-    header = format_auction_header(deal, include_directions=False)
-    auction = format_auction((format_auction_calls(deal["Auction"], deal["Dealer"])))
-    return constants.AUCTION_TEMPLATE.format(width=width, header=header, auction=auction)
-
-def build_card_table(deal: dict, card_to_seat : dict, args) -> str:
-    # Display played cards from the current trick on the felt
-    play = deal.get('Play', [])
-    n = args.played if hasattr(args, 'played') else 0
-    if n == 0 or args.clear:
-        return constants.TABLE_TEMPLATE
+    cells = layout.auction_cells(deal["Auction"], deal["Dealer"])
+    return format_auction_table(layout.Auction(False, layout.player_names(deal), cells), width)
 
-    # Only show the last (n-1)%4 + 1 cards if n > 0
-    num_to_show = ((n-1) % 4 + 1) if n > 0 else 0
-    cards_to_show = play[:n][-num_to_show:] if num_to_show > 0 else []
+def build_card_table(deal: dict, play: playengine.Play, args, rotation: int = 0) -> str:
+    # Display played cards from the current trick on the felt, in the order they were played
+    # rotation places the cards of a play replayed on the deal before it was rotated that many seats
+    return format_felt(layout.felt(deal, play, args, rotation))
 
-    # Find which player played each card (assume order matches directions cyclically)
-    # The first card in cards_to_show was played by (n - num_to_show + 1) % 4
-    html = constants.CARD_TABLE_INTRO
-    for i, card in enumerate(cards_to_show):
-        direction = card_to_seat.get(card, '')
+def format_felt(cards) -> str:
+    # the felt with the cards of layout.felt on it
+    if cards is None:
+        return constants.TABLE_TEMPLATE
+
+    html = [constants.CARD_TABLE_INTRO]
+    for direction, card in cards:
         if card[1] == 'T':
             card = card[0] + '10'
-        html += constants.CARD_TABLE_ENTRY_TEMPLATE.format(direction=direction, pip=pips[card[0]], rank=card[1:])
-    html += constants.CARD_TABLE_OUTRO
-    return html
+        templates.CARD_TABLE_ENTRY.render_into(html, direction=direction.lower(), pip=pips[card[0]], rank=card[1:])
+    html.append(constants.CARD_TABLE_OUTRO)
+    return ''.join(html)
+
+def assemble_diagram(hands: dict, card_table: str, args=None) -> str:
+    # combine formatted hand diagrams (keyed by direction) and the felt into a diagram
+    # args give the hands shown; without them, those in hands are shown
+    shown = (lambda direction: getattr(args, direction.lower())) if args else (lambda direction: direction in hands)
+    table = [constants.DIAGRAM_INTRO]
+
+    if shown('North'):
+        templates.CENTER_HAND.render_into(table, hand=hands["North"])
+
+    templates.WEST_HAND.render_into(table, hand=hands["West"] if shown('West') else '')
+    table.append(card_table)
+    templates.EAST_HAND.render_into(table, hand=hands["East"] if shown('East') else '')
+      
+    if shown('South'):
+        templates.CENTER_HAND.render_into(table, hand=hands["South"])
 
-def build_diagram(deal: dict, args) -> str:
-    # Create a dictionary mapping cards to seat directions
-    card_to_seat = {}
-    for seat in deal["Seats"]:
-        direction = seat.get("Direction", "")
-        hand = seat.get("Hand", {})
-        for suit in ["Spades", "Hearts", "Diamonds", "Clubs"]:
-            cards = hand.get(suit, "")
-            for card in cards:
-                card_id = f"{suit[0]}{card}"
-                card_to_seat[card_id] = direction.lower()
+    table.append(constants.DIAGRAM_OUTRO)
+    return ''.join(table)
 
+def build_diagram(deal: dict, args) -> str:
     # build html to display deal
     hands = format_hand_diagrams(deal["Seats"], args=args, deal=deal)
-    table = constants.DIAGRAM_INTRO
-
-    if args.north:
-        table += constants.CENTER_HAND_TEMPLATE.format(hand=hands["North"])
-
-    table += constants.WEST_HAND_TEMPLATE.format(hand=hands["West"] if args.west else '')       
-    table += build_card_table(deal, card_to_seat, args)
-    table += constants.EAST_HAND_TEMPLATE.format(hand=hands["East"] if args.east else '')
-      
-    if args.south:
-        table += constants.CENTER_HAND_TEMPLATE.format(hand=hands["South"])
-
-    table += constants.DIAGRAM_OUTRO
-    return table
+    return assemble_diagram(hands, build_card_table(deal, playengine.Play(deal), args), args)
             
 def build_single_hand(hand: Dict[str, str], args=None, deal=None) -> str:
-    if args.vertical:
-        hand_html = constants.DIAGRAM_INTRO
-        hand_html += constants.CENTER_HAND_TEMPLATE.format(hand=format_hand(hand, args=args, deal=deal))
-        hand_html += constants.DIAGRAM_OUTRO
-        return hand_html    
+    suits = layout.hand_suits(hand, layout.played_mask(deal, args), layout.card_mode(args), layout.excluded(args))
+    return format_single_hand(suits, args.vertical)
+
+def format_single_hand(suits: list, vertical: bool, format_cards=format_suits) -> str:
+    # a hand shown on its own, from its suits as layout.hand_suits lays them out, formatted by format_cards
+    if vertical:
+        hand_html = [constants.DIAGRAM_INTRO]
+        templates.CENTER_HAND.render_into(hand_html, hand=format_cards(suits))
+        hand_html.append(constants.DIAGRAM_OUTRO)
+        return ''.join(hand_html)
     else:
-        hand_html = format_hand(hand, args=args, deal=deal, with_breaks=False)
-        return constants.HORIZONTAL_HAND_TEMPLATE.format(hand_html=hand_html)
+        hand_html = format_cards(suits, with_breaks=False)
+        return templates.HORIZONTAL_HAND.render(hand_html=hand_html)
  
+def format_replay_suits(suits: list, with_breaks: bool = True, indent: int = 0) -> str:
+    # like format_suits, for the suits of layout.replay_suits: every card that is played at some point is wrapped
+    #   in a span holding its position in the play and its states before and after, so the page can show the
+    #   hand after any number of cards as the frame of that many cards shows it
+    # a suit whose cards all go once played gets a '--' marker that appears once the last of them is played
+    br = '<br />\n' if with_breaks else '&nbsp;&nbsp;'
+    suit_str = []
+    for suit, cards in suits:
+        display = []
+        for rank, position, held, played in cards:
+            card = '10' if rank == 'T' else rank
+            display.append(templates.REPLAY_CARD.render(index=position, held=held, played=played, card=card) if position else card)
+        if not display:
+            display = ['--']
+        elif all(position and played == layout.REMOVE for rank, position, held, played in cards):
+            display.append(templates.REPLAY_VOID.render(index=max(position for rank, position, held, played in cards)))
+        suit_str.append((' ' * indent) + pips[suit] + ' ' + ' '.join(display))
+    return br.join(suit_str) + br
+
+def build_replay_card_table(play: List[str], record: playengine.Play, args) -> str:
+    # every played card goes on the felt; the page shows those of the current trick,
+    #   from the card with the index given by the data-lead of the last card played
+    if args.clear:
+        return constants.TABLE_TEMPLATE
+    html = [constants.CARD_TABLE_INTRO]
+    for index, card in enumerate(play, 1):
+        direction = record.seat(index - 1).lower()
+        if card[1] == 'T':
+            card = card[0] + '10'
+        templates.REPLAY_CARD_TABLE_ENTRY.render_into(html, direction=direction, index=index, lead=record.leads[index - 1] + 1,
+                                                      pip=pips[card[0]], rank=card[1:])
+    html.append(constants.CARD_TABLE_OUTRO)
+    return ''.join(html)
+
+def build_replay_chunks(deal: dict, args, style: bool = True) -> Iterator[str]:
+    # yields the html of build_replay in pieces; style=False leaves out the style blocks
+    # the page is laid out by layout.replay, so each step shows the hands as the frame of as many cards does
+    board = layout.prepare(deal, args)
+    page = layout.replay(deal, args, board)
+    play = board.deal.get('Play', [])
+    html = [constants.STYLE, constants.REPLAY_STYLE] if style else []
+    templates.REPLAY_INTRO.render_into(html, mode=page.mode)
+
+    # a single hand is formatted as a single line (or vertically), several hands as a diagram
+    if page.single:
+        html.append(format_single_hand(page.single.suits, page.vertical, format_replay_suits))
+    elif page.hands is not None:
+        hands = dict([(direction, format_hand_box(box, format_replay_suits)) for direction, box in page.hands.items()])
+        html.append(assemble_diagram(hands, build_replay_card_table(play, board.play, args)))
+
+    step = min(max(args.played, 0), len(play))
+    templates.REPLAY_CONTROLS.render_into(html, count=len(play), step=step)
+    html.append(constants.REPLAY_OUTRO)
+    yield from html
+    yield format_auction_section(page.auction, page.double_dummy)
+
+def build_replay(deal: dict, args) -> str:
+    # build a single document replaying the play, with a control stepping through the cards
+    # the style and the diagram appear once, instead of once per card played
+    return ''.join(build_replay_chunks(deal, args))
+
+def format_contract(contract: str) -> str:
+    # a par contract as ddsolver.par gives it, e.g. '4HxE' returns '4 <heart pip>x E'
+    return f"{format_call(contract[:2])}{contract[2:-1]} {contract[-1]}"
+
+def build_double_dummy_table(deal: dict) -> str:
+    # the tricks each declarer takes in each strain, and the par score
+    return format_double_dummy(layout.double_dummy(deal))
+
+def format_double_dummy(double_dummy: layout.DoubleDummy) -> str:
+    # the html of the double-dummy tricks and par as layout.double_dummy gives them
+    import ddsolver
+    table = double_dummy.table
+    strains = []
+    for strain in ddsolver.STRAINS:
+        templates.DOUBLE_DUMMY_CELL.render_into(strains, value='NT' if strain == 'N' else pips[strain])
+    rows = []
+    for direction in ['North', 'South', 'East', 'West']:
+        cells = []
+        for strain in ddsolver.STRAINS:
+            templates.DOUBLE_DUMMY_CELL.render_into(cells, value=table[strain][direction])
+        templates.DOUBLE_DUMMY_ROW.render_into(rows, direction=direction[0], cells=''.join(cells))
+    par = layout.par_line(double_dummy, format_contract)
+    return templates.DOUBLE_DUMMY.render(strains=''.join(strains), rows=''.join(rows), par=par)
+
+def build_auction(deal: dict, args) -> str:
+    # if specified, add auction, and below it the double-dummy tricks (solved by main.py --dd)
+    return format_auction_section(layout.auction(deal, args), layout.double_dummy(deal, args))
+
+def format_auction_section(auction: layout.Auction, double_dummy: layout.DoubleDummy) -> str:
+    # the auction and the double-dummy table of a layout, each if there is one
+    html = format_auction_table(auction) if auction else ''
+    if double_dummy:
+        html += format_double_dummy(double_dummy)
+    return html
+
+def build_chunks(deal: dict, args, style: bool = True) -> Iterator[str]:
+    # yields the html of build in pieces, so that it can be written to a file as it is built
+    # style=False leaves out the style block, for a document holding several deals
+    page = layout.build(deal, args)
+    if style:
+        yield constants.STYLE
+    yield from layout_chunks(page)
+
+def layout_chunks(page: layout.Layout) -> Iterator[str]:
+    # yields the html of a layout (layout.build) in pieces, without the style block
+    # a single hand is formatted as a single line (or vertically), several hands as a diagram
+    if page.single:
+        yield format_single_hand(page.single.suits, page.vertical)
+    elif page.hands is not None:
+        hands = dict([(direction, format_hand_box(box)) for direction, box in page.hands.items()])
+        yield assemble_diagram(hands, format_felt(page.felt))
+    yield format_auction_section(page.auction, page.double_dummy)
+
 def build(deal : dict, args) -> str: 
-    deal_copy = copy.deepcopy(deal)
-    html = constants.STYLE
+    return ''.join(build_chunks(deal, args))
+
+def write(chunks: Iterable[str], sink: TextIO):
+    # write the pieces of html to a file-like sink as they are built
+    for chunk in chunks:
+        sink.write(chunk)
+
+def build_play_sequence_chunks(deal: dict, args, style: bool = True) -> Iterator[Tuple[int, List[str]]]:
+    # yields (n, chunks) for each card played, where chunks are what build_chunks yields with args.played = n
+    # the style, the auction and the hands are formatted once; after each card only the hand
+    #   that played it and the felt are formatted again
+    with profiling.stage('copy'):
+        deal_copy = copy.deepcopy(deal)
+    args = copy.copy(args)
+    args.played = 0
 
     # rotate deal if necessary
     if args.rotate:
         rotate_deal(deal_copy, args.rotate)
     seats_to_show = args.north * 'N' + args.east * 'E' + args.south * 'S' + args.west * 'W'
 
-    # if a single seat is specified, format it as a single line
+    auction = build_auction(deal_copy, args)
+    record = playengine.Play(deal_copy)
+    seats = dict([(seat['Direction'], seat) for seat in deal_copy['Seats']])
     if len(seats_to_show) == 1:
-        for seat in deal_copy['Seats']:
-            if seat['Direction'] == globals.seats[seats_to_show[0]]:
-                html += build_single_hand(seat['Hand'], args=args, deal=deal_copy)
-
+        single = seats.get(globals.seats[seats_to_show[0]])
+        body = build_single_hand(single['Hand'], args=args, deal=deal_copy) if single else ''
     elif len(seats_to_show) > 1:
-        html += build_diagram(deal_copy, args)
-
-    # if specified, add auction
-    if args.auction:
-        html += build_auction_table(deal_copy)
-    elif getattr(args, 'auction_no_header', False):
-        html += build_auction_table_no_header(deal_copy)
-
-    return html
+        hands = format_hand_diagrams(deal_copy['Seats'], args=args, deal=deal_copy)
+
+    play = deal_copy.get('Play', [])
+    for n in range(1, len(play) + 1):
+        args.played = n
+        seat = seats.get(record.seat(n - 1))
+        if len(seats_to_show) == 1:
+            if single and seat is single:
+                body = build_single_hand(single['Hand'], args=args, deal=deal_copy)
+        elif len(seats_to_show) > 1:
+            if seat:
+                hands[seat['Direction']] = format_hand_diagram(seat, args=args, deal=deal_copy)
+            body = assemble_diagram(hands, build_card_table(deal_copy, record, args), args)
+        else:
+            body = ''
+        yield n, [constants.STYLE, body, auction] if style else [body, auction]
+
+def build_play_sequence(deal: dict, args) -> Iterator[Tuple[int, str]]:
+    # yields (n, html) for each card played, where html is what build returns with args.played = n
+    for n, chunks in build_play_sequence_chunks(deal, args):
+        yield n, ''.join(chunks)
 
 if __name__ == '__main__' :
+    import main
     sampleDeal = {'Board number': 12, 'Dealer': 'West', 'Auction': ['P', '1N', 'P', '2C', 'P', '2H', 'P', '3S', 'P', '4D', 'P', '4N', 'P', '5S', 'P', '7H', 'P', 'P', 'P'], 'Seats': [{'Player': 'Phillip', 'Direction': 'South', 'Hand': {'Spades': 'AK5', 'Hearts': 'KT43', 'Diamonds': 'K7', 'Clubs': 'AK62'}}, {'Player': 'Robot', 'Direction': 'West', 'Hand': {'Spades': 'J962', 'Hearts': '9', 'Diamonds': 'Q984', 'Clubs': 'T754'}}, {'Player': 'Robot', 'Direction': 'North', 'Hand': {'Spades': 'Q73', 'Hearts': 'AQJ52', 'Diamonds': 'AJ5', 'Clubs': 'J9'}}, {'Player': 'Robot', 'Direction': 'East', 'Hand': {'Spades': 'T84', 'Hearts': '876', 'Diamonds': 'T632', 'Clubs': 'Q83'}}], 'Play': ['S4', 'SA', 'S2', 'S3', 'HK', 'H9', 'H2', 'H6']}
     args = main.parse_args(['dummyinput', '-nsewa', '-r2', '-p2'])
     result = build(sampleDeal, args)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Thin client for server.py.  It takes the same arguments as main.py, e.g.
+    python client.py https://www.bridgebase.com/tools/handviewer.html?lin=... -nsewa -o output
+and has the server do the work.  If no server is running, the work is done in this process instead.
+
+The server address may be set in the DEALFORMATTER_SERVER environment variable (default http://127.0.0.1:8765).
+Requests carry the token the server wrote to ~/.dealformatter/server-<port>.token when it started.
+"""
+
+import json
+import os
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+SERVER = os.environ.get('DEALFORMATTER_SERVER', 'http://127.0.0.1:8765')
+# as in server.py, which is not imported so that the client starts quickly
+DEFAULT_PORT = 8765
+TOKEN_HEADER = 'X-DealFormatter-Token'
+
+
+def token(server: str = SERVER) -> str:
+    # the token of the server listening at the address server, '' if it has not written one
+    port = urllib.parse.urlsplit(server).port or DEFAULT_PORT
+    try:
+        with open(os.path.join(os.path.expanduser('~'), '.dealformatter', f'server-{port}.token'), 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+def request(path: str, body: dict, server: str = SERVER, timeout: float = 60) -> dict:
+    # POST body to the server and return its reply
+    data = json.dumps(body).encode('utf-8')
+    headers = { 'Content-Type': 'application/json', TOKEN_HEADER: token(server) }
+    http_request = urllib.request.Request(server + path, data=data, headers=headers)
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        return json.load(e)
+
+def run_locally(argv: list) -> int:
+    import main
+    main.main(main.parse_args(argv))
+    return 0
+
+def run(argv: list) -> int:
+    if argv and argv[0] == '*':
+        # console input has to be typed here
+        return run_locally(argv)
+    try:
+        reply = request('/run', { 'argv': argv, 'cwd': os.getcwd() })
+    except (urllib.error.URLError, ConnectionError):
+        # no server
+        return run_locally(argv)
+    if 'error' in reply:
+        print(reply['error'], file=sys.stderr)
+        return 1
+    for filename in reply['files']:
+        print(f"{filename} has been written")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
@@ -126,5 +126,88 @@ HAND_DIRECTION_TEMPLATE = """\
 
 HAND_NAME_TEMPLATE = """\
           <div class="name">{name}</div>\n"""
+
+HAND_STATS_TEMPLATE = """\
+          <div class="hand-stats" style="font-size: smaller;">{hcp} HCP, {shape}</div>\n"""
  
 
+
+REPLAY_STYLE = """\
+<style>
+    .replay .replay-card[data-held="remove"]:not(.played) { display: none; }
+    .replay .replay-card.played[data-played="remove"] { display: none; }
+    .replay .replay-card.played[data-played="gray"] { color: #aaa; }
+    .replay .replay-card.played[data-played="white"] { color: #fff; }
+    .replay .replay-void { display: none; }
+    .replay .replay-void.played { display: inline; }
+    .replay .replay-controls { text-align: center; margin: 4px 0; }
+    .replay .replay-label { display: inline-block; min-width: 4em; }
+</style>\n"""
+
+REPLAY_INTRO = """\
+<div class="replay" data-mode="{mode}">\n"""
+
+# a card of a hand in a replay, with its states (layout.replay_suits) before and after it is played
+REPLAY_CARD_TEMPLATE = '<span class="replay-card" data-card="{index}" data-held="{held}" data-played="{played}">{card}</span>'
+
+REPLAY_VOID_TEMPLATE = '<span class="replay-void" data-card="{index}">--</span>'
+
+REPLAY_CARD_TABLE_ENTRY_TEMPLATE = """\
+            <div class="card {direction} replay-felt" data-card="{index}" data-lead="{lead}" style="display: none;">{pip} {rank}</div>\n"""
+
+REPLAY_CONTROLS_TEMPLATE = """\
+  <div class="replay-controls">
+    <button type="button" class="replay-prev">&#9664;</button>
+    <input type="range" class="replay-step" min="0" max="{count}" value="{step}" />
+    <button type="button" class="replay-next">&#9654;</button>
+    <span class="replay-label">{step} / {count}</span>
+  </div>\n"""
+
+REPLAY_OUTRO = """\
+</div>
+<script>
+  document.querySelectorAll('.replay').forEach(function (replay) {
+    var slider = replay.querySelector('.replay-step');
+    var label = replay.querySelector('.replay-label');
+    function show(step) {
+      // cards of the current trick are on the felt, from the lead of the last card played
+      var last = replay.querySelector('.replay-felt[data-card="' + step + '"]');
+      var start = last ? +last.dataset.lead : step - (step + 3) % 4;
+      slider.value = step;
+      label.textContent = step + ' / ' + slider.max;
+      replay.querySelectorAll('.replay-card, .replay-void').forEach(function (card) {
+        card.classList.toggle('played', +card.dataset.card <= step);
+      });
+      replay.querySelectorAll('.replay-felt').forEach(function (card) {
+        var index = +card.dataset.card;
+        card.style.display = (index >= start && index <= step) ? '' : 'none';
+      });
+    }
+    replay.querySelector('.replay-prev').onclick = function () { show(Math.max(0, +slider.value - 1)); };
+    replay.querySelector('.replay-next').onclick = function () { show(Math.min(+slider.max, +slider.value + 1)); };
+    slider.oninput = function () { show(+slider.value); };
+    show(+slider.value);
+  });
+</script>\n"""
+
+BOARD_TITLE_TEMPLATE = """\
+<h3 class="board-title" align="center">Board {board}</h3>\n"""
+
+DOUBLE_DUMMY_TEMPLATE = """\
+<br/>
+<table class="double-dummy" align="center" border="0" cellpadding="0" cellspacing="0" style="width: 350px;padding-left: 30">
+  <tbody>
+    <tr>
+      <td align="left" width="20%"></td>
+{strains}    </tr>
+{rows}  </tbody>
+</table>
+<div class="par" align="center">{par}</div>\n"""
+
+DOUBLE_DUMMY_CELL_TEMPLATE = """\
+      <td align="center" width="16%">{value}</td>\n"""
+
+DOUBLE_DUMMY_ROW_TEMPLATE = """\
+    <tr>
+      <td align="left" width="20%">{direction}</td>
+{cells}    </tr>\n"""
@@ -0,0 +1,591 @@
+# -*- coding: utf-8 -*-
+"""
+Double-dummy solver: the number of tricks each seat can take as declarer in each strain, with every
+card visible and both sides playing their best, and the par score of the deal.
+
+    table = ddsolver.trick_table(deal)      # { 'N': { 'North': 9, 'East': 4, ... }, 'S': {...}, ... }
+    ddsolver.par(table, 'NS', 'North')      # (score for North-South, ['3NN', '3NS'])
+
+    python ddsolver.py deals.pbn -j 4       # print the trick table and par of every deal
+
+The search is an alpha-beta search of null-window questions ("can this side take t more tricks?"), with
+    a transposition table at the start of each trick, keyed on the length of each suit in each hand
+        and the seats of the cards whose ranks decided the result, so that positions differing only in
+        their small cards share an entry; the entries hold lower and upper bounds on the tricks left;
+    the tricks a side is sure of (top cards it can cash, and trumps above any of the other side's)
+        deciding questions without a search;
+    equivalent cards (cards in sequence once played cards are left out) tried once;
+    moves ordered so that the lead that decided a position before, top cards and leads to partner's
+        top card, and the cheapest card that wins the trick or else the lowest card, are tried first.
+
+A 13 card deal takes a minute or more of processor time per strain in pure Python, so solve_deals shares
+the strains of its deals out over a pool of processes, and keeps the results in a cache file keyed
+by a hash of the hands so that a deal is only ever solved once.
+"""
+
+import argparse
+import concurrent.futures
+import dealmodel
+import globals
+import hashlib
+import json
+import os
+import sys
+
+from typing import Dict, Iterable, List, Tuple
+
+globals.initialize()
+
+# strains in the order of a trick table; the index of a suit strain is its suit in dealmodel
+STRAINS = ['C', 'D', 'H', 'S', 'N']
+STRAIN_SUIT = { 'S': 0, 'H': 1, 'D': 2, 'C': 3, 'N': -1 }
+
+# seats in clockwise order, as used by the search
+SEATS = ['North', 'East', 'South', 'West']
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser('~'), '.dealformatter', 'ddcache.json')
+
+# the search holds each hand as four 13 bit holdings, one per suit, in which bit r is rank r (0 for the ace)
+HOLDING_RANKS = [[rank for rank in range(13) if holding >> rank & 1] for holding in range(1 << 13)]
+HOLDING_COUNT = [len(ranks) for ranks in HOLDING_RANKS]
+
+
+def top_cards(left: int, count: int) -> int:
+    # the count highest cards of the holding left
+    return left & ((2 << HOLDING_RANKS[left][count - 1]) - 1) if count else 0
+
+
+class Search:
+    # double-dummy search of one deal in one strain
+    #
+    # Besides its result, each search returns the cards whose ranks decided it (the winning ranks), as a
+    #   52 bit mask: cards that won a trick against another card of their suit, and the top cards behind
+    #   a bound on the tricks.  A position is entered in the transposition table under the lengths of
+    #   each suit in each hand, with the seats holding the top cards of each suit down to its lowest
+    #   winning rank; any position with those lengths and those seats holding its top cards has the
+    #   same result, whatever the smaller cards.
+    def __init__(self, trump: int):
+        self.trump = trump
+        # { lengths and leader: { (mask, seats of the top cards): [lower, upper] } }, the bounds being on
+        #   the tricks North-South take
+        self.table = {}
+        # the lead that decided a position before, as (suit, rank among the cards left)
+        self.leads = {}
+        # results of the helpers below, which see the same holdings again and again
+        self.suit_keys = {}
+        self.sequences = {}
+        self.tops = {}
+        self.nodes = 0
+
+    def suit_key(self, suit: int) -> Tuple[int, int]:
+        # the lengths of the suit in each hand (4 bits each) and the seat of each card left in the suit,
+        #   highest first (2 bits each)
+        holdings = self.holdings
+        packed = holdings[0][suit] | holdings[1][suit] << 13 | holdings[2][suit] << 26 | holdings[3][suit] << 39
+        key = self.suit_keys.get(packed)
+        if key is None:
+            lengths = 0
+            seats = 0
+            for seat in range(4):
+                lengths |= HOLDING_COUNT[holdings[seat][suit]] << (4 * seat)
+                for rank in HOLDING_RANKS[holdings[seat][suit]]:
+                    seats |= seat << (2 * HOLDING_COUNT[self.left[suit] & ((1 << rank) - 1)])
+            key = self.suit_keys[packed] = (lengths, seats)
+        return key
+
+    def sequence_ranks(self, holding: int, left: int) -> List[int]:
+        # the highest rank of each sequence in holding, cards in sequence being those with no other card
+        #   of left between them
+        key = holding | left << 13
+        ranks = self.sequences.get(key)
+        if ranks is None:
+            ranks = []
+            in_sequence = False
+            for rank in HOLDING_RANKS[left]:
+                if holding >> rank & 1:
+                    if not in_sequence:
+                        ranks.append(rank)
+                    in_sequence = True
+                else:
+                    in_sequence = False
+            self.sequences[key] = ranks
+        return ranks
+
+    def moves(self, seat: int, led: int) -> List[int]:
+        # one card (13 * suit + rank) from each sequence of cards that seat may play
+        hand = self.holdings[seat]
+        if led >= 0 and hand[led]:
+            return [13 * led + rank for rank in self.sequence_ranks(hand[led], self.left[led])]
+        return [13 * suit + rank for suit in range(4) if hand[suit] for rank in self.sequence_ranks(hand[suit], self.left[suit])]
+
+    def top_count(self, holding: int, left: int) -> int:
+        # the number of top cards of left held in holding
+        key = holding | left << 13
+        count = self.tops.get(key)
+        if count is None:
+            count = 0
+            for rank in HOLDING_RANKS[left]:
+                if not holding >> rank & 1:
+                    break
+                count += 1
+            self.tops[key] = count
+        return count
+
+    def safe_rounds(self, leader: int) -> List[int]:
+        # the rounds of each suit both opponents of leader follow to, or cannot ruff for want of trumps
+        holdings = self.holdings
+        rounds = [13] * 4
+        if self.trump >= 0:
+            for opponent in ((leader + 1) % 4, (leader + 3) % 4):
+                if holdings[opponent][self.trump]:
+                    for suit in range(4):
+                        if suit != self.trump:
+                            rounds[suit] = min(rounds[suit], HOLDING_COUNT[holdings[opponent][suit]])
+        return rounds
+
+    def quick_tricks(self, leader: int) -> Tuple[List[int], int]:
+        # tricks the side of leader can take at once in each suit: the leader's top cards, or the leader's
+        #   top cards in side suits partner follows to, then partner's top cards after a lead to partner's
+        #   top card in a suit; side suits before trumps, and no more rounds of a side suit than the
+        #   opponents follow to
+        # also returns the top card of the suit led to partner, if any
+        holdings = self.holdings
+        left = self.left
+        partner = (leader + 2) % 4
+        rounds = self.safe_rounds(leader)
+        top_count = self.top_count
+        counts = [min(top_count(holdings[leader][suit], left[suit]), rounds[suit]) for suit in range(4)]
+        for entry in range(4):
+            top = left[entry] & -left[entry]
+            if holdings[leader][entry] and holdings[partner][entry] & top and rounds[entry]:
+                cashed = [counts[suit] if suit != self.trump and HOLDING_COUNT[holdings[partner][suit]] >= counts[suit] else 0 for suit in range(4)]
+                partners = [min(top_count(holdings[partner][suit], left[suit]), rounds[suit]) for suit in range(4)]
+                if sum(cashed) + sum(partners) > sum(counts):
+                    return [cashed[suit] + partners[suit] for suit in range(4)], top << (13 * entry)
+                break
+        return counts, 0
+
+    def cashing_ranks(self, counts: List[int], ranks: int, needed: int) -> int:
+        # the top cards behind quick_tricks in enough suits to make needed tricks
+        tricks = 0
+        for suit in sorted(range(4), key=lambda suit: -counts[suit]):
+            if tricks >= needed:
+                break
+            tricks += counts[suit]
+            ranks |= top_cards(self.left[suit], counts[suit]) << (13 * suit)
+        return ranks
+
+    def loses_trick(self, leader: int) -> Tuple[bool, int]:
+        # True if the opponents of leader win this trick whatever is led, holding the top card of every suit
+        #   the leader holds where partner cannot ruff, and the top cards deciding it
+        holdings = self.holdings
+        partner = holdings[(leader + 2) % 4]
+        ranks = 0
+        for suit in range(4):
+            if holdings[leader][suit]:
+                top = self.left[suit] & -self.left[suit]
+                if top & (holdings[leader][suit] | partner[suit]):
+                    return False, 0
+                if self.trump >= 0 and suit != self.trump and not partner[suit] and partner[self.trump]:
+                    return False, 0
+                ranks |= top << (13 * suit)
+        return True, ranks
+
+    def trump_tricks(self, side: int) -> Tuple[int, int]:
+        # tricks side is sure to take with trumps higher than any trump of the other side (the trumps of
+        #   one player are played to different tricks, and win them all), and the trumps deciding it
+        if self.trump < 0:
+            return 0, 0
+        trumps = [hand[self.trump] for hand in self.holdings]
+        others = trumps[1 - side] | trumps[3 - side]
+        higher = (others & -others) - 1 if others else (1 << 13) - 1
+        tricks = max(HOLDING_COUNT[trumps[side] & higher], HOLDING_COUNT[trumps[side + 2] & higher])
+        left = self.left[self.trump]
+        return tricks, (left & (higher | others & -others)) << (13 * self.trump) if tricks else 0
+
+    def at_least(self, leader: int, side: int, target: int) -> Tuple[bool, int]:
+        # True if side (0 for North-South, 1 for East-West) can take target of the tricks left, at the start
+        #   of a trick led by leader, and the winning ranks
+        if target <= 0:
+            return True, 0
+        left = self.tricks_left
+        if target > left:
+            return False, 0
+        lengths, seats = leader, 0
+        for suit in range(4):
+            suit_lengths, suit_seats = self.suit_key(suit)
+            lengths |= suit_lengths << (2 + 16 * suit)
+            seats |= suit_seats << (26 * suit)
+        entries = self.table.get(lengths)
+        if entries is None:
+            entries = self.table[lengths] = {}
+        for (mask, entry_seats), (lower, upper) in entries.items():
+            if seats & mask == entry_seats:
+                if side:
+                    lower, upper = left - upper, left - lower
+                if lower >= target or upper < target:
+                    ranks = 0
+                    for suit in range(4):
+                        ranks |= top_cards(self.left[suit], ((mask >> (26 * suit)) & 0x3ffffff).bit_length() // 2) << (13 * suit)
+                    return lower >= target, ranks
+
+        # tricks each side is sure of decide some questions without a search
+        counts, entry = self.quick_tricks(leader)
+        quick = counts[0] + counts[1] + counts[2] + counts[3]
+        if leader % 2 == side:
+            if quick >= target:
+                return True, self.cashing_ranks(counts, entry, target)
+        elif quick > left - target:
+            return False, self.cashing_ranks(counts, entry, left - target + 1)
+        if self.trump >= 0:
+            ours, ranks = self.trump_tricks(side)
+            if ours >= target:
+                return True, ranks
+            theirs, ranks = self.trump_tricks(1 - side)
+            if theirs > left - target:
+                return False, ranks
+        if target == left and leader % 2 == side:
+            loses, ranks = self.loses_trick(leader)
+            if loses:
+                return False, ranks
+
+        result, ranks = self.play(leader, 0, leader, 0, -1, [], side, target, lengths << 104 | seats)
+
+        # enter the position with the seats of the cards down to the lowest winning rank of each suit
+        mask = 0
+        for suit in range(4):
+            suit_ranks = (ranks >> (13 * suit)) & dealmodel.SUIT_MASK
+            if suit_ranks:
+                count = HOLDING_COUNT[self.left[suit] & ((2 << (suit_ranks.bit_length() - 1)) - 1)]
+                mask |= ((1 << (2 * count)) - 1) << (26 * suit)
+        bounds = entries.setdefault((mask, seats & mask), [0, left])
+        if result == (side == 0):
+            bounds[0] = max(bounds[0], target if side == 0 else left - target + 1)
+        else:
+            bounds[1] = min(bounds[1], target - 1 if side == 0 else left - target)
+        return result, ranks
+
+    def order_leads(self, leader: int, moves: List[int], key: int) -> List[int]:
+        # first the top cards of a suit, then low cards in suits where partner has the top card, then the rest;
+        #   the lead that decided this position before comes first of all
+        partner = self.holdings[(leader + 2) % 4]
+        cashing, to_partner, others = [], [], []
+        for card in moves:
+            suit = card // 13
+            left = self.left[suit]
+            top = left & -left
+            if top == 1 << (card % 13):
+                cashing.append(card)
+            elif top & partner[suit]:
+                to_partner.append(card)
+            else:
+                others.append(card)
+        to_partner.reverse()
+        moves = cashing + to_partner + others
+        lead = self.leads.get(key)
+        if lead:
+            suit, index = lead
+            ranks = HOLDING_RANKS[self.left[suit]]
+            card = 13 * suit + ranks[index] if index < len(ranks) else -1
+            if card in moves:
+                moves.remove(card)
+                moves.insert(0, card)
+        return moves
+
+    def play(self, leader: int, position: int, winner: int, best: int, led: int, played: List[int],
+             side: int, target: int, key: int = 0) -> Tuple[bool, int]:
+        # play a card for the seat at position in the trick; winner and best are the seat and card winning so far
+        self.nodes += 1
+        seat = (leader + position) % 4
+        hand = self.holdings[seat]
+        moves = self.moves(seat, led)
+        if position == 0:
+            moves = self.order_leads(leader, moves, key)
+        elif len(moves) > 1:
+            # cards that win the trick, cheapest first, then the others, lowest first
+            best_suit = best // 13
+            winning, losing = [], []
+            for card in reversed(moves):
+                if card // 13 == best_suit and card < best or card // 13 == self.trump != best_suit:
+                    winning.append(card)
+                else:
+                    losing.append(card)
+            moves = losing + winning if winner % 2 == seat % 2 else winning + losing
+        maximizing = seat % 2 == side
+        ranks = 0
+        for card in moves:
+            suit, bit = card // 13, 1 << (card % 13)
+            hand[suit] ^= bit
+            if position == 0:
+                result, card_ranks = self.play(leader, 1, seat, card, suit, [card], side, target)
+            else:
+                if suit == best // 13 and card < best or suit == self.trump != best // 13:
+                    new_winner, new_best = seat, card
+                else:
+                    new_winner, new_best = winner, best
+                if position == 3:
+                    # the trick is over: take its cards out of those left; the rank of the card winning it
+                    #   counts if it beat another card of its suit
+                    trick = played + [card]
+                    for taken in trick:
+                        self.left[taken // 13] ^= 1 << (taken % 13)
+                    self.tricks_left -= 1
+                    result, card_ranks = self.at_least(new_winner, side, target - (new_winner % 2 == side))
+                    self.tricks_left += 1
+                    for taken in trick:
+                        self.left[taken // 13] ^= 1 << (taken % 13)
+                    if sum(1 for taken in trick if taken // 13 == new_best // 13) > 1:
+                        card_ranks |= 1 << new_best
+                else:
+                    result, card_ranks = self.play(leader, position + 1, new_winner, new_best, led, played + [card], side, target)
+            hand[suit] ^= bit
+            ranks |= card_ranks
+            if result == maximizing:
+                if position == 0:
+                    self.leads[key] = (suit, HOLDING_RANKS[self.left[suit]].index(card % 13))
+                return result, ranks
+        return not maximizing, ranks
+
+    def tricks(self, hands: List[int], leader: int, guess: int = None) -> int:
+        # the tricks the side of leader can take, hands being card masks of the four seats
+        # the answer is found by a binary search over targets, or from guess up or down a trick at a time
+        self.holdings = [[(hand >> (13 * suit)) & dealmodel.SUIT_MASK for suit in range(4)] for hand in hands]
+        self.left = [self.holdings[0][suit] | self.holdings[1][suit] | self.holdings[2][suit] | self.holdings[3][suit] for suit in range(4)]
+        self.tricks_left = bin(hands[leader]).count('1')
+        side = leader % 2
+        low, high = 0, self.tricks_left
+        while low < high:
+            target = (low + high + 1) // 2 if guess is None else min(max(guess, low + 1), high)
+            if self.at_least(leader, side, target)[0]:
+                low = target
+                guess = None if guess is None else target + 1
+            else:
+                high = target - 1
+                guess = None if guess is None else target - 1
+        return low
+
+
+def deal_hands(deal: dict) -> List[int]:
+    # card masks of North, East, South and West
+    hands = dict([(seat['Direction'], dealmodel.Hand.from_dict(seat['Hand']).mask) for seat in deal['Seats']])
+    return [hands.get(direction, 0) for direction in SEATS]
+
+def strain_tricks(hands: List[int], strain: str) -> Dict[str, int]:
+    # tricks taken by each declarer in a strain, e.g. { 'North': 9, ... }; the searches share a transposition
+    #   table, and each starts from the answer before it, as the result of a deal seldom depends much on the lead
+    search = Search(STRAIN_SUIT[strain])
+    count = bin(hands[0]).count('1')
+    tricks = {}
+    guess = None
+    for declarer in range(4):
+        # the opening leader is on declarer's left
+        leader = (declarer + 1) % 4
+        defence = search.tricks(list(hands), leader, guess)
+        tricks[SEATS[declarer]] = count - defence
+        guess = count - defence
+    return tricks
+
+def solvable(deal: dict) -> bool:
+    # True if every seat holds the same number of cards, at least one
+    hands = deal_hands(deal)
+    return bool(hands[0]) and all(bin(hand).count('1') == bin(hands[0]).count('1') for hand in hands)
+
+def trick_table(deal: dict) -> Dict[str, Dict[str, int]]:
+    # tricks taken by each declarer in each strain, e.g. { 'N': { 'North': 9, ... }, ... }
+    assert solvable(deal), "The hands must have the same number of cards"
+    hands = deal_hands(deal)
+    return dict([(strain, strain_tricks(hands, strain)) for strain in STRAINS])
+
+
+def contract_score(level: int, strain: str, tricks: int, vulnerable: bool, doubled: bool = False) -> int:
+    # score for the declaring side of a contract making tricks, or going down
+    needed = level + 6
+    if tricks < needed:
+        down = needed - tricks
+        if not doubled:
+            return -(100 if vulnerable else 50) * down
+        if vulnerable:
+            return -(200 + 300 * (down - 1))
+        return -(100 + 200 * min(down - 1, 2) + 300 * max(down - 3, 0))
+    per_trick = 20 if strain in 'CD' else 30
+    trick_score = per_trick * level + (10 if strain == 'N' else 0)
+    if doubled:
+        trick_score *= 2
+    score = trick_score
+    score += (500 if vulnerable else 300) if trick_score >= 100 else 50
+    if level == 6:
+        score += 750 if vulnerable else 500
+    elif level == 7:
+        score += 1500 if vulnerable else 1000
+    overtricks = tricks - needed
+    if doubled:
+        score += 50 + overtricks * (200 if vulnerable else 100)
+    else:
+        score += overtricks * per_trick
+    return score
+
+def par(table: Dict[str, Dict[str, int]], vulnerable: str = 'None', dealer: str = 'North') -> Tuple[int, List[str]]:
+    # the par score for North-South and the par contracts (e.g. '4SN' for 4 spades by North, '4HxE' if doubled)
+    # the par contract is the end of an auction in which both sides know the trick table: starting with
+    #   dealer's side, a side either passes, leaving the last bid to be played (doubled if it goes down), or
+    #   outbids it with any higher bid of its own, and each side bids on only while that improves its score
+    vulnerability = [vulnerable in ('NS', 'All'), vulnerable in ('EW', 'All')]
+    bids = [(level, strain) for level in range(1, 8) for strain in STRAINS]
+
+    def declarers(number: int, side: int) -> List[str]:
+        # the seats of side taking the most tricks in the strain of bid number
+        strain = bids[number][1]
+        tricks = max(table[strain][seat] for seat in SEATS[side::2])
+        return [seat for seat in SEATS[side::2] if table[strain][seat] == tricks]
+
+    def result(number: int, side: int) -> int:
+        # the score for North-South of bid number played by side
+        level, strain = bids[number]
+        tricks = table[strain][declarers(number, side)[0]]
+        score = contract_score(level, strain, tricks, vulnerability[side], doubled=tricks < level + 6)
+        return -score if side else score
+
+    def gains(side: int, score: int, than: int) -> bool:
+        return score > than if side == 0 else score < than
+
+    # value[number][side]: the score for North-South once side has made bid number, both sides bidding on
+    #   while they gain; worked out from the top bid down, since each depends only on the higher bids
+    value = [[0, 0] for bid in bids]
+
+    def call(side: int, above: int, stand: int) -> Tuple[int, int]:
+        # the score side gets by its best call over bid number above, passing (stand) or bidding, and the
+        #   number of its bid (None to pass); of the bids doing as well, the one side would most like to
+        #   play, then the cheapest
+        best, choice = stand, None
+        for number in range(above + 1, len(bids)):
+            if gains(side, value[number][side], best) or (choice is not None and value[number][side] == best
+                                                          and gains(side, result(number, side), result(choice, side))):
+                best, choice = value[number][side], number
+        return best, choice
+
+    for number in reversed(range(len(bids))):
+        for side in (0, 1):
+            value[number][side] = call(1 - side, number, result(number, side))[0]
+
+    # the first four calls: a seat that passes leaves the opening to the seats after it, and four passes
+    #   score 0; so the call of each seat is worked out from the fourth seat back
+    first = SEATS.index(dealer) % 2 if dealer in SEATS else 0
+    stand = 0
+    openings = []
+    for side in [1 - first, first, 1 - first, first]:
+        stand, choice = call(side, -1, stand)
+        openings.insert(0, (choice, side))
+    opening = [(number, side) for number, side in openings if number is not None]
+    if not opening:
+        return 0, []
+
+    # the auction from the opening bid on, each side making its best call
+    above = -1
+    number, side = opening[0]
+    while True:
+        score, higher = call(1 - side, number, result(number, side))
+        if higher is None:
+            break
+        above, number, side = number, higher, 1 - side
+
+    # the par contracts: the final bid, and the other bids of its level over the bid it outbid that score
+    #   the same and end the auction
+    level = bids[number][0]
+    contracts = []
+    for other, (other_level, strain) in enumerate(bids):
+        if other <= above or other_level != level or result(other, side) != score or value[other][side] != score:
+            continue
+        doubled = 'x' if score * (1 if side else -1) > 0 else ''
+        contracts += [f'{level}{strain}{doubled}{seat[0]}' for seat in declarers(other, side)]
+    return score, contracts
+
+
+def deal_key(deal: dict) -> str:
+    # hash of the hands, which alone determine the trick table
+    hands = deal_hands(deal)
+    return hashlib.sha256(json.dumps(hands).encode('utf-8')).hexdigest()
+
+class Cache:
+    # trick tables kept in a json file, keyed by deal_key
+    def __init__(self, path: str = ''):
+        self.path = path or DEFAULT_CACHE
+        try:
+            with open(self.path, 'r') as f:
+                self.tables = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.tables = {}
+        self.changed = False
+
+    def get(self, deal: dict):
+        return self.tables.get(deal_key(deal))
+
+    def put(self, deal: dict, table: dict):
+        self.tables[deal_key(deal)] = table
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.tables, f)
+        os.replace(temp, self.path)
+        self.changed = False
+
+def solve_deals(deals: Iterable[dict], jobs: int = 1, cache: Cache = None) -> List[dict]:
+    # trick tables of deals (None for a deal that cannot be solved), solving those not in the cache;
+    #   each strain of each deal is a task for one of jobs processes
+    deals = list(deals)
+    tables = [cache.get(deal) if cache else None for deal in deals]
+    unsolved = [i for i, table in enumerate(tables) if table is None and solvable(deals[i])]
+    tasks = [(deal_hands(deals[i]), strain) for i in unsolved for strain in STRAINS]
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and len(tasks) > 1 else None
+    try:
+        results = executor.map(strain_tricks, *zip(*tasks)) if executor else (strain_tricks(*task) for task in tasks)
+        for i in unsolved:
+            tables[i] = dict([(strain, next(results)) for strain in STRAINS])
+            if cache:
+                cache.put(deals[i], tables[i])
+    finally:
+        # the deals solved are kept even if the others are interrupted
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        if cache:
+            cache.save()
+    return tables
+
+
+def format_table(table: Dict[str, Dict[str, int]]) -> str:
+    # the trick table as text, a row for each declarer
+    lines = ['   ' + ''.join(f'{strain:>3}' for strain in STRAINS)]
+    for declarer in ['North', 'South', 'East', 'West']:
+        lines.append(f'{declarer[0]:<3}' + ''.join(f'{table[strain][declarer]:>3}' for strain in STRAINS))
+    return '\n'.join(lines)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter double-dummy solver')
+    parser.add_argument('sources', nargs='+', help='pbn, lin, json or dfc files')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--cache', default='', help='path of the cache of solved deals (default ~/.dealformatter/ddcache.json)')
+    parser.add_argument('--no-cache', action='store_true', help='solve every deal rather than using the cache')
+    return parser.parse_args(argv)
+
+def run(args):
+    import dealcodec
+    deals = []
+    for source in args.sources:
+        deals += list(dealcodec.read_corpus(source) if source.lower().endswith('.dfc') else dealcodec.read_sources([source]))
+    tables = solve_deals(deals, args.jobs, None if args.no_cache else Cache(args.cache))
+    for i, (deal, table) in enumerate(zip(deals, tables), 1):
+        print(f"Board {deal.get('Board number', i)}")
+        if table is None:
+            print('The hands do not hold the same number of cards\n')
+            continue
+        score, contracts = par(table, deal.get('Vulnerable', 'None'), deal.get('Dealer', 'North'))
+        print(format_table(table))
+        print(f"Par {score:+d} {' '.join(contracts)}\n" if score else 'Par 0\n')
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+Compact binary encoding of a deal, and corpus files holding many encoded deals.
+
+A deal is encoded as an 18 byte fixed part
+    13 bytes    the seat holding each card, 2 bits per card (index in globals.directions) in card index order
+     1 byte     dealer (bits 0-1), vulnerability (bits 2-3) and flags (bits 4-7)
+     4 bytes    board number
+followed by a variable length tail
+    the order of the seats, the players' names, the auction (a byte per call), the play (a byte per card),
+    and the keys of the deal not covered above (e.g. "Event" or "Alerts") as json.
+Counts and lengths in the tail are varints.  Hands are decoded in rank order, as main.prepare_deal sorts them.
+
+A corpus file is
+    MAGIC, the encoded deals one after another, an index of the offset of each deal (8 bytes each),
+    and a footer holding the offset of the index, the number of deals and MAGIC again.
+Corpus reads the file through mmap, so that deal n is found in constant time without reading the
+deals before it, and scanning the fixed parts (e.g. for a board number) reads no more than it needs.
+
+    python dealcodec.py pack <pbn, lin or json files> -o deals.dfc
+    python dealcodec.py unpack deals.dfc [--index n | --board n]
+"""
+
+import argparse
+import dealmodel
+import globals
+import json
+import mmap
+import struct
+import sys
+
+from typing import Iterable, Iterator, List, Tuple
+
+globals.initialize()
+
+MAGIC = b'DFCORP01'
+FIXED = struct.Struct('<13sBI')
+FOOTER = struct.Struct('<QQ8s')
+OFFSET = struct.Struct('<Q')
+
+VULNERABILITY = ['None', 'NS', 'EW', 'All']
+
+# flags
+HAS_VULNERABLE = 0x10
+HAS_BOARD = 0x20
+HAS_DEALER = 0x40
+PARTIAL = 0x80          # some cards are held by no seat; the tail holds the mask of the cards held
+
+# the keys of the tail that are present
+HAS_AUCTION = 1
+HAS_PLAY = 2
+HAS_SEATS = 4
+
+# a byte for each call: pass, double, redouble and the 35 bids; OTHER_CALL is followed by the call as text
+CALLS = ['P', 'D', 'R'] + [f'{level}{strain}' for level in range(1, 8) for strain in 'CDHSN']
+CALL_CODES = dict([(call, code) for code, call in enumerate(CALLS)])
+OTHER_CALL = 255
+
+CORE_KEYS = ['Board number', 'Dealer', 'Vulnerable', 'Auction', 'Seats', 'Play']
+
+
+def write_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def read_varint(data, offset: int) -> Tuple[int, int]:
+    # returns the value and the offset after it
+    n = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, offset
+        shift += 7
+
+def write_text(out: bytearray, text: str):
+    data = text.encode('utf-8')
+    write_varint(out, len(data))
+    out += data
+
+def read_text(data, offset: int) -> Tuple[str, int]:
+    length, offset = read_varint(data, offset)
+    return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+
+
+def encode(deal: dict) -> bytes:
+    # the binary encoding of a deal dictionary
+    seats = deal.get('Seats', [])
+    layout = 0
+    held = 0
+    for seat in seats:
+        hand = dealmodel.Hand.from_dict(seat.get('Hand', {}))
+        assert not any(hand.extra), f"Hand of {seat.get('Direction')} holds characters that are not cards"
+        assert not held & hand.mask, "A card is held by more than one seat"
+        held |= hand.mask
+        direction = globals.directions.index(seat['Direction'])
+        for index in dealmodel.mask_indexes(hand.mask):
+            layout |= direction << (2 * index)
+
+    flags = 0
+    if 'Dealer' in deal:
+        flags |= HAS_DEALER | globals.directions.index(deal['Dealer'])
+    if deal.get('Vulnerable') in VULNERABILITY:
+        flags |= HAS_VULNERABLE | VULNERABILITY.index(deal['Vulnerable']) << 2
+    board = deal.get('Board number')
+    if isinstance(board, int) and 0 <= board < 1 << 32:
+        flags |= HAS_BOARD
+    else:
+        board = 0
+    if held != dealmodel.ALL_CARDS:
+        flags |= PARTIAL
+    out = bytearray(FIXED.pack(layout.to_bytes(13, 'little'), flags, board))
+
+    keys = ('Auction' in deal) * HAS_AUCTION | ('Play' in deal) * HAS_PLAY | ('Seats' in deal) * HAS_SEATS
+    out.append(keys)
+    if flags & PARTIAL:
+        out += held.to_bytes(7, 'little')
+
+    # seats, in their order in the dictionary; a player's name is written with 1 added to its length, 0 if absent
+    out.append(len(seats))
+    for seat in seats:
+        out.append(globals.directions.index(seat['Direction']))
+        if 'Player' in seat:
+            data = seat['Player'].encode('utf-8')
+            write_varint(out, len(data) + 1)
+            out += data
+        else:
+            out.append(0)
+
+    auction = deal.get('Auction', [])
+    write_varint(out, len(auction))
+    for call in auction:
+        if call in CALL_CODES:
+            out.append(CALL_CODES[call])
+        else:
+            out.append(OTHER_CALL)
+            write_text(out, call)
+
+    play = deal.get('Play', [])
+    write_varint(out, len(play))
+    for card in play:
+        index = dealmodel.card_index(card)
+        assert index >= 0, f"Invalid card {card}"
+        out.append(index)
+
+    # everything else, e.g. "Event", "Alerts", or a board number that is not a number
+    rest = dict([(key, value) for key, value in deal.items() if key not in CORE_KEYS])
+    if 'Board number' in deal and not flags & HAS_BOARD:
+        rest['Board number'] = deal['Board number']
+    if 'Vulnerable' in deal and not flags & HAS_VULNERABLE:
+        rest['Vulnerable'] = deal['Vulnerable']
+    write_text(out, json.dumps(rest, separators=(',', ':')) if rest else '')
+    return bytes(out)
+
+def decode(data) -> dict:
+    # the deal dictionary of an encoding made by encode
+    layout, flags, board = FIXED.unpack_from(data)
+    layout = int.from_bytes(layout, 'little')
+    offset = FIXED.size
+    keys = data[offset]
+    offset += 1
+    held = dealmodel.ALL_CARDS
+    if flags & PARTIAL:
+        held = int.from_bytes(data[offset:offset + 7], 'little')
+        offset += 7
+
+    # the cards held by each direction
+    masks = [0, 0, 0, 0]
+    for index in dealmodel.mask_indexes(held):
+        masks[(layout >> (2 * index)) & 3] |= 1 << index
+
+    deal = {}
+    if flags & HAS_BOARD:
+        deal['Board number'] = board
+    if flags & HAS_DEALER:
+        deal['Dealer'] = globals.directions[flags & 3]
+    if flags & HAS_VULNERABLE:
+        deal['Vulnerable'] = VULNERABILITY[(flags >> 2) & 3]
+
+    count = data[offset]
+    offset += 1
+    seats = []
+    for i in range(count):
+        direction = data[offset]
+        seat = {}
+        length, offset = read_varint(data, offset + 1)
+        if length:
+            seat['Player'] = bytes(data[offset:offset + length - 1]).decode('utf-8')
+            offset += length - 1
+        seat['Direction'] = globals.directions[direction]
+        seat['Hand'] = dealmodel.Hand(masks[direction]).to_dict()
+        seats.append(seat)
+
+    count, offset = read_varint(data, offset)
+    auction = []
+    for i in range(count):
+        code = data[offset]
+        offset += 1
+        if code == OTHER_CALL:
+            call, offset = read_text(data, offset)
+            auction.append(call)
+        else:
+            auction.append(CALLS[code])
+    if keys & HAS_AUCTION:
+        deal['Auction'] = auction
+    if keys & HAS_SEATS:
+        deal['Seats'] = seats
+
+    count, offset = read_varint(data, offset)
+    if keys & HAS_PLAY:
+        deal['Play'] = [dealmodel.card_name(index) for index in data[offset:offset + count]]
+    offset += count
+
+    rest, offset = read_text(data, offset)
+    if rest:
+        deal.update(json.loads(rest))
+    return deal
+
+def board_number(data, offset: int = 0) -> int:
+    # the board number of the deal encoded at offset in data, read from its fixed part alone; 0 if it has none
+    layout, flags, board = FIXED.unpack_from(data, offset)
+    return board if flags & HAS_BOARD else 0
+
+
+def write_corpus(path: str, deals: Iterable[dict]) -> int:
+    # write deals to a corpus file, returning the number written
+    offsets = []
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        position = len(MAGIC)
+        for deal in deals:
+            record = encode(deal)
+            offsets.append(position)
+            f.write(record)
+            position += len(record)
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.write(FOOTER.pack(position, len(offsets), MAGIC))
+    return len(offsets)
+
+
+class Corpus:
+    # a corpus file read through mmap
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = memoryview(self.map)
+        assert self.data[:len(MAGIC)] == MAGIC, f"{path} is not a corpus file"
+        self.index_offset, self.count, magic = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        assert magic == MAGIC, f"{path} is not complete"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.release()
+        self.map.close()
+        self.file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def offset(self, n: int) -> int:
+        # the offset of deal n, read from the index (little-endian, whatever the byte order of the host)
+        return OFFSET.unpack_from(self.data, self.index_offset + OFFSET.size * n)[0]
+
+    def record(self, n: int) -> bytes:
+        # the encoding of deal n; a copy, so that the file can be closed whatever the caller keeps
+        end = self.offset(n + 1) if n + 1 < self.count else self.index_offset
+        return self.data[self.offset(n):end].tobytes()
+
+    def __getitem__(self, n: int) -> dict:
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        return decode(self.record(n))
+
+    def __iter__(self) -> Iterator[dict]:
+        for n in range(self.count):
+            yield decode(self.record(n))
+
+    def board_numbers(self) -> Iterator[int]:
+        # the board number of each deal, reading only the fixed parts
+        for n in range(self.count):
+            yield board_number(self.data, self.offset(n))
+
+    def find_board(self, board: int) -> List[int]:
+        # the indexes of the deals of a board
+        return [n for n, number in enumerate(self.board_numbers()) if number == board]
+
+def read_corpus(path: str) -> Iterator[dict]:
+    # yields each deal of a corpus file
+    with Corpus(path) as corpus:
+        yield from corpus
+
+
+def read_sources(sources: List[str]) -> Iterator[dict]:
+    import parselin
+    import parsepbn
+    for source in sources:
+        if source.lower().endswith('.pbn'):
+            yield from parsepbn.parse(source)
+        elif source.lower().endswith('.lin'):
+            yield from parselin.parse(source)
+        else:
+            # a deal saved by main.py, or a list of deals (e.g. from dealgen.py)
+            with open(source, 'r') as f:
+                deals = json.load(f)
+            yield from deals if isinstance(deals, list) else [deals]
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter binary deal corpus')
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help='write the deals of pbn, lin or json files to a corpus file')
+    pack.add_argument('sources', nargs='+', help='pbn, lin or json files')
+    pack.add_argument('-o', '--output', required=True, help='corpus file to write')
+    unpack = commands.add_parser('unpack', help='print the deals of a corpus file as json')
+    unpack.add_argument('corpus', help='corpus file')
+    unpack.add_argument('--index', type=int, help='print only the deal at this position')
+    unpack.add_argument('--board', type=int, help='print only the deals of this board')
+    return parser.parse_args(argv)
+
+def run(args):
+    if args.command == 'pack':
+        count = write_corpus(args.output, read_sources(args.sources))
+        print(f"{count} deals written to {args.output}")
+    else:
+        with Corpus(args.corpus) as corpus:
+            if args.index is not None:
+                indexes = [args.index]
+            elif args.board is not None:
+                indexes = corpus.find_board(args.board)
+            else:
+                indexes = range(len(corpus))
+            for n in indexes:
+                print(json.dumps(corpus[n]))
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Generate random deals that satisfy constraints, e.g. for teaching material.
+
+    python dealgen.py "South 15-17 balanced, North 5+ hearts 8+ hcp" -n 1000 --seed 7 -o deals.pbn
+    python dealgen.py "S 20-21 balanced" -n 24 --render="-nsewa --combine" -o handout
+
+A constraint is a seat followed by any number of conditions; constraints are separated by commas or
+semicolons, and a constraint without a seat applies to the seat before it.
+    seat        north, east, south, west or n, e, s, w
+    condition   <range> [hcp]          high card points, e.g. 15-17 or 15-17 hcp
+                <range> <suit>         length of a suit (spades, hearts, diamonds, clubs or s, h, d, c)
+                <range> controls       A = 2, K = 1
+                <range> ltc            losing trick count
+                balanced, semi-balanced or unbalanced
+    range       15-17, 5+ (at least), 3- (at most) or 4 (exactly)
+
+Deals are sampled by dealing random 52 bit card masks and rejecting deals that fail a constraint.  The deals are
+made in blocks of BLOCK deals, block k from seed "<seed>:<k>", so a seed always gives the same deals
+however many processes (-j) share the work.  Boards are numbered from 1 (or --first) with the dealer
+and vulnerability of a standard board of that number.
+
+Output goes to a pbn, json or dfc (dealcodec corpus) file, or with --render straight to main.py's
+html output, using the options given.
+"""
+
+import argparse
+import concurrent.futures
+import dealmodel
+import globals
+import handstats
+import json
+import random
+import re
+import shlex
+import sys
+
+from typing import Callable, Iterator, List
+
+globals.initialize()
+
+BLOCK = 100
+
+# deals tried in a block before giving up on constraints that are too hard
+MAX_TRIES = 1000000
+
+SEAT_WORDS = { 'n': 'North', 'north': 'North', 'e': 'East', 'east': 'East',
+        's': 'South', 'south': 'South', 'w': 'West', 'west': 'West' }
+SUIT_WORDS = { 's': 0, 'spades': 0, 'spade': 0, '♠': 0, 'h': 1, 'hearts': 1, 'heart': 1, '♥': 1,
+        'd': 2, 'diamonds': 2, 'diamond': 2, '♦': 2, 'c': 3, 'clubs': 3, 'club': 3, '♣': 3 }
+SHAPE_WORDS = { 'balanced': handstats.BALANCED, 'semi-balanced': handstats.SEMI_BALANCED, 'unbalanced': handstats.UNBALANCED }
+
+# dealer and vulnerability of boards 1 to 16
+BOARD_DEALERS = ['North', 'East', 'South', 'West']
+BOARD_VULNERABILITY = ['None', 'NS', 'EW', 'All', 'NS', 'EW', 'All', 'None',
+        'EW', 'All', 'None', 'NS', 'All', 'None', 'NS', 'EW']
+
+TOKEN_PATTERN = re.compile(r'(\d+)\s*(?:-\s*(\d+)|(\+)|(-))?|([a-z][a-z-]*|[♠♥♦♣])', re.IGNORECASE)
+
+
+# statistics of each possible holding in a suit, indexed by its 13 bit mask (bit 0 is the ace)
+SUIT_LENGTH = [bin(holding).count('1') for holding in range(1 << 13)]
+SUIT_HCP = [sum(handstats.HCP[rank] for rank in range(13) if holding >> rank & 1) for holding in range(1 << 13)]
+SUIT_CONTROLS = [sum(handstats.CONTROLS[rank] for rank in range(13) if holding >> rank & 1) for holding in range(1 << 13)]
+SUIT_LOSERS = [min(SUIT_LENGTH[holding], 3) - bin(holding & ((1 << min(SUIT_LENGTH[holding], 3)) - 1)).count('1')
+               for holding in range(1 << 13)]
+
+
+def suits(mask: int) -> List[int]:
+    return [(mask >> (13 * suit)) & 0x1fff for suit in range(4)]
+
+def condition(feature: str, low: int, high: int, suit: int = 0) -> Callable[[List[int]], bool]:
+    # a test of the suit holdings of a hand
+    if feature == 'length':
+        return lambda holdings: low <= SUIT_LENGTH[holdings[suit]] <= high
+    table = { 'hcp': SUIT_HCP, 'controls': SUIT_CONTROLS, 'ltc': SUIT_LOSERS }[feature]
+    return lambda holdings: low <= sum(table[holding] for holding in holdings) <= high
+
+def shape_condition(shapes: set) -> Callable[[List[int]], bool]:
+    return lambda holdings: handstats.shape_class([SUIT_LENGTH[holding] for holding in holdings]) in shapes
+
+def parse_terms(text: str) -> dict:
+    # returns { direction: [terms] }, a term being (feature, low, high, suit) for a feature 'hcp', 'length',
+    #   'controls' or 'ltc', or ('shape', shape classes) for the shape words of a clause
+    terms = {}
+    seat = None
+    for clause in re.split(r'[,;]', text):
+        tokens = TOKEN_PATTERN.findall(clause)
+        assert not TOKEN_PATTERN.sub('', clause).strip(), f"Cannot read the constraint '{clause.strip()}'"
+        words = [token[4].lower() for token in tokens]
+        if words and words[0] in SEAT_WORDS:
+            seat = SEAT_WORDS[words[0]]
+            tokens = tokens[1:]
+        if not tokens:
+            continue
+        assert seat, f"No seat for the constraint '{clause.strip()}'"
+        shapes = set()
+        i = 0
+        while i < len(tokens):
+            number, upper, plus, minus, word = tokens[i]
+            i += 1
+            if word:
+                assert word.lower() in SHAPE_WORDS, f"Unknown condition '{word}' in '{clause.strip()}'"
+                shapes.add(SHAPE_WORDS[word.lower()])
+                continue
+            low, high = int(number), int(upper) if upper else 40 if plus else int(number)
+            if minus:
+                low, high = 0, int(number)
+            unit = tokens[i][4].lower() if i < len(tokens) else ''
+            if unit in SUIT_WORDS:
+                terms.setdefault(seat, []).append(('length', low, high, SUIT_WORDS[unit]))
+                i += 1
+            elif unit in ('controls', 'ltc', 'losers'):
+                terms.setdefault(seat, []).append(('ltc' if unit == 'losers' else unit, low, high, 0))
+                i += 1
+            else:
+                if unit in ('hcp', 'points', 'pts'):
+                    i += 1
+                terms.setdefault(seat, []).append(('hcp', low, high, 0))
+        if shapes:
+            terms.setdefault(seat, []).append(('shape', shapes))
+    return terms
+
+def parse_constraints(text: str) -> dict:
+    # returns { direction: [conditions] }
+    return dict([(seat, [shape_condition(term[1]) if term[0] == 'shape' else condition(*term) for term in terms])
+                 for seat, terms in parse_terms(text).items()])
+
+def board_deal(board: int, masks: List[int]) -> dict:
+    # a deal dictionary for the board, masks being the cards of each direction in globals.directions order
+    return { 'Board number': board,
+            'Dealer': BOARD_DEALERS[(board - 1) % 4],
+            'Vulnerable': BOARD_VULNERABILITY[(board - 1) % 16],
+            'Auction': [],
+            'Seats': [{ 'Direction': direction, 'Hand': dealmodel.Hand(mask).to_dict() } for direction, mask in zip(globals.directions, masks)],
+            'Play': []
+            }
+
+def random_hand(rng: random.Random, free: int) -> int:
+    # 13 cards chosen at random from the mask free, drawing card indexes until 13 different free cards are found
+    mask = 0
+    count = 0
+    getrandbits = rng.getrandbits
+    while count < 13:
+        bit = 1 << getrandbits(6)
+        if bit & free and not bit & mask:
+            mask |= bit
+            count += 1
+    return mask
+
+def sample_block(text: str, seed: str, count: int, first_board: int) -> List[dict]:
+    # count deals satisfying the constraints, from a generator seeded with seed
+    # the constrained seats are dealt first, so that most deals are rejected after dealing a single hand;
+    #   the other seats share the cards left
+    rng = random.Random(seed)
+    tests = [(globals.directions.index(seat), conditions) for seat, conditions in parse_constraints(text).items()]
+    others = [seat for seat in range(4) if seat not in [seat for seat, conditions in tests]]
+    deals = []
+    tries = 0
+    while len(deals) < count:
+        tries += 1
+        assert tries <= MAX_TRIES, f"No deal found satisfying '{text}' in {MAX_TRIES} tries"
+        masks = [0, 0, 0, 0]
+        free = dealmodel.ALL_CARDS
+        for seat, conditions in tests:
+            mask = random_hand(rng, free)
+            holdings = suits(mask)
+            if not all(test(holdings) for test in conditions):
+                break
+            masks[seat] = mask
+            free ^= mask
+        else:
+            for seat in others[:-1]:
+                masks[seat] = random_hand(rng, free)
+                free ^= masks[seat]
+            if others:
+                masks[others[-1]] = free
+            deals.append(board_deal(first_board + len(deals), masks))
+    return deals
+
+def generate(text: str, count: int, seed=0, jobs: int = 1, first_board: int = 1) -> Iterator[dict]:
+    # yields count deals satisfying the constraints, in board order
+    parse_constraints(text)
+    blocks = [(text, f'{seed}:{k}', min(BLOCK, count - start), first_board + start) for k, start in enumerate(range(0, count, BLOCK))]
+    if jobs <= 1 or len(blocks) <= 1:
+        for block in blocks:
+            yield from sample_block(*block)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        for deals in executor.map(sample_block, *zip(*blocks)):
+            yield from deals
+
+
+def deal_pbn(deal: dict) -> str:
+    # the deal as a PBN game
+    seats = dict([(seat['Direction'], seat['Hand']) for seat in deal['Seats']])
+    hands = ' '.join('.'.join(seats[direction][suit] for suit in globals.suits) for direction in BOARD_DEALERS)
+    return (f'[Board "{deal["Board number"]}"]\n[Dealer "{deal["Dealer"][0]}"]\n'
+            f'[Vulnerable "{deal["Vulnerable"]}"]\n[Deal "N:{hands}"]\n\n')
+
+def write(deals: Iterator[dict], path: str) -> int:
+    # write deals to a pbn, json or dfc file, returning the number written
+    if path.lower().endswith('.dfc'):
+        import dealcodec
+        return dealcodec.write_corpus(path, deals)
+    count = 0
+    with open(path, 'w') as f:
+        if path.lower().endswith('.json'):
+            f.write('[\n')
+        for deal in deals:
+            if path.lower().endswith('.json'):
+                f.write((',\n' if count else '') + json.dumps(deal))
+            else:
+                f.write(deal_pbn(deal))
+            count += 1
+        if path.lower().endswith('.json'):
+            f.write('\n]\n')
+    return count
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter deal generator')
+    parser.add_argument('constraints', nargs='?', default='', help='constraints, e.g. "South 15-17 balanced, North 5+ hearts"')
+    parser.add_argument('-n', '--count', type=int, default=1, help='number of deals')
+    parser.add_argument('--seed', default='0', help='seed; the same seed and constraints give the same deals')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--first', type=int, default=1, help='number of the first board')
+    parser.add_argument('-o', '--output', default='deals.pbn', help='pbn, json or dfc file, or with --render the prefix of the html files')
+    parser.add_argument('--render', default=None, help='write html with these options to main.py instead of a deal file, e.g. --render="-nsewa --combine"')
+    return parser.parse_args(argv)
+
+def run(args):
+    deals = generate(args.constraints, args.count, args.seed, args.jobs, args.first)
+    if args.render is not None:
+        import main
+        render_args = main.parse_args(['-'] + shlex.split(args.render) + ['-o', args.output])
+        main.write_deals(deals, render_args)
+    else:
+        count = write(deals, args.output)
+        print(f"{count} deals written to {args.output}")
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
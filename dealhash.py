@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Fingerprints of deal layouts that do not change when a deal is rotated, and removal of duplicate deals.
+
+The same board reaches us many times: from the BBO urls of different tables, rotated with main.py -r,
+or typed in again with its suits written in another order.  The fingerprint of a deal depends only on
+which cards are held together and by which partnership seat, so all of these give the same fingerprint:
+
+    dealhash.fingerprint(deal)                  # a 64 bit integer
+    dealhash.fingerprint(buildhtml.rotate_deal(deal, 1)) == dealhash.fingerprint(deal)
+
+It is a Zobrist hash: every (seat, card) has a random 64 bit key, and the hash of a layout is the xor of
+the keys of its cards, so that it can be kept up to date one card at a time (Fingerprint.add and remove).
+One hash is kept for each of the 4 rotations of the layout, and the fingerprint is the smallest of them.
+Cards no hand holds (e.g. hidden hands) add nothing.  Different layouts may share a fingerprint, with a
+chance of about 1 in 2**62 for any two deals.
+
+    python dealhash.py dedup <pbn, lin, json or dfc files> -o unique.dfc [--groups groups.txt]
+    python dealhash.py fingerprint <pbn, lin, json or dfc files>
+
+dedup reads the deals once, writing the first deal of each layout and, with --groups, a line for every
+deal read giving its position, its fingerprint and the position of the deal it duplicates.  Only the
+fingerprints seen are kept in memory, in a FingerprintTable of 16 bytes a layout.
+"""
+
+import argparse
+import array
+import dealcodec
+import dealmodel
+import globals
+import json
+import random
+import sys
+
+from typing import Iterable, Iterator, Tuple
+
+globals.initialize()
+
+# KEYS[seat][card], seat being the index in globals.directions and card the dealmodel card index
+KEYS = (lambda rng: [[rng.getrandbits(64) for card in range(52)] for seat in range(4)])(random.Random('dealhash'))
+
+
+def seat_index(direction: str) -> int:
+    # 'North', 'north' and 'N' all return 1
+    return globals.directions.index(globals.seats.get(direction[:1].upper(), direction))
+
+
+class Fingerprint:
+    # the hashes of a layout in each rotation; hashes[r] is that of the layout rotated r seats clockwise
+    __slots__ = ('hashes',)
+
+    def __init__(self):
+        self.hashes = [0, 0, 0, 0]
+
+    @classmethod
+    def from_masks(cls, masks) -> 'Fingerprint':
+        # masks holds the cards of each seat in globals.directions order (None for a hand not known)
+        fingerprint = cls()
+        for seat, mask in enumerate(masks):
+            for card in dealmodel.mask_indexes(mask or 0):
+                fingerprint.add(seat, card)
+        return fingerprint
+
+    @classmethod
+    def from_deal(cls, deal: dict) -> 'Fingerprint':
+        masks = [0, 0, 0, 0]
+        for seat in deal.get('Seats', []):
+            if 'Hand' in seat:
+                masks[seat_index(seat['Direction'])] |= dealmodel.Hand.from_dict(seat['Hand']).mask
+        return cls.from_masks(masks)
+
+    def add(self, seat: int, card: int):
+        # the card is now held by the seat; adding it again removes it
+        hashes = self.hashes
+        for rotation in range(4):
+            hashes[rotation] ^= KEYS[(seat + rotation) % 4][card]
+
+    remove = add
+
+    def move(self, card: int, source: int, destination: int):
+        self.add(source, card)
+        self.add(destination, card)
+
+    @property
+    def value(self) -> int:
+        return min(self.hashes)
+
+    @property
+    def rotation(self) -> int:
+        # the rotation giving the fingerprint; deals with the same fingerprint line up when each is
+        #   rotated by its own rotation (buildhtml.rotate_deal)
+        return self.hashes.index(min(self.hashes))
+
+def fingerprint(deal: dict) -> int:
+    return Fingerprint.from_deal(deal).value
+
+
+class FingerprintTable:
+    # a map of fingerprints to positions held in two arrays with open addressing, so that a layout costs
+    #   16 bytes however many deals are read; 0 marks an empty slot, so fingerprint 0 is stored as 1
+    def __init__(self, capacity: int = 1 << 16):
+        self.keys = array.array('Q', bytes(8 * capacity))
+        self.values = array.array('q', bytes(8 * capacity))
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def slot(self, key: int) -> int:
+        # the slot holding key, or the empty slot where it would go
+        mask = len(self.keys) - 1
+        slot = key & mask
+        keys = self.keys
+        while keys[slot] and keys[slot] != key:
+            slot = (slot + 1) & mask
+        return slot
+
+    def setdefault(self, key: int, value: int) -> int:
+        # the value stored for key, storing value first if there is none
+        key = key or 1
+        slot = self.slot(key)
+        if self.keys[slot]:
+            return self.values[slot]
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.count += 1
+        if 2 * self.count > len(self.keys):
+            self.grow()
+        return value
+
+    def get(self, key: int, default: int = None) -> int:
+        slot = self.slot(key or 1)
+        return self.values[slot] if self.keys[slot] else default
+
+    def grow(self):
+        keys, values = self.keys, self.values
+        self.keys = array.array('Q', bytes(16 * len(keys)))
+        self.values = array.array('q', bytes(16 * len(values)))
+        for key, value in zip(keys, values):
+            if key:
+                slot = self.slot(key)
+                self.keys[slot] = key
+                self.values[slot] = value
+
+
+def groups(deals: Iterable[dict]) -> Iterator[Tuple[int, dict, int, int]]:
+    # yields (position, deal, fingerprint, position of the first deal with the fingerprint) for each deal
+    table = FingerprintTable()
+    for position, deal in enumerate(deals):
+        value = fingerprint(deal)
+        yield position, deal, value, table.setdefault(value, position)
+
+def unique(deals: Iterable[dict], report=None) -> Iterator[dict]:
+    # yields the first deal of each layout; report, if given, is called with (deal, first position) for each duplicate
+    for position, deal, value, first in groups(deals):
+        if first == position:
+            yield deal
+        elif report:
+            report(deal, first)
+
+
+def read_sources(sources) -> Iterator[dict]:
+    for source in sources:
+        if source.lower().endswith('.dfc'):
+            yield from dealcodec.read_corpus(source)
+        else:
+            yield from dealcodec.read_sources([source])
+
+def write(deals: Iterable[dict], path: str) -> int:
+    # write deals to a dfc or json file, returning the number written
+    if path.lower().endswith('.dfc'):
+        return dealcodec.write_corpus(path, deals)
+    assert path.lower().endswith('.json'), "Output must be a dfc or json file"
+    count = 0
+    with open(path, 'w') as f:
+        f.write('[\n')
+        for deal in deals:
+            f.write((',\n' if count else '') + json.dumps(deal))
+            count += 1
+        f.write('\n]\n')
+    return count
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter deal fingerprints')
+    commands = parser.add_subparsers(dest='command', required=True)
+    dedup = commands.add_parser('dedup', help='write the deals of the files given, leaving out repeated layouts')
+    dedup.add_argument('sources', nargs='+', help='pbn, lin, json or dfc files')
+    dedup.add_argument('-o', '--output', required=True, help='dfc or json file to write')
+    dedup.add_argument('--groups', default='', help='file for a line for every deal read: position, fingerprint, position of the first deal of its layout')
+    show = commands.add_parser('fingerprint', help='print the fingerprint of each deal')
+    show.add_argument('sources', nargs='+', help='pbn, lin, json or dfc files')
+    return parser.parse_args(argv)
+
+def run(args):
+    if args.command == 'fingerprint':
+        for position, deal in enumerate(read_sources(args.sources)):
+            print(f"{position} {deal.get('Board number', '')} {fingerprint(deal):016x}")
+        return
+
+    groups_file = open(args.groups, 'w') if args.groups else None
+    read = 0
+
+    def kept(deals):
+        nonlocal read
+        for position, deal, value, first in deals:
+            read += 1
+            if groups_file:
+                groups_file.write(f'{position} {value:016x} {first}\n')
+            if first == position:
+                yield deal
+    try:
+        count = write(kept(groups(read_sources(args.sources))), args.output)
+    finally:
+        if groups_file:
+            groups_file.close()
+    print(f"{read} deals read, {count} written to {args.output} ({read - count} duplicates)")
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+An index of a deal corpus (a dealcodec dfc file) for finding deals by the hands and the auction without
+decoding every deal; only the deals found are read from the corpus.
+
+    python dealindex.py build deals.dfc                     # writes deals.dfi
+    python dealindex.py query deals.dfc "North opened 1NT, South 5+ spades 5+ hearts"
+    python dealindex.py query deals.dfc "S 20-21 balanced" --render="-nsewa --combine" -o handout
+
+A query is a list of clauses separated by commas or semicolons:
+    hand clauses, as for dealgen.py, e.g. "South 15-17 balanced", "North 5+ hearts 8+ hcp" or "West 2- controls"
+    <seat> opened <call>        the first call other than a pass was the seat's, e.g. "North opened 1NT"
+    auction <calls>             the auction began with the calls, from the dealer, e.g. "auction 1S P 2N"
+Calls are written as in a PBN auction (1NT or 1N, Pass, X, XX).
+
+For each seat the index holds, as bitmaps of the deals (bit n for deal n of the corpus), the deals where
+the seat has at least v high card points, at least v cards in each suit, at least v controls and at least
+v losing tricks for every possible v, and the deals of each shape class.  A range is then the difference
+of two bitmaps and a clause the intersection of its ranges.  The bitmaps are Python integers, so each of
+these operations still goes through a bit per deal of the corpus: a hand query is quick because it is a
+few operations on whole words rather than a pass over decoded deals, but its time grows with the
+corpus.  The auctions are held in a trie with a branch for each dealer, each node listing the deals whose
+auction begins with the calls on the path to it, so that an auction query visits only the deals that
+match it.
+
+The index file is
+    MAGIC, the length of the header, the header (json: the number of deals, the size and modification
+    time of the corpus, and the offset of each bitmap), the bitmaps, and the trie as arrays of node
+    parents, calls, and offsets and counts into the array of deal positions that follows them.
+"""
+
+import argparse
+import array
+import dealcodec
+import dealgen
+import dealmodel
+import globals
+import handstats
+import json
+import mmap
+import os
+import parsepbn
+import re
+import shlex
+import struct
+import sys
+
+from typing import Dict, Iterator, List, Tuple
+
+globals.initialize()
+
+MAGIC = b'DFINDEX1'
+LENGTH = struct.Struct('<Q')
+
+# the largest value of each feature kept as "at least v" bitmaps
+FEATURE_MAX = { 'hcp': 37, 'length': 13, 'controls': 12, 'ltc': 12 }
+
+OPENED_PATTERN = re.compile(r'\s*(\w+)\s+open(?:s|ed)\s+(.+)$', re.IGNORECASE)
+AUCTION_PATTERN = re.compile(r'\s*auction\s+(.+)$', re.IGNORECASE)
+
+
+def bitmap_name(seat: str, feature: str, value: int, suit: int = 0) -> str:
+    # e.g. 'North hcp>=15', 'South length2>=5' (5 or more diamonds), 'East shape=0'
+    if feature == 'shape':
+        return f'{seat} shape={value}'
+    return f"{seat} {feature}{suit if feature == 'length' else ''}>={value}"
+
+def hand_features(mask: int) -> Dict[Tuple[str, int], int]:
+    # { (feature, suit): value } for a hand
+    holdings = dealgen.suits(mask)
+    lengths = [dealgen.SUIT_LENGTH[holding] for holding in holdings]
+    features = dict([(('length', suit), length) for suit, length in enumerate(lengths)])
+    features[('hcp', 0)] = sum(dealgen.SUIT_HCP[holding] for holding in holdings)
+    features[('controls', 0)] = sum(dealgen.SUIT_CONTROLS[holding] for holding in holdings)
+    features[('ltc', 0)] = sum(dealgen.SUIT_LOSERS[holding] for holding in holdings)
+    features[('shape', 0)] = handstats.shape_class(lengths)
+    return features
+
+def corpus_stamp(corpus_path: str) -> dict:
+    # the size and modification time of the corpus, which the index keeps so that it can tell when the
+    #   corpus has been written again since (dealcodec.write_corpus replaces the file)
+    status = os.stat(corpus_path)
+    return { 'corpus_bytes': status.st_size, 'corpus_mtime_ns': status.st_mtime_ns }
+
+def call_codes(auction: List[str]) -> List[int]:
+    # the dealcodec code of each call, up to the first that has none
+    codes = []
+    for call in auction:
+        if call not in dealcodec.CALL_CODES:
+            break
+        codes.append(dealcodec.CALL_CODES[call])
+    return codes
+
+
+def build(corpus_path: str, index_path: str) -> int:
+    # write the index of a corpus, returning the number of deals
+    with dealcodec.Corpus(corpus_path) as corpus:
+        count = len(corpus)
+        size = (count + 7) // 8
+        # bitmaps of the deals where a feature equals each value, made "at least" bitmaps once all are read
+        equal = {}
+        # the trie: node 0 is the root and nodes 1-4 the dealers in globals.directions order
+        parents = array.array('i', [-1, 0, 0, 0, 0])
+        calls = array.array('B', [0, 0, 1, 2, 3])
+        children = {}
+        positions = [[], [], [], [], []]
+        for n, deal in enumerate(corpus):
+            for seat in deal.get('Seats', []):
+                mask = dealmodel.Hand.from_dict(seat.get('Hand', {})).mask
+                for (feature, suit), value in hand_features(mask).items():
+                    bits = equal.setdefault((seat['Direction'], feature, suit, value), bytearray(size))
+                    bits[n >> 3] |= 1 << (n & 7)
+            if deal.get('Dealer') in globals.directions:
+                node = 1 + globals.directions.index(deal['Dealer'])
+                for code in call_codes(deal.get('Auction', [])):
+                    child = children.get((node, code))
+                    if child is None:
+                        child = children[(node, code)] = len(parents)
+                        parents.append(node)
+                        calls.append(code)
+                        positions.append([])
+                    positions[child].append(n)
+                    node = child
+
+    bitmaps = {}
+    for seat in globals.directions:
+        for feature, top in FEATURE_MAX.items():
+            for suit in range(4 if feature == 'length' else 1):
+                at_least = 0
+                for value in range(top, 0, -1):
+                    at_least |= int.from_bytes(equal.get((seat, feature, suit, value), b''), 'little')
+                    bitmaps[bitmap_name(seat, feature, value, suit)] = at_least
+        for shape in range(len(handstats.SHAPE_CLASSES)):
+            bitmaps[bitmap_name(seat, 'shape', shape)] = int.from_bytes(equal.get((seat, 'shape', 0, shape), b''), 'little')
+
+    starts = array.array('Q')
+    counts = array.array('I')
+    ids = array.array('I')
+    for node_positions in positions:
+        starts.append(len(ids))
+        counts.append(len(node_positions))
+        ids.extend(node_positions)
+
+    header = { 'count': count, 'bitmap_bytes': size, 'nodes': len(parents), **corpus_stamp(corpus_path) }
+    offset = 0
+    header['bitmaps'] = {}
+    for name in bitmaps:
+        header['bitmaps'][name] = offset
+        offset += size
+    header['trie'] = offset
+    data = json.dumps(header).encode('utf-8')
+    with open(index_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(LENGTH.pack(len(data)))
+        f.write(data)
+        for bitmap in bitmaps.values():
+            f.write(bitmap.to_bytes(size, 'little'))
+        for column in (parents, calls, starts, counts, ids):
+            f.write(column.tobytes())
+    return count
+
+
+class Index:
+    # the index of a corpus, read through mmap; bitmaps are read as they are needed
+    def __init__(self, corpus_path: str, index_path: str = ''):
+        self.corpus_path = corpus_path
+        self.path = index_path or default_path(corpus_path)
+        self.file = open(self.path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        assert self.map[:len(MAGIC)] == MAGIC, f"{self.path} is not an index file"
+        length, = LENGTH.unpack_from(self.map, len(MAGIC))
+        start = len(MAGIC) + LENGTH.size
+        self.header = json.loads(self.map[start:start + length].decode('utf-8'))
+        fresh = all(self.header.get(key) == value for key, value in corpus_stamp(corpus_path).items())
+        if not fresh:
+            self.close()
+        assert fresh, f"{self.path} is not the index of {corpus_path} as it is now; build it again"
+        self.data = start + length
+        self.count = self.header['count']
+        self.all = (1 << self.count) - 1
+        self.bitmaps = {}
+        self.children = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def bitmap(self, name: str) -> int:
+        if name not in self.bitmaps:
+            offset = self.data + self.header['bitmaps'][name]
+            self.bitmaps[name] = int.from_bytes(self.map[offset:offset + self.header['bitmap_bytes']], 'little')
+        return self.bitmaps[name]
+
+    def at_least(self, seat: str, feature: str, value: int, suit: int = 0) -> int:
+        if value <= 0:
+            return self.all
+        if value > FEATURE_MAX[feature]:
+            return 0
+        return self.bitmap(bitmap_name(seat, feature, value, suit))
+
+    def hands(self, terms: dict) -> int:
+        # the bitmap of the deals satisfying the terms of dealgen.parse_terms
+        result = self.all
+        for seat, seat_terms in terms.items():
+            for term in seat_terms:
+                if term[0] == 'shape':
+                    shapes = 0
+                    for shape in term[1]:
+                        shapes |= self.bitmap(bitmap_name(seat, 'shape', shape))
+                    result &= shapes
+                else:
+                    feature, low, high, suit = term
+                    result &= self.at_least(seat, feature, low, suit) & ~self.at_least(seat, feature, high + 1, suit)
+        return result
+
+    def trie(self):
+        # the columns of the trie, and the map of (node, call code) to child node, made the first time it is used
+        if self.children is None:
+            nodes = self.header['nodes']
+            offset = self.data + self.header['trie']
+            columns = []
+            for code, width in (('i', 4), ('B', 1), ('Q', 8), ('I', 4)):
+                columns.append(array.array(code, self.map[offset:offset + width * nodes]))
+                offset += width * nodes
+            self.parents, self.calls, self.starts, self.counts = columns
+            self.ids_offset = offset
+            self.children = dict([((parent, call), node) for node, (parent, call) in enumerate(zip(self.parents, self.calls)) if node > 4])
+        return self.children
+
+    def auction(self, dealer: int, calls: List[str]) -> array.array:
+        # the positions of the deals with the dealer whose auction begins with the calls
+        children = self.trie()
+        node = 1 + dealer
+        for code in [dealcodec.CALL_CODES[call] for call in calls]:
+            node = children.get((node, code))
+            if node is None:
+                return array.array('I')
+        return self.node_positions(node)
+
+    def node_positions(self, node: int) -> array.array:
+        start = self.ids_offset + 4 * self.starts[node]
+        return array.array('I', self.map[start:start + 4 * self.counts[node]])
+
+    def query(self, text: str) -> List[int]:
+        # the positions of the deals matching a query, in corpus order
+        auctions, terms = parse_query(text)
+        bitmap = self.hands(terms)
+        if auctions is None:
+            return list(bitmap_positions(bitmap, self.header['bitmap_bytes']))
+        # the deals matching every auction clause, each clause being a choice of (dealer, calls)
+        found = None
+        for choices in auctions:
+            positions = set()
+            for dealer, calls in choices:
+                positions.update(self.auction(dealer, calls))
+            found = positions if found is None else found & positions
+        if terms:
+            bits = bitmap.to_bytes(self.header['bitmap_bytes'], 'little')
+            found = [n for n in found if bits[n >> 3] >> (n & 7) & 1]
+        return sorted(found)
+
+    def deals(self, text: str) -> Iterator[dict]:
+        # the deals matching a query
+        with dealcodec.Corpus(self.corpus_path) as corpus:
+            for n in self.query(text):
+                yield corpus[n]
+
+
+def default_path(corpus_path: str) -> str:
+    return os.path.splitext(corpus_path)[0] + '.dfi'
+
+def bitmap_positions(bitmap: int, size: int) -> Iterator[int]:
+    # the positions of the bits set, skipping the bytes that are 0
+    data = bitmap.to_bytes(size, 'little')
+    for match in re.finditer(rb'[^\x00]', data):
+        byte = match.group()[0]
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield 8 * match.start() + bit
+
+def parse_query(text: str) -> Tuple[list, dict]:
+    # returns (auction clauses, hand terms); each auction clause is a list of the (dealer, calls) it allows,
+    #   and the auction clauses are None if there are none
+    auctions = []
+    hands = []
+    for clause in re.split(r'[,;]', text):
+        opened = OPENED_PATTERN.match(clause)
+        auction = AUCTION_PATTERN.match(clause)
+        if opened:
+            assert opened.group(1).lower() in dealgen.SEAT_WORDS, f"Unknown seat in '{clause.strip()}'"
+            seat = globals.directions.index(dealgen.SEAT_WORDS[opened.group(1).lower()])
+            calls = parsepbn.parse_auction([opened.group(2)])
+            assert len(calls) == 1 and calls[0] not in ('P', 'D', 'R'), f"Cannot read the opening bid in '{clause.strip()}'"
+            # the seat opens after the passes of the seats before it, from the dealer
+            auctions.append([(dealer, ['P'] * ((seat - dealer) % 4) + calls) for dealer in range(4)])
+        elif auction:
+            calls = parsepbn.parse_auction([auction.group(1).replace('-', ' ')])
+            assert calls and all(call in dealcodec.CALL_CODES for call in calls), f"Cannot read the auction in '{clause.strip()}'"
+            auctions.append([(dealer, calls) for dealer in range(4)])
+        else:
+            hands.append(clause)
+    return auctions or None, dealgen.parse_terms(','.join(hands))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter corpus index')
+    commands = parser.add_subparsers(dest='command', required=True)
+    make = commands.add_parser('build', help='index a corpus file')
+    make.add_argument('corpus', help='dfc file (see dealcodec.py pack)')
+    make.add_argument('-o', '--output', default='', help='index file (default: the corpus file with the extension .dfi)')
+    query = commands.add_parser('query', help='find the deals of a corpus that match a query')
+    query.add_argument('corpus', help='dfc file')
+    query.add_argument('query', help='e.g. "North opened 1NT, South 5+ spades 5+ hearts"')
+    query.add_argument('--index', default='', help='index file (default: the corpus file with the extension .dfi)')
+    query.add_argument('--count', action='store_true', help='print only the number of deals found')
+    query.add_argument('-o', '--output', default='output', help='with --render, the prefix of the html files')
+    query.add_argument('--render', default=None, help='write html of the deals found with these options to main.py, e.g. --render="-nsewa --combine"')
+    return parser.parse_args(argv)
+
+def run(args):
+    if args.command == 'build':
+        path = args.output or default_path(args.corpus)
+        count = build(args.corpus, path)
+        print(f"{count} deals indexed in {path}")
+        return
+    with Index(args.corpus, args.index) as index:
+        if args.count:
+            print(len(index.query(args.query)))
+        elif args.render is not None:
+            import main
+            render_args = main.parse_args(['-'] + shlex.split(args.render) + ['-o', args.output])
+            main.write_deals(index.deals(args.query), render_args)
+        else:
+            for deal in index.deals(args.query):
+                print(json.dumps(deal))
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
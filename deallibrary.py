@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+A local library of deals, kept in a SQLite database (by default ~/.dealformatter/library.sqlite), so
+that an old board or a whole event can be rendered again without parsing its source again.  Deals are
+added with the add command below, or by main.py --store as it reads them.
+
+Each deal is stored once, under a key which is a hash of the deal, with indexed columns for
+the board number, event, dealer, contract and source, and a row per player.
+
+    python deallibrary.py add <pbn, lin or json files, or BBO urls>
+    python deallibrary.py find [--board 12] [--event "Club game"] [--player PSMartin] [--dealer North]
+                               [--contract 7H] [--source <file or url>] [--limit 20]
+    python deallibrary.py show <key or key prefix>
+
+main.py reads deals from the library with an input of the form
+    lib:<key or key prefix>                        e.g. lib:3fa9c2
+    lib:<column>=<value>[,<column>=<value>...]     e.g. "lib:event=Club game,board=12"
+a value may hold commas, except before another <column>=, e.g. "lib:event=Spring Sectional, Day 2,board=3"
+"""
+
+import argparse
+import globals
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from typing import Iterable, Iterator, Optional, Tuple
+
+globals.initialize()
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.dealformatter', 'library.sqlite')
+
+# deals inserted in each transaction of add_many
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    key TEXT PRIMARY KEY,
+    board INTEGER,
+    event TEXT,
+    dealer TEXT,
+    contract TEXT,
+    source TEXT,
+    added REAL,
+    deal TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    key TEXT NOT NULL REFERENCES deals(key) ON DELETE CASCADE,
+    direction TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (key, direction)
+);
+CREATE INDEX IF NOT EXISTS deals_board ON deals(board);
+CREATE INDEX IF NOT EXISTS deals_event ON deals(event, board);
+CREATE INDEX IF NOT EXISTS deals_dealer ON deals(dealer);
+CREATE INDEX IF NOT EXISTS deals_contract ON deals(contract);
+CREATE INDEX IF NOT EXISTS deals_source ON deals(source, board);
+CREATE INDEX IF NOT EXISTS players_name ON players(name COLLATE NOCASE);
+"""
+
+# columns that find accepts, besides player
+COLUMNS = ['board', 'event', 'dealer', 'contract', 'source']
+
+# a comma that starts the next condition of a main.py library query
+QUERY_SEPARATOR = re.compile(r',(?=\s*(?:' + '|'.join(COLUMNS + ['player']) + r')\s*=)', re.IGNORECASE)
+
+
+def deal_key(deal: dict) -> str:
+    # hash of the canonical json of the deal
+    canonical = json.dumps(deal, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def contract(deal: dict) -> str:
+    # the contract given by the source, else the last bid of the auction and any double or redouble after it
+    if deal.get('Contract'):
+        return deal['Contract'].upper().replace('NT', 'N')
+    final = ''
+    for c in deal.get('Auction', []):
+        if re.match(r'[1-7]', c):
+            final = c
+        elif c in ('D', 'R') and final:
+            final = final[:2] + ('X' if c == 'D' else 'XX')
+    return final or ('Pass' if deal.get('Auction') else '')
+
+def deal_row(deal: dict, source: str) -> tuple:
+    board = deal.get('Board number')
+    return (deal_key(deal), board if isinstance(board, int) else None, deal.get('Event'), deal.get('Dealer'),
+            contract(deal), source, time.time(), json.dumps(deal))
+
+def parse_query(query: str) -> dict:
+    # 'event=Club game,board=12' -> { 'event': 'Club game', 'board': '12' }
+    # the query is split only at commas followed by a column and '=', so values may hold commas:
+    # 'event=Spring Sectional, Day 2,board=3' -> { 'event': 'Spring Sectional, Day 2', 'board': '3' }
+    conditions = {}
+    for condition in QUERY_SEPARATOR.split(query):
+        column, sep, value = condition.partition('=')
+        assert sep and column.strip().lower() in COLUMNS + ['player'], f"Invalid library query: {condition}"
+        conditions[column.strip().lower()] = value.strip()
+    return conditions
+
+
+class DealLibrary:
+    # skip_locked: when another process holds the library locked for longer than the timeout, print a warning
+    #   and store no more deals rather than raise, so that a run storing the deals it renders (e.g. an item of
+    #   batch.py) still renders them
+    def __init__(self, path: str = '', skip_locked: bool = False, timeout: float = 30):
+        self.path = path or DEFAULT_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # several processes (e.g. batch.py) may write at the same time; wait for each other's transactions
+        self.connection = sqlite3.connect(self.path, timeout=timeout)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+        self.skip_locked = skip_locked
+        self.locked = False
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+        self.closed = True
+
+    def insert(self, deals: list, source: str) -> int:
+        # insert deals not yet in the library, without committing; returns the number of deals given
+        rows = [deal_row(deal, source) for deal in deals]
+        self.connection.executemany('INSERT OR IGNORE INTO deals VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        players = [(row[0], seat['Direction'], seat['Player'])
+                   for row, deal in zip(rows, deals) for seat in deal.get('Seats', []) if seat.get('Player')]
+        self.connection.executemany('INSERT OR IGNORE INTO players VALUES (?, ?, ?)', players)
+        return len(rows)
+
+    def commit(self, deals: list, source: str) -> int:
+        # insert deals in a transaction of their own, returning the number stored
+        if self.locked:
+            return 0
+        try:
+            with self.connection:
+                return self.insert(deals, source)
+        except sqlite3.OperationalError as e:
+            if not (self.skip_locked and 'locked' in str(e)):
+                raise
+            self.locked = True
+            print(f"The deal library {self.path} is locked by another process; the deals read are not stored", file=sys.stderr)
+            return 0
+
+    def add(self, deal: dict, source: str = '') -> str:
+        # store a single deal, returning its key
+        self.commit([deal], source)
+        return deal_key(deal)
+
+    def add_many(self, deals: Iterable[dict], source: str = '', batch_size: int = BATCH_SIZE) -> int:
+        # store deals in transactions of batch_size deals, returning the number stored
+        count = 0
+        for batch in batches(deals, batch_size):
+            count += self.commit(batch, source)
+        return count
+
+    def store(self, deals: Iterable[dict], source: str = '', batch_size: int = BATCH_SIZE) -> Iterator[dict]:
+        # yield each deal while storing them in transactions of batch_size deals
+        # each deal is stored as it was when it was yielded, before any change made by the reader
+        pending = []
+        try:
+            for deal in deals:
+                pending.append(json.loads(json.dumps(deal)))
+                if len(pending) >= batch_size:
+                    self.add_many(pending, source, batch_size)
+                    pending = []
+                yield deal
+        finally:
+            # a reader that stopped early may close the generator only once the library is closed
+            if not self.closed:
+                self.add_many(pending, source, batch_size)
+
+    def keys(self, prefix: str) -> list:
+        # keys beginning with prefix
+        cursor = self.connection.execute('SELECT key FROM deals WHERE key >= ? AND key < ? ORDER BY key', (prefix, prefix + '\uffff'))
+        return [key for key, in cursor]
+
+    def get(self, key: str) -> Optional[dict]:
+        # the deal with key, which may be shortened to any prefix matching a single deal
+        keys = self.keys(key)
+        if not keys:
+            return None
+        assert len(keys) == 1, f"Key {key} matches {len(keys)} deals"
+        row = self.connection.execute('SELECT deal FROM deals WHERE key = ?', keys).fetchone()
+        return json.loads(row[0])
+
+    def find(self, limit: int = 0, **conditions) -> Iterator[Tuple[str, dict]]:
+        # yields (key, deal) for deals matching all conditions, e.g. find(event='Club game', board=12)
+        # in order of event, board and time added
+        where = []
+        values = []
+        for column, value in conditions.items():
+            if value is None or value == '':
+                continue
+            if column == 'player':
+                where.append('key IN (SELECT key FROM players WHERE name = ? COLLATE NOCASE)')
+            elif column == 'board':
+                where.append('board = ?')
+                value = int(value)
+            elif column == 'dealer':
+                where.append('dealer = ?')
+                value = globals.seats.get(str(value)[:1].upper(), value)
+            elif column == 'contract':
+                where.append('contract = ? COLLATE NOCASE')
+                value = str(value).upper().replace('NT', 'N')
+            elif column == 'source':
+                where.append('source = ?')
+                value = source_name(value)
+            elif column == 'event':
+                where.append('event = ? COLLATE NOCASE')
+            else:
+                assert column in COLUMNS, f"Unknown column {column}"
+                where.append(f'{column} = ?')
+            values.append(value)
+        sql = 'SELECT key, deal FROM deals'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY event, board, added'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        for key, deal in self.connection.execute(sql, values):
+            yield key, json.loads(deal)
+
+    def lookup(self, query: str) -> Iterator[dict]:
+        # the deals named by the part of a main.py input after 'lib:'
+        if '=' in query:
+            found = False
+            for key, deal in self.find(**parse_query(query)):
+                found = True
+                yield deal
+            assert found, f"No deals in the library match {query}"
+        else:
+            deal = self.get(query)
+            assert deal, f"No deal in the library with key {query}"
+            yield deal
+
+
+def batches(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_source(source: str) -> Iterator[dict]:
+    # the deals of a pbn, lin or json file, or of a BBO url
+    import parselin
+    import parsepbn
+    import parseurl
+    if source.startswith('http'):
+        yield parseurl.parse(source)
+    elif source.lower().endswith('.pbn'):
+        yield from parsepbn.parse(source)
+    elif source.lower().endswith('.lin'):
+        yield from parselin.parse(source)
+    else:
+        with open(source, 'r') as f:
+            yield json.load(f)
+
+def source_name(source: str) -> str:
+    # files are recorded by absolute path, urls as they are
+    return source if source.startswith('http') else os.path.abspath(source)
+
+def summary(key: str, deal: dict) -> str:
+    players = ', '.join(seat.get('Player', '') for seat in deal.get('Seats', []))
+    return f"{key[:12]}  {deal.get('Event', ''):<20} {deal.get('Board number', ''):>4}  {deal.get('Dealer', ''):<5}  {contract(deal):<5}  {players}"
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter deal library')
+    parser.add_argument('--library', default='', help='path of the library (default ~/.dealformatter/library.sqlite)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='store the deals of files or urls')
+    add.add_argument('sources', nargs='+', help='pbn, lin or json files, or BBO urls')
+    find = commands.add_parser('find', help='list matching deals')
+    for column in COLUMNS + ['player']:
+        find.add_argument(f'--{column}', default='', help=f'{column} to match')
+    find.add_argument('--limit', type=int, default=0, help='maximum number of deals to list')
+    show = commands.add_parser('show', help='print a deal as json')
+    show.add_argument('key', help='key of the deal, or a prefix of it')
+    return parser.parse_args(argv)
+
+def run(args):
+    with DealLibrary(args.library) as library:
+        if args.command == 'add':
+            for source in args.sources:
+                count = library.add_many(read_source(source), source_name(source))
+                print(f"{count} deals read from {source}")
+        elif args.command == 'find':
+            conditions = dict([(column, getattr(args, column)) for column in COLUMNS + ['player']])
+            for key, deal in library.find(limit=args.limit, **conditions):
+                print(summary(key, deal))
+        elif args.command == 'show':
+            deal = library.get(args.key)
+            assert deal, f"No deal in the library with key {args.key}"
+            print(json.dumps(deal, indent=2))
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Compact representation of the cards of a deal, for the hands of the dictionary format used elsewhere:
+        {
+                "Board number": <integer>,
+                "Dealer": <"North", "South", "East", or "West" >,
+                "Auction": <a list of calls eg. ['1C', 'D', 'R', '3N', 'P', 'P', 'P'] >,
+                "Seats": [ { "Player": ..., "Direction": ..., "Hand": { "Spades": ..., ... } }, ... ],
+                "Play": <a list of cards played, e.g. ["CK", "C8"]>
+            }
+
+A card is identified by its index, 13 * suit + rank, where suit is 0-3 for spades, hearts, diamonds and clubs
+and rank is 0-12 for A, K, Q, ..., 2.  A set of cards is an integer with one bit set for each card index,
+so taking the bits from lowest to highest gives the cards in display order.
+"""
+
+import globals
+
+from typing import Dict, Iterable, Iterator, List
+
+globals.initialize()
+
+SUIT_LETTERS = 'SHDC'
+RANKS = 'AKQJT98765432'
+SUIT_MASK = (1 << 13) - 1
+ALL_CARDS = (1 << 52) - 1
+
+def card_index(card: str) -> int:
+    # 'SA' returns 0, 'HK' returns 14, 'C2' returns 51, 'C10' returns 47
+    # returns -1 if card is not a valid card
+    suit = SUIT_LETTERS.find(card[:1].upper())
+    rank = card[1:].upper().replace('10', 'T')
+    if suit < 0 or len(rank) != 1 or rank not in RANKS:
+        return -1
+    return 13 * suit + RANKS.index(rank)
+
+def card_name(index: int) -> str:
+    # 0 returns 'SA', 51 returns 'C2'
+    return SUIT_LETTERS[index // 13] + RANKS[index % 13]
+
+def card_bit(card: str) -> int:
+    # returns the mask for a single card, or 0 if card is not a valid card
+    index = card_index(card)
+    return 1 << index if index >= 0 else 0
+
+def cards_mask(cards: Iterable[str]) -> int:
+    # ['SA', 'HK'] returns (1 << 0) | (1 << 14)
+    mask = 0
+    for card in cards:
+        mask |= card_bit(card)
+    return mask
+
+def mask_indexes(mask: int) -> Iterator[int]:
+    # yields the index of each card in mask, in display order
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def suit_ranks(mask: int, suit: int) -> str:
+    # the ranks held in one suit, e.g. 'AK5'
+    bits = (mask >> (13 * suit)) & SUIT_MASK
+    return ''.join(RANKS[index] for index in mask_indexes(bits))
+
+
+class Hand:
+    # the cards held by one seat
+    # extra holds, for each suit, characters that are not cards (such as x for a small card) in their original order
+    __slots__ = ('mask', 'extra')
+
+    def __init__(self, mask: int = 0, extra: tuple = ('', '', '', '')):
+        self.mask = mask
+        self.extra = extra
+
+    @classmethod
+    def from_suits(cls, suit_list: List[str]) -> 'Hand':
+        # input ['96432', 'KQ9', 'T5', '73']
+        mask = 0
+        extra = []
+        for suit, cards in enumerate(suit_list):
+            other = ''
+            for card in cards.upper():
+                bit = card_bit(SUIT_LETTERS[suit] + card)
+                if bit and not mask & bit:
+                    mask |= bit
+                else:
+                    other += card
+            extra.append(other)
+        return cls(mask, tuple(extra))
+
+    @classmethod
+    def from_dict(cls, hand: Dict[str, str]) -> 'Hand':
+        # input {'Spades': '96432', 'Hearts': 'KQ9', 'Diamonds': 'T5', 'Clubs': '73'}
+        return cls.from_suits([hand.get(suit, '') for suit in globals.suits])
+
+    def suit(self, suit: int) -> str:
+        # the cards held in one suit, in display order
+        return suit_ranks(self.mask, suit) + self.extra[suit]
+
+    def to_dict(self) -> Dict[str, str]:
+        return globals.build_hand([self.suit(suit) for suit in range(4)])
+
+    def __contains__(self, card: str) -> bool:
+        return bool(self.mask & card_bit(card))
+
+    def __len__(self) -> int:
+        return bin(self.mask).count('1') + sum(len(other) for other in self.extra)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Hand) and self.mask == other.mask and self.extra == other.extra
+
+    def __repr__(self) -> str:
+        return f"Hand({'.'.join(self.suit(suit) for suit in range(4))})"
+
+
+class Deal:
+    # a deal, with seats indexed by their position in globals.directions (West, North, East, South)
+    # hands and players hold None for a seat whose hand or player is not known
+    # play holds the index of each card played
+    # info holds any other keys of the dictionary format, e.g. "Vulnerable"
+    __slots__ = ('hands', 'players', 'order', 'dealer', 'board', 'auction', 'play', 'info')
+
+    def __init__(self):
+        self.hands = [None] * 4
+        self.players = [None] * 4
+        self.order = []
+        self.dealer = None
+        self.board = None
+        self.auction = None
+        self.play = None
+        self.info = {}
+
+    @classmethod
+    def from_dict(cls, deal: dict) -> 'Deal':
+        model = cls()
+        for key, value in deal.items():
+            if key == 'Seats':
+                for seat in value:
+                    direction = globals.directions.index(seat['Direction'])
+                    model.order.append(direction)
+                    if 'Hand' in seat:
+                        model.hands[direction] = Hand.from_dict(seat['Hand'])
+                    if 'Player' in seat:
+                        model.players[direction] = seat['Player']
+            elif key == 'Dealer' and value in globals.directions:
+                model.dealer = globals.directions.index(value)
+            elif key == 'Board number':
+                model.board = value
+            elif key == 'Auction':
+                model.auction = list(value)
+            elif key == 'Play':
+                model.play = [card_index(card) for card in value]
+                if -1 in model.play:
+                    # keep the original list so that to_dict returns it unchanged
+                    model.info[key] = value
+            else:
+                model.info[key] = value
+        return model
+
+    def to_dict(self) -> dict:
+        deal = {}
+        if self.board is not None:
+            deal['Board number'] = self.board
+        if self.dealer is not None:
+            deal['Dealer'] = globals.directions[self.dealer]
+        if self.auction is not None:
+            deal['Auction'] = list(self.auction)
+        if self.order:
+            seats = []
+            for direction in self.order:
+                seat = {}
+                if self.players[direction] is not None:
+                    seat['Player'] = self.players[direction]
+                seat['Direction'] = globals.directions[direction]
+                if self.hands[direction] is not None:
+                    seat['Hand'] = self.hands[direction].to_dict()
+                seats.append(seat)
+            deal['Seats'] = seats
+        if self.play is not None:
+            deal['Play'] = [card_name(index) for index in self.play if index >= 0]
+        deal.update(self.info)
+        return deal
+
+    def rotate(self, n: int) -> 'Deal':
+        # returns the deal rotated n seats clockwise, as layout.rotate_deal rotates the dictionary format:
+        #   the hands, players and dealer move, and so do the declarer, the double dummy table and the vulnerability
+        rotated = Deal()
+        for direction in range(4):
+            rotated.hands[(direction + n) % 4] = self.hands[direction]
+            rotated.players[(direction + n) % 4] = self.players[direction]
+        rotated.order = [(direction + n) % 4 for direction in self.order]
+        rotated.dealer = None if self.dealer is None else (self.dealer + n) % 4
+        rotated.board = self.board
+        rotated.auction = self.auction
+        rotated.play = self.play
+        rotated.info = dict(self.info)
+        if rotated.info.get('Declarer') in globals.directions:
+            rotated.info['Declarer'] = shift(rotated.info['Declarer'], n)
+        if 'Double dummy' in rotated.info:
+            rotated.info['Double dummy'] = dict([(strain, dict([(shift(direction, n), tricks) for direction, tricks in row.items()]))
+                                                 for strain, row in rotated.info['Double dummy'].items()])
+        if n % 2 and rotated.info.get('Vulnerable') in ('NS', 'EW'):
+            rotated.info['Vulnerable'] = 'EW' if rotated.info['Vulnerable'] == 'NS' else 'NS'
+        return rotated
+
+    def seat_of(self, card: str) -> str:
+        # returns the direction holding card, or '' if no hand holds it
+        bit = card_bit(card)
+        for direction, hand in enumerate(self.hands):
+            if hand is not None and hand.mask & bit:
+                return globals.directions[direction]
+        return ''
+
+    def played_mask(self, n: int) -> int:
+        # the cards played in the first n cards of the play
+        mask = 0
+        for index in (self.play or [])[:n]:
+            if index >= 0:
+                mask |= 1 << index
+        return mask
+
+
+def shift(direction: str, n: int) -> str:
+    # returns direction n places clockwise, e.g. shift("South", 1) returns "West"
+    return globals.directions[(globals.directions.index(direction) + n) % 4]
+
+def sort_hands(deal: dict) -> dict:
+    # sort the cards of each suit of each hand in the deal, in place
+    # input  {'Spades': '5ka', ...}
+    # output {'Spades': 'AK5', ...}
+    deal.update(Deal.from_dict(deal).to_dict())
+    return deal
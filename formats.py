@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+The formats a layout (layout.build) can be written in, for main.py --formats.
+
+    page = layout.build(deal, args)
+    for name in ['html', 'txt', 'md', 'svg']:
+        formats.write(page, name, 'output-12-nsewa')      # writes output-12-nsewa.html, .txt, .md and .svg
+
+Each format is a function of a layout returning the whole document; the name of the format is the
+extension of the files written.  A new backend only needs an entry in FORMATS.
+"""
+
+import buildhtml
+import constants
+import layout
+import plaintext
+import svgdiagram
+
+FORMATS = {
+    'html': lambda page: constants.STYLE + ''.join(buildhtml.layout_chunks(page)),
+    'txt': plaintext.text,
+    'md': plaintext.markdown,
+    'svg': svgdiagram.svg,
+}
+
+
+def parse(text: str) -> list:
+    # the names of a comma separated list of formats, e.g. 'html,txt'
+    names = [name.strip().lower() for name in text.split(',') if name.strip()]
+    for name in names:
+        assert name in FORMATS, f"Format {name} should be one of {', '.join(FORMATS)}"
+    return names
+
+def render(page: layout.Layout, name: str) -> str:
+    return FORMATS[name](page)
+
+def write(page: layout.Layout, name: str, filename_base: str) -> str:
+    # write the layout in the format to <filename_base>.<name>, returning the name of the file
+    filename = f'{filename_base}.{name}'
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(render(page, name))
+    return filename
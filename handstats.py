@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Hand statistics (high card points, suit lengths, shape, losing trick count and controls) for every seat of
+a set of deals, computed with NumPy over an array of deals x seats x 52 cards.
+
+    cards = handstats.pack(deals)               # or handstats.pack_corpus(dealcodec.Corpus(path))
+    stats = handstats.statistics(cards)         # { 'hcp': deals x seats, 'lengths': deals x seats x suits, ... }
+
+Seats are in the order of globals.directions and suits in the order spades, hearts, diamonds, clubs;
+card k of a seat is the card with index k in dealmodel (13 * suit + rank, rank 0 being the ace).
+
+NumPy is only needed for the arrays, and is only imported by the functions that make or read them; hand_stats
+gives the statistics of a single hand without it, and is what buildhtml uses to annotate the hands of a
+diagram (main.py --stats).
+"""
+
+import dealmodel
+import globals
+
+from typing import Dict, Iterable
+
+globals.initialize()
+
+# points and controls of A, K, Q, J by rank
+HCP = [4, 3, 2, 1] + [0] * 9
+CONTROLS = [2, 1] + [0] * 11
+
+# shape classes, by suit lengths sorted longest first
+BALANCED, SEMI_BALANCED, UNBALANCED = 0, 1, 2
+SHAPE_CLASSES = ['balanced', 'semi-balanced', 'unbalanced']
+BALANCED_SHAPES = {(4, 3, 3, 3), (4, 4, 3, 2), (5, 3, 3, 2)}
+SEMI_BALANCED_SHAPES = {(5, 4, 2, 2), (6, 3, 2, 2)}
+
+
+def shape_class(lengths) -> int:
+    shape = tuple(sorted(lengths, reverse=True))
+    return BALANCED if shape in BALANCED_SHAPES else SEMI_BALANCED if shape in SEMI_BALANCED_SHAPES else UNBALANCED
+
+def suit_losers(ranks: str) -> int:
+    # losing tricks in a suit: of the top min(length, 3) cards, those that are not the A, K or Q
+    top = min(len(ranks), 3)
+    return top - sum(1 for rank in 'AKQ'[:top] if rank in ranks)
+
+def hand_stats(hand: Dict[str, str]) -> dict:
+    # statistics of a single hand, e.g. { 'hcp': 13, 'lengths': [4, 3, 3, 3], 'shape': 'balanced', 'ltc': 7, 'controls': 4 }
+    mask = dealmodel.Hand.from_dict(hand).mask
+    ranks = [dealmodel.suit_ranks(mask, suit) for suit in range(4)]
+    indexes = [index % 13 for index in dealmodel.mask_indexes(mask)]
+    lengths = [len(suit) for suit in ranks]
+    return { 'hcp': sum(HCP[rank] for rank in indexes),
+            'lengths': lengths,
+            'shape': SHAPE_CLASSES[shape_class(lengths)],
+            'ltc': sum(suit_losers(suit) for suit in ranks),
+            'controls': sum(CONTROLS[rank] for rank in indexes)
+            }
+
+def format_shape(lengths) -> str:
+    # [5, 3, 3, 2] returns '5-3-3-2'
+    return '-'.join(str(length) for length in lengths)
+
+
+def require_numpy():
+    # NumPy, imported the first time the arrays are needed rather than with the module
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    assert numpy is not None, "handstats needs NumPy for statistics over many deals (pip install numpy)"
+    return numpy
+
+def pack(deals: Iterable[dict]) -> 'np.ndarray':
+    # a boolean array of deals x seats x 52 cards, True where the seat holds the card
+    np = require_numpy()
+    masks = []
+    for deal in deals:
+        row = [0, 0, 0, 0]
+        for seat in deal.get('Seats', []):
+            row[globals.directions.index(seat['Direction'])] = dealmodel.Hand.from_dict(seat.get('Hand', {})).mask
+        masks.append(row)
+    # spread each 52 bit mask over 8 little-endian bytes, then over bits
+    data = np.array(masks, dtype='<u8').reshape(len(masks), 4).view(np.uint8).reshape(len(masks), 4, 8)
+    return np.unpackbits(data, axis=-1, bitorder='little')[:, :, :52].astype(bool)
+
+def pack_corpus(corpus) -> 'np.ndarray':
+    # the array of pack for the deals of a dealcodec.Corpus, read from the layouts of its records
+    # cards held by no seat (in deals that are not complete) are given to West
+    np = require_numpy()
+    layouts = np.frombuffer(b''.join(bytes(corpus.record(n)[:13]) for n in range(len(corpus))), dtype=np.uint8).reshape(-1, 13)
+    # each byte holds the seats of 4 cards, 2 bits each, lowest bits first
+    seats = np.stack([(layouts >> shift) & 3 for shift in (0, 2, 4, 6)], axis=-1).reshape(-1, 52)
+    return seats[:, None, :] == np.arange(4, dtype=np.uint8)[None, :, None]
+
+def statistics(cards: 'np.ndarray') -> dict:
+    # statistics for every seat of every deal in an array made by pack
+    #   'hcp', 'controls', 'ltc', 'shape' (index into SHAPE_CLASSES): deals x seats
+    #   'lengths': deals x seats x suits
+    np = require_numpy()
+    suits = cards.reshape(cards.shape[0], 4, 4, 13)
+    lengths = suits.sum(axis=-1)
+    hcp = suits @ np.array(HCP)
+    controls = suits @ np.array(CONTROLS)
+
+    # losing tricks: of the top min(length, 3) ranks of each suit, those not held
+    top = np.minimum(lengths, 3)
+    counted = np.arange(3) < top[..., None]
+    ltc = (top - (suits[..., :3] & counted).sum(axis=-1)).sum(axis=-1)
+
+    # shape classes from the lengths sorted longest first, as a code such as 5332
+    ordered = -np.sort(-lengths, axis=-1)
+    code = ordered @ np.array([1000, 100, 10, 1])
+    shape = np.full(code.shape, UNBALANCED)
+    shape[np.isin(code, [int(''.join(map(str, s))) for s in SEMI_BALANCED_SHAPES])] = SEMI_BALANCED
+    shape[np.isin(code, [int(''.join(map(str, s))) for s in BALANCED_SHAPES])] = BALANCED
+    return { 'hcp': hcp.sum(axis=-1),
+            'lengths': lengths,
+            'shape': shape,
+            'ltc': ltc,
+            'controls': controls.sum(axis=-1)
+            }
+
+
+# for testing
+if __name__ == '__main__':
+    import sys
+    import dealcodec
+    with dealcodec.Corpus(sys.argv[1]) as corpus:
+        stats = statistics(pack_corpus(corpus))
+    print(stats['hcp'])
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+The layout of a deal: what a diagram shows and where, worked out once for a deal and the options of main.py,
+for backends that write it out in a format of their own (formats.py).
+
+    page = layout.build(deal, args)
+    buildhtml.layout_chunks(page)       # html, as buildhtml.build writes it
+    plaintext.text(page)                # a text diagram for email and newsgroups
+    plaintext.markdown(page)            # Markdown for forums
+    svgdiagram.svg(page)                # a standalone SVG image
+
+The layout decides which hands are shown and at which seat (after rotating the deal), which cards are left,
+grayed or whited once cards are played, which cards are on the felt, where the empty cells of the auction go
+and when the last passes become (All pass).  It holds no markup: cards are ranks as the deal writes them
+('T' for the ten), calls are abbreviations ('1N', 'P', 'D', 'R') and suits are letters (SHDC).
+
+    page.single         the HandBox of a hand shown on its own, or None
+    page.hands          the HandBox of each hand of a diagram, keyed by the direction it is shown at,
+                        or None if there is no diagram
+    page.felt           the cards of the current trick as (direction, card) in the order played,
+                        or None for an empty table
+    page.auction        the Auction, or None
+    page.double_dummy   the DoubleDummy tricks and par, or None
+
+layout.replay(deal, args) lays out a page replaying the play (--replay) in the same way, the suits of its hands
+giving each card's position in the play and its state before and after (replay_suits).
+"""
+
+import copy
+import dealmodel
+import globals
+import handstats
+import playengine
+import profiling
+
+from typing import Dict, List, Tuple
+
+globals.initialize()
+
+# what happens to a card once it is played: it goes, stays grayed, or is whited out at the end of its suit
+REMOVE = 'remove'
+GRAY = 'gray'
+WHITE = 'white'
+# the state of a card still held
+SHOWN = 'shown'
+
+# the cell taking the place of the last three passes
+ALL_PASS = '(All pass)'
+
+
+class HandBox:
+    # a hand as it is shown
+    #   direction   the direction it is shown at
+    #   player      the name of the player, or None
+    #   stats       (high card points, shape) as dealt, with --stats, else None
+    #   suits       [(suit letter, [(rank, state), ...]), ...] for each suit shown, or None if the hand is not known
+    __slots__ = ('direction', 'player', 'stats', 'suits')
+
+    def __init__(self, direction: str, player: str = None, stats: Tuple[int, str] = None, suits: list = None):
+        self.direction = direction
+        self.player = player
+        self.stats = stats
+        self.suits = suits
+
+
+class Auction:
+    #   directions  True to show the directions above the names of the players
+    #   names       the names of the players, West first
+    #   cells       the calls, West first; '' for each empty cell before dealer's first call
+    __slots__ = ('directions', 'names', 'cells')
+
+    def __init__(self, directions: bool, names: List[str], cells: List[str]):
+        self.directions = directions
+        self.names = names
+        self.cells = cells
+
+
+class DoubleDummy:
+    #   table       the tricks of each declarer in each strain, { strain: { direction: tricks } }
+    #   score       the par score for North-South
+    #   contracts   the par contracts, as ddsolver.par gives them
+    __slots__ = ('table', 'score', 'contracts')
+
+    def __init__(self, table: Dict[str, Dict[str, int]], score: int, contracts: List[str]):
+        self.table = table
+        self.score = score
+        self.contracts = contracts
+
+
+class Board:
+    # what the layout of every frame of a deal (-p) shares, worked out once by prepare
+    #   deal            the deal rotated by -r
+    #   play            the playengine.Play of the rotated deal
+    #   auction         the Auction, or None
+    #   double_dummy    the DoubleDummy, or None
+    __slots__ = ('deal', 'play', 'auction', 'double_dummy')
+
+    def __init__(self, deal: dict, play: playengine.Play, auction: Auction, double_dummy: DoubleDummy):
+        self.deal = deal
+        self.play = play
+        self.auction = auction
+        self.double_dummy = double_dummy
+
+
+class Layout:
+    __slots__ = ('mode', 'vertical', 'single', 'hands', 'felt', 'auction', 'double_dummy')
+
+    def __init__(self):
+        self.mode = REMOVE
+        self.vertical = False
+        self.single = None
+        self.hands = None
+        self.felt = None
+        self.auction = None
+        self.double_dummy = None
+
+
+# the rotation of a single direction is that of the model of the deal
+shift = dealmodel.shift
+
+def rotate_deal(deal: dict, n: int) -> dict:
+    # rotates deal n seats counter-clockwise
+    deal["Dealer"] = shift(deal["Dealer"], n)
+    if deal.get('Declarer') in globals.directions:
+        deal['Declarer'] = shift(deal['Declarer'], n)
+    for seat in deal['Seats']:
+        seat["Direction"] = shift(seat["Direction"], n)
+    if 'Double dummy' in deal:
+        deal['Double dummy'] = dict([(strain, dict([(shift(direction, n), tricks) for direction, tricks in row.items()]))
+                                     for strain, row in deal['Double dummy'].items()])
+    if n % 2 and deal.get('Vulnerable') in ('NS', 'EW'):
+        deal['Vulnerable'] = 'EW' if deal['Vulnerable'] == 'NS' else 'NS'
+    return deal
+
+def rotated(deal: dict, n: int) -> dict:
+    # a copy of the deal rotated n seats, going through its model (dealmodel.Deal) rather than copying the dictionary
+    if not n:
+        return deal
+    return dealmodel.Deal.from_dict(deal).rotate(n).to_dict()
+
+def card_mode(args) -> str:
+    # what happens to played cards: -W whites them out, -g grays them, otherwise they go
+    if args and getattr(args, 'white', False):
+        return WHITE
+    if args and getattr(args, 'gray', False):
+        return GRAY
+    return REMOVE
+
+def excluded(args) -> set:
+    # the letters of the suits left out (-x), lower case
+    return set((getattr(args, 'exclude', '') or '').lower()) if args else set()
+
+def played_mask(deal: dict, args) -> int:
+    # the cards played in the first args.played cards of the play
+    if args and (getattr(args, 'played', 0) or 0) > 0 and deal and 'Play' in deal:
+        return dealmodel.cards_mask(deal['Play'][:args.played])
+    return 0
+
+def hand_suits(hand: Dict[str, str], played: int, mode: str, exclude: set) -> list:
+    # [(suit letter, [(rank, state), ...]), ...] of the suits of the hand not excluded
+    # played cards are left out, grayed where they are, or whited out after the cards still held
+    # input:  {'Spades': 'AK5', 'Hearts': 'KT43', ...}, the mask of SK, mode GRAY
+    # output: [('S', [('A', SHOWN), ('K', GRAY), ('5', SHOWN)]), ('H', [('K', SHOWN), ('T', SHOWN), ...]), ...]
+    suits = []
+    for suit in globals.suits:
+        letter = suit[0]
+        if letter.lower() in exclude:
+            continue
+        cards = []
+        whited = []
+        for rank in hand[suit]:
+            if not played & dealmodel.card_bit(letter + rank):
+                cards.append((rank, SHOWN))
+            elif mode == GRAY:
+                cards.append((rank, GRAY))
+            elif mode == WHITE:
+                whited.append((rank, WHITE))
+        suits.append((letter, cards + whited))
+    return suits
+
+def hand_box(seat: dict, args, played: int = 0, stats: bool = False) -> HandBox:
+    # the HandBox of a seat of the deal; stats adds the high card points and shape
+    box = HandBox(seat['Direction'], seat.get('Player'))
+    if 'Hand' in seat:
+        if stats:
+            hand_stats = handstats.hand_stats(seat['Hand'])
+            box.stats = (hand_stats['hcp'], handstats.format_shape(hand_stats['lengths']))
+        box.suits = hand_suits(seat['Hand'], played, card_mode(args), excluded(args))
+    return box
+
+def replay_suits(hand: Dict[str, str], positions: Dict[int, int], mode: str, exclude: set) -> list:
+    # the suits of a hand replayed one card at a time (--replay), for a page to show after any number of cards
+    # [(suit letter, [(rank, position, held, played), ...]), ...]: position is that of the card in the play
+    #   (1 for the opening lead) or None if it is not played, held is its state before then and played its
+    #   state after, REMOVE for a card not shown; in WHITE mode a card played comes again after the cards of
+    #   its suit, where hand_suits whites it out, so that after n cards replay_state gives what hand_suits does
+    # input:  {'Spades': 'AK5', ...}, { index of SK: 2 }, mode WHITE
+    # output: [('S', [('A', None, SHOWN, SHOWN), ('K', 2, SHOWN, REMOVE), ('5', None, SHOWN, SHOWN), ('K', 2, REMOVE, WHITE)]), ...]
+    suits = []
+    for suit in globals.suits:
+        letter = suit[0]
+        if letter.lower() in exclude:
+            continue
+        cards = []
+        whited = []
+        for rank in hand[suit]:
+            position = positions.get(dealmodel.card_index(letter + rank))
+            if position is None:
+                cards.append((rank, None, SHOWN, SHOWN))
+            elif mode == GRAY:
+                cards.append((rank, position, SHOWN, GRAY))
+            else:
+                cards.append((rank, position, SHOWN, REMOVE))
+                if mode == WHITE:
+                    whited.append((rank, position, REMOVE, WHITE))
+        suits.append((letter, cards + whited))
+    return suits
+
+def replay_state(suits: list, n: int) -> list:
+    # the suits of replay_suits once n cards are played, laid out as hand_suits lays them out
+    state = []
+    for letter, cards in suits:
+        shown = [(rank, held if position is None or position > n else played) for rank, position, held, played in cards]
+        state.append((letter, [(rank, card) for rank, card in shown if card != REMOVE]))
+    return state
+
+def felt(deal: dict, play: playengine.Play, args, rotation: int = 0) -> List[Tuple[str, str]]:
+    # the cards of the current trick after args.played cards, as (direction, card), or None if the table is empty
+    # rotation places the cards of a play replayed on the deal before it was rotated that many seats
+    n = getattr(args, 'played', 0) or 0
+    if n == 0 or getattr(args, 'clear', False):
+        return None
+    cards = []
+    for position in play.trick(n):
+        direction = play.seat(position)
+        if direction and rotation:
+            direction = shift(direction, rotation)
+        cards.append((direction, deal['Play'][position]))
+    return cards
+
+def auction_calls(auction: List[str]) -> List[str]:
+    # the calls of the auction as they are shown, the last three passes becoming ALL_PASS
+    # input: ['1C', 'P', '2C', 'P', '3N', 'P', 'P', 'P']
+    # output: ['1C', 'P', '2C', 'P', '3N', ALL_PASS]
+    calls = list(auction)
+    if len(calls) > 3:
+        if calls[-3:] == ['P', 'P', 'P']:
+            calls[-3:] = [ALL_PASS]
+        if calls[-1] == 'P':
+            del calls[-1]
+    return calls
+
+def auction_cells(auction: List[str], dealer: str) -> List[str]:
+    # the cells of the auction, West first, with an empty cell for each seat before dealer
+    # input: ['1C', 'P', 'P', 'P'], North dealer
+    # output: ['', '1C', ALL_PASS]
+    return [''] * (globals.directions.index(dealer) % 4) + auction_calls(auction)
+
+def player_names(deal: dict) -> List[str]:
+    # the names of the players, West first
+    players = dict([(seat['Direction'], seat.get('Player', '')) for seat in deal['Seats']])
+    return [players[direction] for direction in globals.directions]
+
+def auction(deal: dict, args) -> Auction:
+    # the Auction shown with -a (with the directions) or -A (without), else None
+    if getattr(args, 'auction', False):
+        directions = True
+    elif getattr(args, 'auction_no_header', False):
+        directions = False
+    else:
+        return None
+    return Auction(directions, player_names(deal), auction_cells(deal['Auction'], deal['Dealer']))
+
+def double_dummy(deal: dict, args=None) -> DoubleDummy:
+    # the tricks and par of a deal solved by main.py --dd, if args ask for them (or are not given)
+    if (args and not getattr(args, 'dd', False)) or 'Double dummy' not in deal:
+        return None
+    import ddsolver
+    score, contracts = ddsolver.par(deal['Double dummy'], deal.get('Vulnerable', 'None'), deal.get('Dealer', 'North'))
+    return DoubleDummy(deal['Double dummy'], score, contracts)
+
+def par_line(table: DoubleDummy, contract_text) -> str:
+    # e.g. 'Par NS 1430: 7H N', contract_text formatting each contract
+    if not table.score:
+        return 'Par 0'
+    return f"Par {'NS' if table.score > 0 else 'EW'} {abs(table.score)}: " + ', '.join(contract_text(contract) for contract in table.contracts)
+
+def prepare(deal: dict, args) -> Board:
+    # the parts of the layout that do not depend on the number of cards played (-p): rotating the deal,
+    #   following its play and solving its par are done once for all the frames of the deal
+    with profiling.stage('copy'):
+        deal = rotated(deal, getattr(args, 'rotate', 0) or 0)
+    return Board(deal, playengine.Play(deal), auction(deal, args), double_dummy(deal, args))
+
+def build(deal: dict, args, board: Board = None) -> Layout:
+    # the layout of the deal with the options of main.py: the hands of -nesw, rotated by -r, after -p cards
+    #   are played, with the auction of -a or -A and the double-dummy table of --dd
+    # board, if given, is prepare(deal, args) for the same deal and options other than -p
+    board = board or prepare(deal, args)
+    deal = board.deal
+    page = Layout()
+    page.mode = card_mode(args)
+    page.vertical = bool(getattr(args, 'vertical', False))
+    seats = dict([(seat['Direction'], seat) for seat in deal['Seats']])
+    shown = [direction for direction in globals.directions if getattr(args, direction.lower(), False)]
+    played = board.play.played_mask(getattr(args, 'played', 0) or 0) if 'Play' in deal else 0
+
+    # a single hand is shown on its own, without its direction, player or statistics
+    if len(shown) == 1:
+        if 'Hand' in seats.get(shown[0], {}):
+            page.single = hand_box(seats[shown[0]], args, played)
+    elif len(shown) > 1:
+        page.hands = dict([(direction, hand_box(seats[direction], args, played, getattr(args, 'stats', False)))
+                           for direction in shown if direction in seats])
+        page.felt = felt(deal, board.play, args)
+
+    page.auction = board.auction
+    page.double_dummy = board.double_dummy
+    return page
+
+def replay(deal: dict, args, board: Board = None) -> Layout:
+    # the layout of a replay of the play (--replay): that of build before any card is played, the suits of
+    #   each hand being those of replay_suits, and no felt (the page puts every card played on it)
+    board = board or prepare(deal, args)
+    args = copy.copy(args)
+    args.played = 0
+    page = build(deal, args, board)
+    seats = dict([(seat['Direction'], seat) for seat in board.deal['Seats']])
+    positions = {}
+    for position, index in enumerate(board.play.cards, 1):
+        if index >= 0:
+            positions.setdefault(index, position)
+    for box in ([page.single] if page.single else []) + list((page.hands or {}).values()):
+        if box.suits is not None:
+            box.suits = replay_suits(seats[box.direction]['Hand'], positions, page.mode, excluded(args))
+    return page
@@ -8,18 +8,33 @@ Created on Sat Apr 10 11:33:59 2021
 """
 import argparse
 import buildhtml
-import inputdeal
+import constants
+import dealmodel
+import itertools
 import json
+import parselin
+import parsepbn
 import parseurl
 import globals
 import os
+import profiling
 import re
+import rendercache
 import sys
+import templates
+
+from typing import Iterator, Tuple
+
+# the modules of the features only some runs use (the library, corpus files, --dd, --views, --formats,
+#   --watch) are imported where they are used, so that a single render starts quickly
+
+# buffer for the combined document, so that boards reach the disk in large writes
+COMBINED_BUFFER_SIZE = 1024 * 1024
 
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description='Deal Formatter Tool', )
-    parser.add_argument('input', help='html string, path to pbn file, * for console input, or ** for previous deal ')
+    parser.add_argument('input', help='html string, path to pbn, lin, json or dfc (binary corpus) file, * for console input, ** for previous deal, or lib:<key or query> for deals in the library')
     parser.add_argument('-n', '--north', action='store_true', help='print North hand')
     parser.add_argument('-e', '--east', action='store_true', help='print East hand')
     parser.add_argument('-s', '--south', action='store_true', help='print South hand')
@@ -36,194 +51,508 @@ def parse_args(argv):
     parser.add_argument('-x', '--exclude', default='', help='suits to exclude (shdc, e.g. "shc")')
     parser.add_argument('-u', '--url', action='store_true', help='write BBO-format url from saved json and exit')
     parser.add_argument('-c', '--clear', action='store_true', help='do not display played cards on table')
+    parser.add_argument('--stats', action='store_true', help='show the high card points and shape of each hand in a diagram')
+    parser.add_argument('--dd', action='store_true', help='show the double-dummy tricks of each declarer and the par score below the auction')
+    parser.add_argument('--dd-jobs', type=int, default=1, help='number of processes solving deals for --dd')
+    parser.add_argument('--dd-cache', default='', help='path of the cache of solved deals (default ~/.dealformatter/ddcache.json)')
+    parser.add_argument('--replay', action='store_true', help='write a single page stepping through the play')
+    parser.add_argument('--no-cache', action='store_true', help='always build the html rather than using the render cache')
+    parser.add_argument('--cache-dir', default='', help='directory of the render cache (default ~/.dealformatter/cache)')
+    parser.add_argument('--combine', action='store_true', help='write every board of the input to a single html file')
+    parser.add_argument('--library', default='', help='path of the deal library (default ~/.dealformatter/library.sqlite)')
+    parser.add_argument('--store', action='store_true', help='store the deals read in the deal library')
+    parser.add_argument('--no-library', action='store_true', help='do not store the deals read in the deal library (the default, kept for older scripts)')
+    parser.add_argument('--profile', action='store_true', help='time each stage of the run, print a summary and write the metrics to <output>-profile.json')
+    parser.add_argument('--cprofile', action='store_true', help='with --profile, also run cProfile, writing its statistics to <output>-profile.prof')
+    parser.add_argument('--dedup', action='store_true', help='leave out deals whose layout, in any rotation, repeats that of a deal read before')
+    parser.add_argument('--watch', action='store_true', help='keep running, rendering again the boards of the input that change; the input may be a pbn, lin, json or dfc file or a directory of them')
+    parser.add_argument('--poll', action='store_true', help='with --watch, check modification times rather than use inotify (e.g. on network drives)')
+    parser.add_argument('--debounce', type=float, default=0.3, help='with --watch, seconds without further changes before rendering')
+    parser.add_argument('--views', default='', help='comma separated views of each deal to write in one pass, each written as the letters of its options (nesw, a or A, v, r<k>), e.g. nsewa,s,nsa,nsewar2')
+    parser.add_argument('--formats', default='html', help='comma separated formats to write each deal in, laid out once for all of them: html, txt (plain text), md (Markdown) and svg')
+    parser.add_argument('--tracemalloc', action='store_true', help='with --profile, also measure the peak memory allocated (slows the run down)')
     return parser.parse_args(argv)
 
 
-def main(args):
+def build_url(deal: dict) -> str:
+    # Build BBO-format URL that parseurl.parse can read
     globals.initialize()
-    assert '.' not in args.output, "Output file name should be prefix only"
+    directions_south_first = globals.directions[globals.directions.index('South'):] + globals.directions[:globals.directions.index('South')]
 
-    # Build the switch string based on specified seat switches
-    attr_map = {'n': 'north', 's': 'south', 'e': 'east', 'w': 'west', 'a': 'auction', 'A': 'auction_no_header'}
-    seat_switches = ''.join(c for c in 'nsewaA' if getattr(args, attr_map[c], False))
-    filename_base = args.output + ('-' + seat_switches if seat_switches else '')
+    # map directions to seats
+    seat_map = {seat.get('Direction', ''): seat for seat in deal.get('Seats', [])}
+
+    # players in order South, West, North, East
+    players = [seat_map.get(d, {}).get('Player', '') for d in directions_south_first]
+    players_str = ','.join(players)
 
+    # build hand strings in same order
+    hands = []
+    for i, d in enumerate(directions_south_first):
+        seat = seat_map.get(d, {})
+        hand = seat.get('Hand', {})
+        s = hand.get('Spades', '')
+        h = hand.get('Hearts', '')
+        dmt = hand.get('Diamonds', '')
+        c = hand.get('Clubs', '')
+        # first hand needs dealer digit prefix
+        if i == 0:
+            dealer = deal.get('Dealer', globals.directions[0])
+            d_idx = globals.directions.index(dealer) if dealer in globals.directions else 0
+            num = (d_idx + 2) % 4
+            if num == 0:
+                num = 4
+            prefix = str(num)
+        else:
+            prefix = ''
+        hand_str = f"{prefix}S{s}H{h}D{dmt}C{c}"
+        hands.append(hand_str)
+
+    md_param = ','.join(hands)
+
+    # auction
+    auction = ''.join(deal.get('Auction', []))
+
+    # play cards as repeated pc entries
+    play_entries = ''
+    for card in deal.get('Play', []):
+        play_entries += f'pc|{card}|' 
+
+    # board
+    board = deal.get('Board number', None)
+    board_part = f'Board%20{board}|' if board is not None else ''
+
+    url = f"https://www.bridgebase.com/tools/handviewer.html?lin=pn|{players_str}|st||md|{md_param}|ah|{board_part}mb|{auction}|{play_entries}"
+    return url
 
+
+def main(args):
+    globals.initialize()
+    assert '.' not in os.path.basename(args.output), "Output file name should be prefix only"
+
+    # the library is opened to read a lib: input, or with --store to keep the deals read; it is closed once
+    #   the deals, which are read as they are rendered, have all been written
+    library = None
+    if args.input.startswith('lib:') or args.store:
+        import deallibrary
+        library = deallibrary.DealLibrary(args.library, skip_locked=True)
+    try:
+        return render_input(args, library)
+    finally:
+        if library:
+            library.close()
+
+def render_input(args, library) -> list:
+    # read the deal or deals of args.input and write them, returning the names of the files written
     deal = {}
+    deals = None
 
-    # build deal
-    if args.input == '**':
+    # build deal (a json input naming the save file itself is the previous deal)
+    if args.input == '**' or os.path.abspath(args.input) == os.path.abspath(args.output + ".json"):
         save_file = open(args.output + ".json", "r")
         deal = json.load(save_file)
         save_file.close()
         # If requested, convert saved JSON back into a BBO-format URL and write to a .txt file
         if getattr(args, 'url', False):
-            # Build BBO-format URL that parseurl.parse can read
-            globals.initialize()
-            directions_south_first = globals.directions[globals.directions.index('South'):] + globals.directions[:globals.directions.index('South')]
-
-            # map directions to seats
-            seat_map = {seat.get('Direction', ''): seat for seat in deal.get('Seats', [])}
-
-            # players in order South, West, North, East
-            players = [seat_map.get(d, {}).get('Player', '') for d in directions_south_first]
-            players_str = ','.join(players)
-
-            # build hand strings in same order
-            hands = []
-            for i, d in enumerate(directions_south_first):
-                seat = seat_map.get(d, {})
-                hand = seat.get('Hand', {})
-                s = hand.get('Spades', '')
-                h = hand.get('Hearts', '')
-                dmt = hand.get('Diamonds', '')
-                c = hand.get('Clubs', '')
-                # first hand needs dealer digit prefix
-                if i == 0:
-                    dealer = deal.get('Dealer', globals.directions[0])
-                    d_idx = globals.directions.index(dealer) if dealer in globals.directions else 0
-                    num = (d_idx + 2) % 4
-                    if num == 0:
-                        num = 4
-                    prefix = str(num)
-                else:
-                    prefix = ''
-                hand_str = f"{prefix}S{s}H{h}D{dmt}C{c}"
-                hands.append(hand_str)
-
-            md_param = ','.join(hands)
-
-            # auction
-            auction = ''.join(deal.get('Auction', []))
-
-            # play cards as repeated pc entries
-            play_entries = ''
-            for card in deal.get('Play', []):
-                play_entries += f'pc|{card}|' 
+            url = build_url(deal)
 
-            # board
-            board = deal.get('Board number', None)
-            board_part = f'Board%20{board}|' if board is not None else ''
-
-            url = f"https://www.bridgebase.com/tools/handviewer.html?lin=pn|{players_str}|st||md|{md_param}|ah|{board_part}mb|{auction}|{play_entries}"
-
-            out_txt = filename_base + '.txt'
+            out_txt = output_base(args) + '.txt'
             with open(out_txt, 'w') as tf:
                 tf.write(url)
             print(f"BBO-format url written to {out_txt}")
-            return
+            return [out_txt]
     else:
+        import deallibrary
+        # with --store, every deal read is stored in the library, unless it came from the library
+        store = library.add if library and not args.input.startswith('lib:') else lambda deal, source: None
         save_file = open(args.output + ".json", "w")
         if args.input == '*':
+            import inputdeal
             deal = inputdeal.inputDeal()
             json.dump(deal, save_file)
+            store(deal, 'console')
         elif re.match("http", args.input):
-            deal = parseurl.parse(args.input)
+            with profiling.stage('parse'):
+                deal = parseurl.parse(args.input)
             json.dump(deal, save_file)
-        elif args.input.lower().endswith('.pbn') and os.path.exists(args.input):
-            # Parse a PBN file and build deal structure
-            with open(args.input, 'r') as pf:
-                pbn_text = pf.read()
-
-            deal = {}
-            # Board number
-            m = re.search(r'\[Board\s+"?(\d+)"?\]', pbn_text)
-            if m:
-                deal['Board number'] = int(m.group(1))
-
-            # Deal tag: format like N:hand1 hand2 hand3 hand4
-            m = re.search(r'\[Deal\s+"?([NESW]:[^"\]]+)"?\]', pbn_text)
-            if m:
-                deal_str = m.group(1).strip()
-                first_dir = deal_str[0]
-                hands_str = deal_str[2:].strip()
-                hand_tokens = hands_str.split()
-                # Ensure we have four hands
-                if len(hand_tokens) >= 4:
-                    globals.initialize()
-                    # Map first hand to direction and proceed clockwise
-                    clockwise = ['North', 'East', 'South', 'West']
-                    start_dir = globals.seats.get(first_dir.upper(), 'North')
-                    si = clockwise.index(start_dir)
-                    directions_order = clockwise[si:] + clockwise[:si]
-                    seats = []
-                    for dir_name, hand_token in zip(directions_order, hand_tokens[:4]):
-                        suits = hand_token.split('.')
-                        # normalize ranks (uppercase, T for 10)
-                        suits = [s.replace('10', 'T').upper() for s in suits]
-                        seats.append({ 'Direction': dir_name, 'Hand': globals.build_hand(suits) })
-                    deal['Seats'] = seats
-
-            # Dealer tag (optional)
-            m = re.search(r'\[Dealer\s+"?([NESW])"?\]', pbn_text)
-            if m:
-                deal['Dealer'] = globals.seats.get(m.group(1).upper(), '')
-
-            # Attempt to extract auction lines between the [Auction] tag and the following blank line or '{}' block
-            m = re.search(r'\[Auction[^\]]*\][\r\n]+([^\{\[]+)', pbn_text)
-            if m:
-                auction_block = m.group(1).strip()
-                # Split on whitespace and normalize tokens (convert Pass to P etc.)
-                tokens = [t.strip() for t in re.split(r'\s+', auction_block) if t.strip()]
-                # Basic normalization: map Pass -> P, Double -> D, Redouble -> R, NoTrump/N -> N
-                norm = []
-                for t in tokens:
-                    tt = t.upper()
-                    if tt in ('PASS', 'P'):
-                        norm.append('P')
-                    elif tt in ('DOUBLE', 'D'):
-                        norm.append('D')
-                    elif tt in ('REDOUBLE', 'R'):
-                        norm.append('R')
-                    else:
-                        norm.append(tt.replace('NT', 'N'))
-                if norm:
-                    deal['Auction'] = norm
-
+            store(deal, args.input)
+        elif args.input.lower().endswith('.json') and os.path.exists(args.input):
+            # a deal saved by an earlier run
+            with profiling.stage('parse'), open(args.input, 'r') as jf:
+                deal = json.load(jf)
+            json.dump(deal, save_file)
+            store(deal, deallibrary.source_name(args.input))
+        elif args.input.startswith('lib:') or (args.input.lower().endswith(('.pbn', '.lin', '.dfc')) and os.path.exists(args.input)):
+            # Read deals from the library or a corpus file, or parse a PBN or LIN file board by board;
+            #   the first board goes in the save file
+            if args.input.startswith('lib:'):
+                deals = library.lookup(args.input[4:])
+            else:
+                if args.input.lower().endswith('.dfc'):
+                    import dealcodec
+                    deals = dealcodec.read_corpus(args.input)
+                else:
+                    deals = parsepbn.parse(args.input) if args.input.lower().endswith('.pbn') else parselin.parse(args.input)
+                if library:
+                    deals = library.store(deals, deallibrary.source_name(args.input))
+            deals = profiling.iterate('parse', deals)
+            if args.dedup:
+                import dealhash
+                deals = dealhash.unique(deals, lambda deal, first: print(
+                    f"Board {deal.get('Board number', '')} has the layout of deal {first + 1}; it is left out"))
+            deal = next(deals, {})
             json.dump(deal, save_file)
+            following = next(deals, None)
+            deals = itertools.chain([deal, following], deals) if following else None
         save_file.close()
 
-    assert deal, 'Input must be *, **, or start with http'
+    assert deal, 'Input must be *, **, a pbn, lin, json or dfc file, or start with http or lib:'
 
+    # several boards: render each one as it is read, adding the board number to the file names
+    return write_deals(deals, args) if deals else write_deals([deal], args, numbered=False)
+
+
+def output_base(args, board=None, prefix: str = None) -> str:
+    # common prefix of the html files, e.g. output-12-nsewa for board 12 with -nsewa
+    # prefix replaces args.output, e.g. for the files of each input of --watch
+    # Build the switch string based on specified seat switches
+    attr_map = {'n': 'north', 's': 'south', 'e': 'east', 'w': 'west', 'a': 'auction', 'A': 'auction_no_header'}
+    seat_switches = ''.join(c for c in 'nsewaA' if getattr(args, attr_map[c], False))
+    return (args.output if prefix is None else prefix) + (f'-{board}' if board is not None else '') + ('-' + seat_switches if seat_switches else '')
+
+def write_deals(deals, args, numbered: bool = True) -> list:
+    # render deals, writing each one as it is read, and return the names of the files written
+    # numbered adds the board number to the file names
+    if args.dd:
+        with profiling.stage('dd'):
+            deals = solve_double_dummy(deals, args)
+    if args.combine:
+        # one document for all the boards
+        return write_combined(deals, args, output_base(args))
+    if args.views:
+        return write_views(deals, args, numbered)
+    if args.formats != 'html':
+        return write_formats(deals, args, numbered)
+
+    cache = None if args.no_cache else rendercache.RenderCache(args.cache_dir)
+    filenames = []
+    for board, deal in board_names(deals):
+        with profiling.deal():
+            filenames += write_deal(deal, args, output_base(args, board if numbered else None), cache)
+    if cache:
+        cache.evict()
+    return filenames
+
+def solve_double_dummy(deals, args) -> list:
+    # add the double-dummy trick table to each deal that can be solved
+    # solving is slow, so the deals are all read first and solved together over args.dd_jobs processes
+    import ddsolver
+    deals = list(deals)
+    tables = ddsolver.solve_deals(deals, args.dd_jobs, ddsolver.Cache(args.dd_cache))
+    for deal, table in zip(deals, tables):
+        if table:
+            deal['Double dummy'] = table
+    return deals
+
+def board_names(deals) -> Iterator[Tuple[str, dict]]:
+    # yields (name, deal) for each deal, the name being the board number unless it has been seen before
+    boards = set()
+    for i, deal in enumerate(deals, 1):
+        board = deal.get('Board number', i)
+        if board in boards:
+            # e.g. the same board played in both rooms of a match
+            board = f'{board}_{i}'
+        boards.add(board)
+        yield board, deal
+
+def frame_numbers(deal: dict, args) -> list:
+    # a replay shows every card played in one document
+    if args.replay:
+        return ['replay']
+    # if 'played' is negative, show all played cards
+    elif args.played < 0:
+        return list(range(1, len(deal.get('Play', [])) + 1))
+    else:
+        return [args.played]
+
+def frame_chunks(deal: dict, args, style: bool = True):
+    # yields (frame number, chunks of html) for each frame_number
+    if args.replay:
+        yield 'replay', buildhtml.build_replay_chunks(deal, args, style)
+    elif args.played < 0:
+        yield from buildhtml.build_play_sequence_chunks(deal, args, style)
+    else:
+        yield args.played, buildhtml.build_chunks(deal, args, style)
+
+def render_frames(deal: dict, args):
+    # yields (frame number, html) for each frame_number
+    for n, chunks in frame_chunks(deal, args):
+        yield n, ''.join(chunks)
+
+def prepare_deal(deal: dict, args) -> dict:
     # Preprocess: sort suit lists in each hand
-    suit_order = 'AKQJT98765432x'
-    for seat in deal.get('Seats', []):
-        hand = seat.get('Hand', {})
-        for suit in ['Spades', 'Hearts', 'Diamonds', 'Clubs']:
-            cards = hand.get(suit, '')
-            # Convert to uppercase before sorting
-            cards = cards.upper()
-            sorted_cards = ''.join(sorted(cards, key=lambda c: suit_order.index(c) if c in suit_order else 99))
-            hand[suit] = sorted_cards
+    profiling.count('deals')
+    profiling.count('cards played', len(deal.get('Play', [])))
+    with profiling.stage('prepare'):
+        dealmodel.sort_hands(deal)
 
     # change name of South player if specified
     if args.name:
         for seat in deal['Seats']:
             if seat['Direction'] == 'South':
                 seat['Player'] = args.name
-
-    # if 'played' is negative, show all played cards
-    if args.played < 0:
-        played_list = list(range(1, len(deal.get('Play', [])) + 1))
-    else:
-        played_list = [args.played]
-
-    for n in played_list:
-        suffix = f"-{n}" if n > 0 else ''
-
-        # build html
-        args.played = n
-        html = buildhtml.build(deal, args)
-    
-        # write it to the specified file
+    return deal
+
+def write_deal(deal: dict, args, filename_base: str, cache: rendercache.RenderCache = None, only: set = None) -> list:
+    # render the deal and write the html, returning the names of the files written
+    # only, if given, holds the frame numbers to write; the other frames are left as they are
+    prepare_deal(deal, args)
+
+    frames = frame_chunks(deal, args)
+    keys = {}
+    hit = False
+    if cache:
+        # if every frame is cached, nothing needs to be built
+        with profiling.stage('cache'):
+            keys = dict([(n, cache.key(deal, args, None if n == 'replay' else n)) for n in frame_numbers(deal, args) if only is None or n in only])
+            cached = [(n, cache.get(key)) for n, key in keys.items()]
+        hit = all(html is not None for n, html in cached)
+        if hit:
+            frames = [(n, [html]) for n, html in cached]
+
+    filenames = []
+    for n, chunks in profiling.iterate('build', frames):
+        if only is not None and n not in only:
+            continue
+        suffix = f"-{n}" if n else ''
         filename = filename_base + suffix + ".html"
-        f = open(filename, 'w')
-        f.write(html)
-        f.close()
-
+        filenames.append(filename)
+        if cache:
+            with profiling.stage('cache'):
+                current = cache.is_current(filename, keys[n])
+            if current:
+                print(f"Html in {filename} is unchanged")
+                continue
+        if cache and not hit:
+            # keep the pieces for the cache entry
+            with profiling.stage('build'):
+                chunks = list(chunks)
+    
+        # write it to the specified file, the pieces being built as they are written
+        with profiling.stage('write'):
+            f = open(filename, 'w')
+            buildhtml.write(profiling.iterate('build', chunks), f)
+            f.close()
+        profiling.count('files')
+        if profiling.active:
+            profiling.count('bytes', os.path.getsize(filename))
+
+        if cache:
+            with profiling.stage('cache'):
+                if not hit:
+                    cache.put(keys[n], ''.join(chunks))
+                cache.record(filename, keys[n])
         print(f"Html has been written to {filename}")
+    return filenames
+
+def write_views(deals, args, numbered: bool = True) -> list:
+    # write every view of --views for each deal, the views of a deal being built together from shared pieces
+    import multiview
+    views = multiview.parse_views(args.views, args)
+    assert args.formats == 'html', 'Views are written as html'
+    filenames = []
+    for board, deal in board_names(deals):
+        with profiling.deal():
+            prepare_deal(deal, args)
+            filenames += multiview.write(deal, views, output_base(args, board if numbered else None), args)
+    return filenames
+
+def write_formats(deals, args, numbered: bool = True) -> list:
+    # write each deal in every format of --formats, the deal being laid out once for all of them
+    import formats
+    names = formats.parse(args.formats)
+    assert not args.replay and not args.combine, '--formats writes a file for each frame of each deal, not --replay or --combine'
+    filenames = []
+    for board, deal in board_names(deals):
+        with profiling.deal():
+            filenames += write_layouts(deal, args, output_base(args, board if numbered else None), names)
+    return filenames
+
+def write_layouts(deal: dict, args, filename_base: str, names: list) -> list:
+    # write every frame of the deal in each of the formats named, returning the names of the files written
+    import copy
+    import formats
+    import layout
+    prepare_deal(deal, args)
+    frame_args = copy.copy(args)
+    filenames = []
+    # the deal is rotated, its play followed and its par found once; each frame is laid out once for every format
+    with profiling.stage('build'):
+        board = layout.prepare(deal, args)
+    for n in frame_numbers(deal, args):
+        frame_args.played = n
+        with profiling.stage('build'):
+            page = layout.build(deal, frame_args, board)
+        for name in names:
+            filename = filename_base + (f"-{n}" if n else '') + '.' + name
+            with profiling.stage('build'):
+                document = formats.render(page, name)
+            with profiling.stage('write'):
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(document)
+            profiling.count('files')
+            if profiling.active:
+                profiling.count('bytes', os.path.getsize(filename))
+            print(f"{name} has been written to {filename}")
+            filenames.append(filename)
+    return filenames
+
+def write_combined(deals, args, filename_base: str) -> list:
+    # render every deal into one html file, writing each board as it is read and the style only once,
+    #   so that memory does not grow with the number of boards
+    filename = filename_base + ".html"
+    with open(filename, 'w', buffering=COMBINED_BUFFER_SIZE) as f:
+        f.write(constants.STYLE)
+        if args.replay:
+            f.write(constants.REPLAY_STYLE)
+        for board, deal in board_names(deals):
+            with profiling.deal():
+                prepare_deal(deal, args)
+                with profiling.stage('write'):
+                    f.write(templates.BOARD_TITLE.render(board=board))
+                    for n, chunks in profiling.iterate('build', frame_chunks(deal, args, style=False)):
+                        buildhtml.write(profiling.iterate('build', chunks), f)
+    profiling.count('files')
+    if profiling.active:
+        profiling.count('bytes', os.path.getsize(filename))
+    print(f"Html has been written to {filename}")
+    return [filename]
+
+def read_file(path: str) -> list:
+    # the deals of a pbn, lin, json or dfc file; a json file holds a deal or a list of deals
+    if path.lower().endswith('.json'):
+        with open(path, 'r') as jf:
+            deals = json.load(jf)
+        return deals if isinstance(deals, list) else [deals]
+    if path.lower().endswith('.dfc'):
+        import dealcodec
+        return list(dealcodec.read_corpus(path))
+    return list(parsepbn.parse(path) if path.lower().endswith('.pbn') else parselin.parse(path))
+
+def deal_signature(deal: dict) -> tuple:
+    # (hash of the deal without its play, the play), to tell which frames of a board an edit changes
+    import deallibrary
+    rest = dict([(key, value) for key, value in deal.items() if key != 'Play'])
+    return deallibrary.deal_key(rest), list(deal.get('Play', []))
+
+def changed_frames(old: tuple, new: tuple, frames: list) -> list:
+    # the frames of a board whose html changes from the deal with signature old to that with signature new
+    # frame n shows the first n cards played, so a change to the play leaves the frames before it alone
+    if old is None or old[0] != new[0]:
+        return frames
+    same = 0
+    for previous, card in zip(old[1], new[1]):
+        if previous != card:
+            break
+        same += 1
+    if len(old[1]) == len(new[1]) == same:
+        return []
+    return [n for n in frames if n == 'replay' or n > same]
+
+def render_file(path: str, previous: dict, args, filename_base: str) -> dict:
+    # render the boards of a file that differ from previous, the signatures of its boards when it was last
+    #   rendered; returns the signatures now
+    try:
+        deals = read_file(path)
+    except Exception as e:
+        # e.g. a file saved halfway through an edit; keep what was rendered before
+        print(f"Cannot read {path}: {type(e).__name__}: {e}")
+        return previous
+    if args.dd:
+        deals = solve_double_dummy(deals, args)
+    boards = dict(board_names(deals))
+    signatures = dict([(board, deal_signature(deal)) for board, deal in boards.items()])
+    changed = [board for board in boards if signatures[board] != previous.get(board)]
+    if args.combine:
+        if changed or previous.keys() - boards.keys():
+            write_combined(deals, args, output_base(args, None, filename_base))
+        return signatures
+
+    if args.views:
+        import multiview
+        for board in changed:
+            prepare_deal(boards[board], args)
+            multiview.write(boards[board], multiview.parse_views(args.views, args),
+                            output_base(args, board if len(deals) > 1 else None, filename_base), args)
+        return signatures
+    if args.formats != 'html':
+        import formats
+        for board in changed:
+            write_layouts(boards[board], args, output_base(args, board if len(deals) > 1 else None, filename_base), formats.parse(args.formats))
+        return signatures
+
+    cache = None if args.no_cache else rendercache.RenderCache(args.cache_dir)
+    for board in changed:
+        deal = boards[board]
+        frames = changed_frames(previous.get(board), signatures[board], frame_numbers(deal, args))
+        if frames:
+            write_deal(deal, args, output_base(args, board if len(deals) > 1 else None, filename_base), cache, set(frames))
+    for board in previous.keys() - boards.keys():
+        print(f"Board {board} is no longer in {path}")
+    if cache:
+        cache.evict()
+    return signatures
+
+def watch(args):
+    # render the deals of the input, then render again the boards that change, until interrupted
+    # deals read here are not stored in the library, since every save would store another version
+    import watcher
+    globals.initialize()
+    assert '.' not in os.path.basename(args.output), "Output file name should be prefix only"
+    assert os.path.exists(args.input), f"{args.input} does not exist"
+    directory = os.path.isdir(args.input)
+
+    def base(path):
+        # output-<file name> for each file of a directory
+        return args.output + '-' + os.path.splitext(os.path.basename(path))[0] if directory else args.output
+
+    rendered = {}
+    for path in watcher.deal_files([args.input]):
+        rendered[path] = render_file(path, {}, args, base(path))
+    with watcher.Watcher([args.input], poll=args.poll) as w:
+        print(f"Watching {args.input} {'' if w.inotify else 'by polling '}(Ctrl-C to stop)")
+        try:
+            for paths in w.changes(args.debounce):
+                for path in sorted(paths):
+                    if os.path.exists(path):
+                        rendered[path] = render_file(path, rendered.get(path, {}), args, base(path))
+                    elif rendered.pop(path, None) is not None:
+                        print(f"{path} has been removed")
+        except KeyboardInterrupt:
+            pass
+
+def run_profiled(args) -> Tuple[list, dict]:
+    # run main, timing its stages; prints a summary and writes the metrics (and the cProfile statistics)
+    #   next to the output, returning the files written and the metrics
+    with profiling.Profile(cprofile=args.cprofile, memory=args.tracemalloc) as profile:
+        filenames = main(args)
+    metrics = profile.metrics()
+    with open(args.output + '-profile.json', 'w') as f:
+        json.dump(metrics, f, indent=2)
+    print(profile.summary())
+    if args.cprofile:
+        profile.cprofile.dump_stats(args.output + '-profile.prof')
+        print(profile.functions())
+    print(f"Metrics written to {args.output}-profile.json")
+    return filenames, metrics
 
 
 if __name__ == '__main__':
-    main(parse_args(sys.argv[1:]))
+    args = parse_args(sys.argv[1:])
+    if args.watch:
+        watch(args)
+    elif args.profile:
+        run_profiled(args)
+    else:
+        main(args)
 
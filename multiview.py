@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Several views of one deal rendered in one pass (main.py --views), sharing the formatted pieces between them.
+
+A page about a board often shows it several times: the full diagram, each hand on a line of its own,
+North-South only, the deal rotated so that the hero sits South, with or without the auction.  Each view
+is the html a run of main.py with the options of the view writes, e.g.
+    python main.py board.pbn --views nsewa,s,n,ns,nsewar2,nsA -p4 -o board
+writes board-nsewa.html, board-s.html, ... board-nsA.html (board-12-nsewa.html etc. for each board of a
+file holding several boards).
+
+A view is written as the letters of the main.py options it takes, in this order: the hands shown (n, e,
+s, w), a or A for the auction with or without its header, v for a single hand laid out vertically and
+r<k> to rotate the deal k seats.  The other options (-p, -g, -W, -x, -c, --stats, --dd, --name) apply
+to every view.
+
+Each view is laid out by layout.build, the views of a rotation sharing the rotated deal and its play
+(layout.prepare), and written by the formatters of buildhtml, as a run of main.py writes it.  The suits
+of each hand are formatted once, whatever the rotation, since a rotated deal has the same hands in other
+seats; the hands of a diagram, the felt and the auction are formatted once for each rotation used.
+"""
+
+import argparse
+import buildhtml
+import constants
+import copy
+import globals
+import layout
+import os
+import profiling
+import re
+
+from typing import Iterator, List, Tuple
+
+globals.initialize()
+
+VIEW = re.compile(r'([nesw]*)([aA]?)(v?)(?:r(\d+))?')
+
+
+def parse_view(text: str, args) -> argparse.Namespace:
+    # the options of a view, those of args with the hands, auction, layout and rotation of the view
+    # input: 'nsar2'
+    # output: args with north, south, auction set, east, west, auction_no_header, vertical not set, and rotate 2
+    match = VIEW.fullmatch(text)
+    assert text and match, f"View {text!r} should be the hands shown (nesw), then a or A for the auction, v for vertical and r<k> to rotate, e.g. nsewar2"
+    hands, auction, vertical, rotate = match.groups()
+    view = copy.copy(args)
+    view.north, view.east, view.south, view.west = [letter in hands for letter in 'nesw']
+    view.auction = auction == 'a'
+    view.auction_no_header = auction == 'A'
+    view.vertical = bool(vertical)
+    view.rotate = int(rotate) if rotate else None
+    return view
+
+def parse_views(text: str, args) -> List[Tuple[str, argparse.Namespace]]:
+    # (name, options) of each view of a comma separated list, e.g. 'nsewa,s,nsewar2'
+    names = [name.strip() for name in text.split(',') if name.strip()]
+    assert names, 'Give at least one view, e.g. --views nsewa,s'
+    assert not args.replay and args.played >= 0, 'Views show a single number of cards played (-p n), not --replay or -p -1'
+    return [(name, parse_view(name, args)) for name in names]
+
+
+class Fragments:
+    # the pieces the views of a deal are built from, each laid out or formatted the first time a view needs it
+    def __init__(self, deal: dict, args):
+        self.deal = deal
+        self.args = args
+        self.pieces = {}
+
+    def piece(self, key: tuple, build):
+        if key in self.pieces:
+            profiling.count('fragments reused')
+        else:
+            profiling.count('fragments')
+            self.pieces[key] = build()
+        return self.pieces[key]
+
+    def page(self, view) -> layout.Layout:
+        # layout.build of the deal with the options of the view
+        board = self.piece(('board', rotation(view), view.auction, view.auction_no_header),
+                           lambda: layout.prepare(self.deal, view))
+        return layout.build(self.deal, view, board)
+
+    def suits(self, direction: str):
+        # a buildhtml.format_suits for the hand dealt to direction, formatting it once for each set of options
+        return lambda suits, **options: self.piece(('suits', direction) + tuple(sorted(options.items())),
+                                                   lambda: buildhtml.format_suits(suits, **options))
+
+    def single_hand(self, box: layout.HandBox, view) -> str:
+        # buildhtml.format_single_hand of a hand shown on its own
+        direction = layout.shift(box.direction, -rotation(view))
+        return self.piece(('single', direction, bool(view.vertical)),
+                          lambda: buildhtml.format_single_hand(box.suits, view.vertical, self.suits(direction)))
+
+    def hand_box(self, box: layout.HandBox, view) -> str:
+        # buildhtml.format_hand_box of a hand of a diagram, sitting where the rotation puts it
+        direction = layout.shift(box.direction, -rotation(view))
+        return self.piece(('box', direction, rotation(view)), lambda: buildhtml.format_hand_box(box, self.suits(direction)))
+
+
+def rotation(view) -> int:
+    return (view.rotate or 0) % 4
+
+def view_chunks(fragments: Fragments, view) -> Iterator[str]:
+    # yields what buildhtml.build_chunks yields for the deal with the options of the view
+    page = fragments.page(view)
+    yield constants.STYLE
+    if page.single:
+        yield fragments.single_hand(page.single, view)
+    elif page.hands is not None:
+        hands = dict([(direction, fragments.hand_box(box, view)) for direction, box in page.hands.items()])
+        yield buildhtml.assemble_diagram(hands, fragments.piece(('felt', rotation(view)), lambda: buildhtml.format_felt(page.felt)))
+    yield fragments.piece(('auction', rotation(view), view.auction, view.auction_no_header),
+                          lambda: buildhtml.format_auction_section(page.auction, page.double_dummy))
+
+def write(deal: dict, views: List[Tuple[str, argparse.Namespace]], filename_base: str, args) -> list:
+    # write each view of the deal (prepared by main.prepare_deal) to <filename_base>-<view name>.html,
+    #   returning the names of the files written
+    fragments = Fragments(deal, args)
+    filenames = []
+    for name, view in views:
+        filename = f'{filename_base}-{name}.html'
+        with profiling.stage('build'):
+            html = ''.join(view_chunks(fragments, view))
+        with profiling.stage('write'):
+            with open(filename, 'w') as f:
+                f.write(html)
+        profiling.count('files')
+        if profiling.active:
+            profiling.count('bytes', os.path.getsize(filename))
+        print(f"Html has been written to {filename}")
+        filenames.append(filename)
+    return filenames
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+The parse method of this module takes the path of a BBO .lin file (a hand record or a vugraph/tournament
+download holding many boards) and reads it board by board, yielding one dictionary per board in the format
+returned by parseurl.parse, including "Vulnerable", "Alerts" and "Claim" where the file gives them, and "Event" (the first field of
+the vg tag) for a vugraph file.
+
+A board begins with a qx tag (e.g. qx|o12| for board 12 in the open room) or, in files without qx tags,
+with the first pn, st or md tag after the hands of the previous board.  Tags before the first qx tag
+(vg, rs, pn) apply to every board; in
+particular a pn tag listing eight players gives the open room (qx|o..|) the first four and the closed
+room (qx|c..|) the last four.
+
+The file is read in chunks, so only the board currently being read is held in memory.
+"""
+
+import dealmodel
+import globals
+import parseurl
+
+from typing import Iterable, Iterator, List, Tuple
+
+globals.initialize()
+
+CHUNK_SIZE = 64 * 1024
+
+# tags that belong to the file rather than to a board
+HEADER_TAGS = {'vg', 'rs', 'pw', 'bn'}
+
+
+def complete_hands(value: str) -> str:
+    # BBO may leave out the last hand of an md tag, e.g. '3SAKQ...,S...,S...,'
+    # fill it in with the cards not held by the other three
+    hands = value.split(',')
+    if len(hands) == 4 and hands[3].strip():
+        return value
+    hands = hands[:3]
+    held = 0
+    for hand in hands:
+        held |= dealmodel.Hand.from_suits(parseurl.split_suits(hand)).mask
+    rest = dealmodel.Hand(dealmodel.ALL_CARDS & ~held)
+    hands.append(''.join(suit + rest.suit(i) for i, suit in enumerate(dealmodel.SUIT_LETTERS)))
+    return ','.join(hands)
+
+def room_players(value: str, board: List[Tuple[str, str]]) -> str:
+    # a pn tag with eight players lists the open room and then the closed room
+    players = value.split(',')
+    if len(players) < 8:
+        return value
+    closed = any(tag == 'qx' and value.strip().lower().startswith('c') for tag, value in board)
+    return ','.join(players[4:8] if closed else players[:4])
+
+def read_board(board: List[Tuple[str, str]], header: dict) -> dict:
+    # build a deal from the tokens of one board and the tokens before the first board
+    tags = set(tag for tag, value in board)
+    tokens = []
+    if 'pn' not in tags and 'pn' in header:
+        tokens.append(('pn', room_players(header['pn'], board)))
+    for tag, value in board:
+        if tag == 'md':
+            value = complete_hands(value)
+        elif tag == 'pn':
+            value = room_players(value, board)
+        tokens.append((tag, value))
+    deal = parseurl.read_deal(tokens)
+    if header.get('vg', '').split(',')[0].strip():
+        deal['Event'] = header['vg'].split(',')[0].strip()
+    return deal
+
+def read_boards(tokens: Iterable[Tuple[str, str]], header: dict) -> Iterator[List[Tuple[str, str]]]:
+    # group the tokens of a .lin file into boards, yielding a list of tokens for each board
+    # tokens describing the file rather than a board are stored in header as they are read
+    board = []
+    has_hands = False
+    for tag, value in tokens:
+        if tag in HEADER_TAGS:
+            header[tag] = value
+            continue
+        if tag == 'qx' or (tag in ('pn', 'st', 'md') and has_hands):
+            if has_hands:
+                yield board
+            else:
+                # tokens before the first qx tag describe the file (e.g. the players of a vugraph match)
+                header.update(board)
+            board = []
+            has_hands = False
+        board.append((tag, value))
+        has_hands = has_hands or tag == 'md'
+    if has_hands:
+        yield board
+
+def read_deals(tokens: Iterable[Tuple[str, str]]) -> Iterator[dict]:
+    # yield a deal for each board with hands, players and an auction
+    header = {}
+    for board in read_boards(tokens, header):
+        try:
+            yield read_board(board, header)
+        except AssertionError as e:
+            # e.g. a board that was not played
+            print(f"Skipping board: {e}")
+
+def parse(path: str) -> Iterator[dict]:
+    with open(path, 'r', encoding='utf-8', errors='replace') as lf:
+        yield from read_deals(parseurl.tokenize(iter(lambda: lf.read(CHUNK_SIZE), '')))
+
+# for testing
+if __name__ == '__main__':
+    import sys
+    for deal in parse(sys.argv[1]):
+        print(deal)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+The parse method of this module takes the path of a PBN file and reads it board by board,
+yielding one dictionary per board in the following format:
+        {
+                "Board number": <integer>,
+                "Event": <name of the event>,
+                "Dealer": <"North", "South", "East", or "West" >,
+                "Vulnerable": <"None", "NS", "EW", or "All">,
+                "Contract": <contract as written in the file, e.g. "4HX" or "Pass">,
+                "Declarer": <"North", "South", "East", or "West" >,
+                "Auction": <a list of calls e.g. ['1C', 'D', 'R', '3N', 'P', 'P', 'P'] >,
+                "Seats": [
+                                        { "Player": <player's name>,
+                                            "Direction":  <"North", "South", "East", or "West" >,
+                                                "Hand":
+                                                        { "Spades": <string, using AKQJT for honors>,
+                                                            "Hearts": <string, using AKQJT for honors>,
+                                                            "Diamonds": <string, using AKQJT for honors>,
+                                                            "Clubs": <string, using AKQJT for honors>
+                                                        }
+                                        },
+                                        ...
+                                ],
+                "Play": <a list of cards played in the order they were played, e.g. ["CK", "C8"]>
+            }
+
+Keys are only present if the corresponding tag is found in the file.
+The file is read one line at a time, so only the board currently being read is held in memory.
+"""
+
+import dealmodel
+import globals
+import re
+
+from typing import Iterable, Iterator, List
+
+globals.initialize()
+
+TAG_PATTERN = re.compile(r'^\s*\[(\w+)\s+"?([^"\]]*)"?\s*\]')
+
+# the start of a comment, or a string with its \" and \\ escapes (to the end of the line if it is not closed)
+COMMENT_OR_STRING = re.compile(r'[{;]|"(?:[^"\\]|\\.)*"?')
+
+# tags that may legitimately appear more than once in a single game
+REPEATABLE_TAGS = {'Note'}
+
+VULNERABILITY = { 'NONE': 'None', 'LOVE': 'None', '-': 'None',
+        'NS': 'NS',
+        'EW': 'EW',
+        'ALL': 'All', 'BOTH': 'All'
+        }
+
+def strip_comments(lines: Iterable[str]) -> Iterator[str]:
+    # remove {...} comments (which may span lines) and ; comments from each line
+    # { and ; inside a quoted string, e.g. [Event "Spring; Day {2}"], do not begin a comment
+    # lines beginning with % are export directives and are dropped
+    in_comment = False
+    for line in lines:
+        if not in_comment and line.startswith('%'):
+            continue
+        text = ''
+        i = 0
+        while i < len(line):
+            if in_comment:
+                end = line.find('}', i)
+                if end < 0:
+                    i = len(line)
+                else:
+                    in_comment = False
+                    i = end + 1
+            else:
+                found = COMMENT_OR_STRING.search(line, i)
+                if not found:
+                    text += line[i:]
+                    i = len(line)
+                elif found.group() == ';':
+                    text += line[i:found.start()]
+                    i = len(line)
+                elif found.group() == '{':
+                    text += line[i:found.start()]
+                    in_comment = True
+                    i = found.end()
+                else:
+                    # a string, e.g. a tag value, is kept whole whatever it holds
+                    text += line[i:found.end()]
+                    i = found.end()
+        # a line that was entirely commentary does not separate games
+        if text.strip() or not in_comment and not line.strip():
+            yield text.rstrip('\r\n')
+
+def read_games(lines: Iterable[str]) -> Iterator[dict]:
+    # group the lines of a PBN file into games
+    # each game is returned as a dictionary keyed by tag name: { tag: (value, [section lines]) }
+    # a value of "#" means the value is inherited from the previous game
+    game = {}
+    previous = {}
+    tag = None
+    for line in strip_comments(lines):
+        if not line.strip():
+            if game:
+                yield game
+                previous, game, tag = game, {}, None
+            continue
+
+        m = TAG_PATTERN.match(line)
+        if m:
+            tag, value = m.group(1), m.group(2).strip()
+            if tag in game and tag not in REPEATABLE_TAGS:
+                # no blank line between games
+                yield game
+                previous, game = game, {}
+            if value == '#' and tag in previous:
+                value = previous[tag][0]
+            game[tag] = (value, [])
+        elif tag:
+            game[tag][1].append(line)
+    if game:
+        yield game
+
+def parse_hands(deal_str: str) -> list:
+    # input 'N:AK5.KT43.K7.AK62 J962.9.Q984.T754 ...'
+    # output a list of seats, in clockwise order beginning with the first hand
+    seats = []
+    first_dir = deal_str[0]
+    hand_tokens = deal_str[2:].strip().split()
+    # Ensure we have four hands
+    if len(hand_tokens) >= 4:
+        # Map first hand to direction and proceed clockwise
+        clockwise = ['North', 'East', 'South', 'West']
+        start_dir = globals.seats.get(first_dir.upper(), 'North')
+        si = clockwise.index(start_dir)
+        directions_order = clockwise[si:] + clockwise[:si]
+        for dir_name, hand_token in zip(directions_order, hand_tokens[:4]):
+            suits = hand_token.split('.')
+            if len(suits) != 4:
+                # unknown hand, e.g. '-'
+                continue
+            # normalize ranks (uppercase, T for 10)
+            suits = [s.replace('10', 'T').upper() for s in suits]
+            seats.append({ 'Direction': dir_name, 'Hand': globals.build_hand(suits) })
+    return seats
+
+def parse_auction(lines: List[str]) -> list:
+    # build a list of calls from the lines of an auction section
+    # notes (=1=), suffix annotations (! ?), NAGs ($1) and fillers (- *) are dropped
+    # Basic normalization: map Pass -> P, Double/X -> D, Redouble/XX -> R, NoTrump/N -> N
+    norm = []
+    for t in ' '.join(lines).split():
+        tt = t.upper().rstrip('!?')
+        if not tt or tt[0] in '=$-*':
+            continue
+        if tt == 'AP':
+            norm.extend(['P', 'P', 'P'])
+        elif tt in ('PASS', 'P'):
+            norm.append('P')
+        elif tt in ('DOUBLE', 'D', 'X'):
+            norm.append('D')
+        elif tt in ('REDOUBLE', 'R', 'XX'):
+            norm.append('R')
+        else:
+            norm.append(tt.replace('NT', 'N'))
+    return norm
+
+def trick_winner(cards: List[str], trump: str) -> int:
+    # return the index in cards of the card winning the trick
+    # cards are in the order played, e.g. ['S4', 'SA', 'S2', 'S3']
+    best = 0
+    for i, card in enumerate(cards[1:], 1):
+        if card[0] == cards[best][0]:
+            if dealmodel.card_index(card) < dealmodel.card_index(cards[best]):
+                best = i
+        elif card[0] == trump:
+            best = i
+    return best
+
+def parse_play(lines: List[str], leader: str, trump: str) -> list:
+    # a PBN play section has one line per trick, with the cards in columns by seat,
+    # beginning with the opening leader
+    # convert it into a list of cards in the order they were played
+    columns = [globals.directions[(globals.directions.index(leader) + i) % 4] for i in range(4)]
+    play = []
+    for line in lines:
+        tokens = [t.upper() for t in line.split() if t[0] not in '=$']
+        if not tokens or tokens[0] == '*':
+            break
+        trick = dict(zip(columns, tokens))
+        cards = []
+        for i in range(4):
+            card = trick.get(shift(leader, i), '-').rstrip('!?')
+            if len(card) < 2 or card[0] not in 'SHDC':
+                # trick not completed
+                break
+            cards.append(card.replace('10', 'T'))
+        play.extend(cards)
+        if len(cards) < 4:
+            break
+        leader = shift(leader, trick_winner(cards, trump))
+    return play
+
+def shift(direction: str, n: int) -> str:
+    # returns direction n places clockwise from specified direction
+    return globals.directions[(globals.directions.index(direction) + n) % 4]
+
+def build_deal(game: dict) -> dict:
+    # convert the tags of a single game into a deal dictionary
+    deal = {}
+    tags = dict([(tag, value) for tag, (value, lines) in game.items()])
+
+    # Board number
+    m = re.match(r'\d+', tags.get('Board', ''))
+    if m:
+        deal['Board number'] = int(m.group(0))
+
+    if tags.get('Event', '').strip('# '):
+        deal['Event'] = tags['Event']
+
+    # Dealer
+    if tags.get('Dealer', '').upper() in globals.seats:
+        deal['Dealer'] = globals.seats[tags['Dealer'].upper()]
+
+    if 'Vulnerable' in tags:
+        deal['Vulnerable'] = VULNERABILITY.get(tags['Vulnerable'].upper(), tags['Vulnerable'])
+
+    if tags.get('Contract'):
+        deal['Contract'] = tags['Contract']
+
+    if tags.get('Declarer', '').upper() in globals.seats:
+        deal['Declarer'] = globals.seats[tags['Declarer'].upper()]
+
+    # Auction
+    if 'Auction' in game:
+        auction = parse_auction(game['Auction'][1])
+        if auction:
+            deal['Auction'] = auction
+
+    # Deal tag: format like N:hand1 hand2 hand3 hand4
+    if re.match(r'[NESWnesw]:', tags.get('Deal', '')):
+        seats = parse_hands(tags['Deal'].strip())
+        for seat in seats:
+            if tags.get(seat['Direction']):
+                seat['Player'] = tags[seat['Direction']]
+        if seats:
+            deal['Seats'] = seats
+
+    # Play, beginning with the opening leader
+    if tags.get('Play', '').upper() in globals.seats:
+        contract = tags.get('Contract', '').upper()
+        trump = contract[1] if len(contract) > 1 and contract[1] in 'SHDC' else ''
+        play = parse_play(game['Play'][1], globals.seats[tags['Play'].upper()], trump)
+        if play:
+            deal['Play'] = play
+
+    return deal
+
+def read_deals(lines: Iterable[str]) -> Iterator[dict]:
+    # yield a deal for each game in a stream of PBN lines
+    for game in read_games(lines):
+        deal = build_deal(game)
+        if deal.get('Seats'):
+            yield deal
+
+def parse(path: str) -> Iterator[dict]:
+    with open(path, 'r') as pf:
+        yield from read_deals(pf)
+
+# for testing
+if __name__ == '__main__':
+    import sys
+    for deal in parse(sys.argv[1]):
+        print(deal)
@@ -25,19 +25,57 @@ import globals
 import re
 import urllib.parse
 
+from typing import Iterable, Iterator, Tuple
+
 globals.initialize()
     
+# vulnerability as given by the sv tag
+VULNERABILITY = { 'o': 'None', '0': 'None', '-': 'None',
+        'n': 'NS',
+        'e': 'EW',
+        'b': 'All'
+        }
+
+CALL_PATTERN = re.compile(r'[1-7SHDCNRP]+')
+
 def split_suits(hand: str) -> list:
     # input 'S96432HKQ94DT5C73' (possibly with an integer preceding the S)
     # output ['96432', 'KQ9', 'T5', '73']
     return re.split('[SHDC]', hand)[1:]
 
+def lin_string(url: str) -> str:
+    # the part of an (unquoted) handviewer url following lin=
+    start = url.find('lin=')
+    return url[start + 4:] if start >= 0 else url
+
+def tokenize(chunks: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    # split a stream of LIN text of the form 'key|value|key|value|...' into (key, value) pairs
+    # the stream may be broken into chunks anywhere, e.g. the lines of a .lin file
+    rest = ''
+    key = None
+    for chunk in chunks:
+        fields = (rest + chunk).split('|')
+        rest = fields.pop()
+        for field in fields:
+            if key is None:
+                key = field.strip()
+            else:
+                yield key, field
+                key = None
+    if key is not None:
+        # the final value is not followed by |
+        yield key, rest
+
+def board_number(value: str) -> int:
+    # input 'Board 12' (ah tag) or 'o12' (qx tag)
+    m = re.search(r'(\d+)\s*$', value)
+    return int(m.group(1)) if m else 0
+
 def extract_board_number(url: str) -> int:
-    board_match = re.findall(r".*?Board(.*?)\|", url)
-    if len(board_match) == 0:
-        return 0
-    else:
-        return int(board_match[0][-2:])
+    for tag, value in tokenize([lin_string(url)]):
+        if tag == 'ah' and 'Board' in value:
+            return board_number(value)
+    return 0
 
 def extract_dealer(hand: str) -> int:
     # first char of hand is dealer: 1 for South, 2 for West, etc.
@@ -47,43 +85,84 @@ def extract_dealer(hand: str) -> int:
 def extract_hands(url: str) -> list:
     # extract string containing each hand, separated by commas
     # build a list with one item for each hand
-    hands_match = re.findall(r".*?\|md\|(.*?)\|", url)
-    assert len(hands_match) > 0, "No hands"
-    return hands_match[0].split(',')
+    for tag, value in tokenize([lin_string(url)]):
+        if tag == 'md':
+            return value.split(',')
+    assert False, "No hands"
  
-def extract_players(url: str) -> list:
-    # extract string containing players' names
+def player_names(value: str) -> list:
     # build a list with one item for each player
     # players whose names start with ~ are robots
-    players_match = re.findall(r".*?[\|=]pn\|(.*?)\|", url)
-    assert len(players_match) > 0, "No players"
-    players = players_match[0].split(',')
+    players = value.split(',')
     for i in range(len(players)):
-        if players[i][0] == '~':
+        if players[i].startswith('~'):
             players[i] = 'Robot'
         elif players[i] == 'PSMartin':
             players[i] = 'Phillip'
     return players
 
+def extract_players(url: str) -> list:
+    # extract string containing players' names
+    for tag, value in tokenize([lin_string(url)]):
+        if tag == 'pn':
+            return player_names(value)
+    assert False, "No players"
+
+def call(value: str) -> str:
+    # input '3S!' (mb tag), output '3S'; returns '' if value is not a call
+    value = value.strip().upper().rstrip('!')
+    value = { 'X': 'D', 'XX': 'R' }.get(value, value)
+    return value if CALL_PATTERN.fullmatch(value) else ''
+
 def extract_auction(url: str) -> list:
     # build a list of calls, e.g. ['1C', 'P', '2C', 'P', '2S', 'P', '3N', 'P', 'P', 'P']
-    auction = re.findall(r'mb\|([1-7SHDCNRP]+)[!\|]', url)
+    auction = [call(value) for tag, value in tokenize([lin_string(url)]) if tag == 'mb']
+    auction = [c for c in auction if c]
     assert len(auction) > 0, "No auction"
     return auction
 
-def parse(url: str) -> dict:
-    #print('***entering parse***')
-    #print(f'url: {url}')
+def read_deal(tokens: Iterable[Tuple[str, str]]) -> dict:
+    # build a deal from the (key, value) pairs of a single board, in one pass
+    # besides the keys listed above, the deal has
+    #   "Vulnerable": <"None", "NS", "EW", or "All">, if given by an sv tag
+    #   "Alerts": <a list with the explanation of each call, '' if none>, if any call is explained (an tag)
+    #   "Claim": <total number of tricks claimed by declarer>, if given by an mc tag
+    board = 0
+    hands = None
+    players = None
+    auction = []
+    alerts = []
+    play = []
+    extra = {}
+    for tag, value in tokens:
+        if tag == 'md' and hands is None:
+            hands = value.split(',')
+        elif tag == 'pn' and players is None:
+            players = player_names(value)
+        elif tag == 'ah' and 'Board' in value and not board:
+            board = board_number(value)
+        elif tag == 'qx' and not board:
+            board = board_number(value)
+        elif tag == 'mb':
+            c = call(value)
+            if c:
+                auction.append(c)
+                alerts.append('')
+        elif tag == 'an' and alerts:
+            alerts[-1] = value
+        elif tag == 'pc':
+            play.append(value.strip().upper())
+        elif tag == 'sv' and value.strip().lower() in VULNERABILITY:
+            extra['Vulnerable'] = VULNERABILITY[value.strip().lower()]
+        elif tag == 'mc' and value.strip().isdigit():
+            extra['Claim'] = int(value)
 
-    url = urllib.parse.unquote(url)
-    board_number = extract_board_number(url)
-    hands = extract_hands(url)
+    assert hands, "No hands"
+    assert players, "No players"
+    assert len(auction) > 0, "No auction"
+    if any(alerts):
+        extra['Alerts'] = alerts
     dealer = extract_dealer(hands[0])
-    players = extract_players(url)
-    auction = extract_auction(url)
-
-    # Extract played cards from url
-    play_cards = re.findall(r"pc\|([^|]+)\|", url)
 
     # combine players names, directions, and hands into a list of tuples
     directions_south_first = globals.directions[globals.directions.index('South'):] + globals.directions[:globals.directions.index('South')]
@@ -93,12 +172,21 @@ def parse(url: str) -> dict:
     hands_list = [dict(zip(["Player", "Direction", "Hand"], item)) for item in hands_zip]
 
     # combine all the above into a single dictionary
-    return  { "Board number" : board_number,
+    deal = { "Board number" : board,
                  "Dealer" : globals.directions[dealer],
                  "Auction" : auction,
                  "Seats" : hands_list,
-                 "Play" : play_cards
+                 "Play" : play
              }
+    deal.update(extra)
+    return deal
+
+def parse(url: str) -> dict:
+    #print('***entering parse***')
+    #print(f'url: {url}')
+
+    url = urllib.parse.unquote(url)
+    return read_deal(tokenize([lin_string(url)]))
  
 # for testing          
 if __name__ == '__main__': 
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Plain text and Markdown backends for layouts (layout.build).
+
+    plaintext.text(page)            # a diagram in fixed-width text, for email and newsgroups
+    plaintext.markdown(page)        # the text diagram in a code block, with the auction as a Markdown table
+
+e.g. for main.py -nsew -p2 -g --formats txt
+                    NORTH
+                    Robot
+                    S Q 7 3
+                    ...
+    WEST                            EAST
+    Robot                           Robot
+    S J 9 6 2             S4        S 10 8 (4)
+    H 9                SA           H 8 7 6
+    ...
+                    SOUTH
+                    Phillip
+                    S (A) K 5
+                    ...
+
+Text has no gray or invisible ink: grayed cards are shown in parentheses, and whited cards are left out.
+text writes the suits as letters, to be safe in any mail reader; markdown uses the suit symbols.
+"""
+
+import ddsolver
+import globals
+import layout
+import re
+
+from typing import List
+
+globals.initialize()
+
+LETTERS = { 'S': 'S', 'H': 'H', 'D': 'D', 'C': 'C' }
+SYMBOLS = { 'S': '♠', 'H': '♥', 'D': '♦', 'C': '♣' }
+
+CALLS = { 'P': 'Pass', 'D': 'Double', 'R': 'Redouble' }
+
+# the narrowest column of the diagram, and the spaces between its columns
+COLUMN_WIDTH = 12
+GAP = 4
+
+
+def card_text(rank: str, state: str) -> str:
+    rank = '10' if rank == 'T' else rank
+    return f'({rank})' if state == layout.GRAY else rank
+
+def suit_text(suit: str, cards: list, pips: dict) -> str:
+    # e.g. 'H A Q (J) 5 2', or 'H --' for a void
+    ranks = [card_text(rank, state) for rank, state in cards if state != layout.WHITE]
+    return pips[suit] + ' ' + (' '.join(ranks) if ranks else '--')
+
+def call_text(call: str, pips: dict) -> str:
+    # '1N' returns '1NT', '2H' returns '2H' (or '2' and the heart symbol), 'P' returns 'Pass'
+    if call == layout.ALL_PASS or not call:
+        return call
+    if call in CALLS:
+        return CALLS[call]
+    return call[0] + ('NT' if call[1:2] == 'N' else pips.get(call[1:2], call[1:2])) + call[2:]
+
+def contract_text(contract: str, pips: dict) -> str:
+    # a par contract as ddsolver.par gives it, e.g. '4HxE' returns '4Hx E'
+    return f'{call_text(contract[:2], pips)}{contract[2:-1]} {contract[-1]}'
+
+def hand_lines(box: layout.HandBox, pips: dict) -> List[str]:
+    lines = [box.direction.upper()]
+    if box.player:
+        lines.append(box.player)
+    if box.suits is not None:
+        if box.stats:
+            lines.append(f'{box.stats[0]} HCP, {box.stats[1]}')
+        lines += [suit_text(suit, cards, pips) for suit, cards in box.suits]
+    return lines
+
+def felt_lines(felt: list, pips: dict) -> List[str]:
+    # the cards of the current trick, North's above those of West and East and South's below them
+    if not felt:
+        return []
+    cards = dict([(direction, pips[card[0]] + ('10' if card[1] == 'T' else card[1:])) for direction, card in felt])
+    west, east = cards.get('West', ''), cards.get('East', '')
+    width = max(COLUMN_WIDTH - GAP, len(west) + len(east) + 3)
+    return [cards.get('North', '').center(width).rstrip(),
+            west + east.rjust(width - len(west)),
+            cards.get('South', '').center(width).rstrip()]
+
+def diagram_lines(page: layout.Layout, pips: dict) -> List[str]:
+    # the hands in three columns, North and South in the middle one above and below the felt
+    hands = dict([(direction, hand_lines(box, pips)) for direction, box in page.hands.items()])
+    north, west, east, south = [hands.get(direction, []) for direction in ['North', 'West', 'East', 'South']]
+    felt = felt_lines(page.felt, pips)
+    left = max([len(line) for line in west] + [COLUMN_WIDTH]) + GAP
+    center = max([len(line) for line in north + south + felt] + [COLUMN_WIDTH]) + GAP
+
+    lines = [' ' * left + line for line in north]
+    height = max(len(west), len(felt), len(east))
+    # the felt is level with the middle of the hands of West and East
+    offset = (height - len(felt)) // 2
+    middle = []
+    for row in range(height):
+        cells = [west[row] if row < len(west) else '',
+                 felt[row - offset] if 0 <= row - offset < len(felt) else '',
+                 east[row] if row < len(east) else '']
+        middle.append((cells[0].ljust(left) + cells[1].ljust(center) + cells[2]).rstrip())
+    if lines and middle:
+        lines.append('')
+    lines += middle
+    if south and lines:
+        lines.append('')
+    lines += [' ' * left + line for line in south]
+    return lines
+
+def single_lines(page: layout.Layout, pips: dict) -> List[str]:
+    # a hand on its own: a suit on each line if vertical, else all on one line
+    suits = [suit_text(suit, cards, pips) for suit, cards in page.single.suits]
+    return suits if page.vertical else ['  '.join(suits)]
+
+def auction_rows(auction: layout.Auction, pips: dict) -> List[List[str]]:
+    # the rows of the auction table: the directions, the names of the players and the calls, West first
+    rows = [list(globals.directions)] if auction.directions else []
+    rows.append(list(auction.names))
+    cells = [call_text(cell, pips) for cell in auction.cells]
+    cells += [''] * (-len(cells) % 4)
+    rows += [cells[i:i + 4] for i in range(0, len(cells), 4)]
+    return rows
+
+def auction_lines(auction: layout.Auction, pips: dict) -> List[str]:
+    rows = auction_rows(auction, pips)
+    width = max(len(cell) for row in rows for cell in row) + 2
+    return [''.join(cell.ljust(width) for cell in row).rstrip() for row in rows]
+
+def double_dummy_rows(double_dummy: layout.DoubleDummy, pips: dict) -> List[List[str]]:
+    # a row of strains, then a row of tricks for each declarer
+    strains = ['NT' if strain == 'N' else pips[strain] for strain in ddsolver.STRAINS]
+    rows = [[''] + strains]
+    for direction in ['North', 'South', 'East', 'West']:
+        rows.append([direction[0]] + [str(double_dummy.table[strain][direction]) for strain in ddsolver.STRAINS])
+    return rows
+
+def double_dummy_lines(double_dummy: layout.DoubleDummy, pips: dict) -> List[str]:
+    lines = [''.join(cell.rjust(4) for cell in row).rstrip() for row in double_dummy_rows(double_dummy, pips)]
+    lines.append(layout.par_line(double_dummy, lambda contract: contract_text(contract, pips)))
+    return lines
+
+def text(page: layout.Layout, pips: dict = LETTERS) -> str:
+    # the layout as fixed-width text, its parts separated by blank lines
+    sections = []
+    if page.single:
+        sections.append(single_lines(page, pips))
+    elif page.hands is not None:
+        sections.append(diagram_lines(page, pips))
+    if page.auction:
+        sections.append(auction_lines(page.auction, pips))
+    if page.double_dummy:
+        sections.append(double_dummy_lines(page.double_dummy, pips))
+    return '\n\n'.join('\n'.join(lines) for lines in sections if lines) + '\n'
+
+
+def escape(value: str) -> str:
+    # value with the characters Markdown gives a meaning to escaped
+    return re.sub(r'([\\`*_|<>\[\]#])', r'\\\1', value)
+
+def table(rows: List[List[str]]) -> List[str]:
+    # a Markdown table, the first row being its header
+    lines = ['| ' + ' | '.join(rows[0]) + ' |', '|' + ' --- |' * len(rows[0])]
+    return lines + ['| ' + ' | '.join(row) + ' |' for row in rows[1:]]
+
+def markdown(page: layout.Layout, pips: dict = SYMBOLS) -> str:
+    # the hands as text in a code block, so that they stay lined up, and the auction and the
+    #   double-dummy tricks as tables
+    sections = []
+    if page.single:
+        lines = single_lines(page, pips)
+        sections.append(['```'] + lines + ['```'] if page.vertical else lines)
+    elif page.hands is not None:
+        sections.append(['```'] + diagram_lines(page, pips) + ['```'])
+    if page.auction:
+        rows = auction_rows(page.auction, pips)
+        names = 1 if page.auction.directions else 0
+        rows[names] = [f'*{escape(name)}*' if name else '' for name in rows[names]]
+        sections.append(table(rows))
+    if page.double_dummy:
+        sections.append(table(double_dummy_rows(page.double_dummy, pips)) +
+                        ['', escape(layout.par_line(page.double_dummy, lambda contract: contract_text(contract, pips)))])
+    return '\n\n'.join('\n'.join(lines) for lines in sections if lines) + '\n'
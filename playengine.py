@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Replays the play of a deal trick by trick, against the trump suit of the contract, and records for every card
+played who played it, who led to its trick, who is winning the trick once it is played, whether it followed
+suit and the tricks won so far.
+
+    play = playengine.Play(deal)
+    play.seat(0)            # 'West', the seat of the opening lead
+    play.trick(6)           # range(4, 6), the positions of the cards on the felt after 6 cards
+    play.tricks[3]          # (0, 1), the tricks won by North-South and East-West after the first trick
+
+The deal is replayed once, so that rendering the table after any number of cards (main.py --played n)
+looks up its cards rather than working them out again.
+
+The contract is the "Contract" of the deal if it has one, else the last bid of the auction; the opening leader
+is the seat holding the first card played, or if no hand holds it the seat on the left of declarer.
+A card that no hand holds is taken to be played by the seat whose turn it is.
+"""
+
+import dealmodel
+import globals
+import re
+
+from typing import List
+
+globals.initialize()
+
+
+def contract(deal: dict) -> str:
+    # the contract of the deal without doubles, e.g. '4H' or '3N'; '' if there is none or the auction was passed out
+    if deal.get('Contract'):
+        final = deal['Contract'].upper().replace('NT', 'N')
+    else:
+        bids = [call for call in deal.get('Auction', []) if re.match(r'[1-7]', call)]
+        final = bids[-1].upper() if bids else ''
+    return final[:2] if re.match(r'[1-7][SHDCN]', final) else ''
+
+def trump_suit(deal: dict) -> int:
+    # the trump suit (0-3 for spades, hearts, diamonds and clubs), or -1 at no trumps or with no contract
+    return dealmodel.SUIT_LETTERS.find(contract(deal)[1:2] or 'N')
+
+def declarer(deal: dict) -> int:
+    # the index in globals.directions of declarer, -1 if not known
+    if deal.get('Declarer') in globals.directions:
+        return globals.directions.index(deal['Declarer'])
+    final = contract(deal)
+    if not final or deal.get('Dealer') not in globals.directions:
+        return -1
+    # the first of the declaring side to bid the strain; the side is that of the last bid
+    dealer = globals.directions.index(deal['Dealer'])
+    bids = [((dealer + i) % 4, call.upper()) for i, call in enumerate(deal.get('Auction', [])) if re.match(r'[1-7]', call)]
+    if not bids:
+        return -1
+    side = bids[-1][0] % 2
+    return next((seat for seat, call in bids if seat % 2 == side and call[1:2] == final[1]), -1)
+
+
+class Play:
+    # the play of a deal; the entries of each list are indexed by the position of the card in the play
+    #   cards     the index of the card (-1 if it is not a valid card)
+    #   seats     the index in globals.directions of the seat that played it (-1 if not known)
+    #   leads     the position of the card that led to its trick
+    #   winners   the seat winning the trick once the card is played
+    #   followed  False if the seat held a card of the suit led but played another suit
+    #   tricks    the tricks won by North-South and East-West once the card is played, as a tuple (ns, ew)
+    #   played    the mask of the cards played up to and including the card
+    __slots__ = ('trump', 'declarer', 'cards', 'seats', 'leads', 'winners', 'followed', 'tricks', 'played')
+
+    def __init__(self, deal: dict):
+        self.trump = trump_suit(deal)
+        self.declarer = declarer(deal)
+        self.cards = [dealmodel.card_index(card) for card in deal.get('Play', [])]
+        self.seats = []
+        self.leads = []
+        self.winners = []
+        self.followed = []
+        self.tricks = []
+        self.played = []
+
+        # the seat holding each card, and the cards each seat has left
+        holders = {}
+        left = [0, 0, 0, 0]
+        for seat in deal.get('Seats', []):
+            if 'Hand' in seat:
+                direction = globals.directions.index(seat['Direction'])
+                left[direction] = dealmodel.Hand.from_dict(seat['Hand']).mask
+                for index in dealmodel.mask_indexes(left[direction]):
+                    holders[index] = direction
+
+        leader = holders.get(self.cards[0], -1) if self.cards else -1
+        if leader < 0 and self.declarer >= 0:
+            leader = (self.declarer + 1) % 4
+        ns = ew = 0
+        played = 0
+        for position, index in enumerate(self.cards):
+            lead = position - position % 4
+            turn = position % 4
+            seat = holders.get(index, (leader + turn) % 4 if leader >= 0 else -1)
+
+            if turn == 0:
+                best = index
+                winner = seat
+                followed = True
+            else:
+                led = self.cards[lead] // 13
+                suit = index // 13 if index >= 0 else -1
+                followed = suit == led or led < 0 or seat < 0 or not (left[seat] >> (13 * led)) & dealmodel.SUIT_MASK
+                # the card wins if it is higher in the suit of the winning card (lower index), or trumps it
+                if index >= 0 and (suit == best // 13 and index < best or suit == self.trump and best // 13 != self.trump):
+                    best = index
+                    winner = seat
+            if index >= 0:
+                played |= 1 << index
+                if seat >= 0:
+                    left[seat] &= ~(1 << index)
+
+            if turn == 3:
+                # the trick is complete; its winner leads to the next one
+                if winner >= 0 and winner % 2:
+                    ns += 1
+                elif winner >= 0:
+                    ew += 1
+                leader = winner
+
+            self.seats.append(seat)
+            self.leads.append(lead)
+            self.winners.append(winner)
+            self.followed.append(followed)
+            self.tricks.append((ns, ew))
+            self.played.append(played)
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def seat(self, position: int) -> str:
+        # the direction that played the card at position, '' if not known
+        seat = self.seats[position]
+        return globals.directions[seat] if seat >= 0 else ''
+
+    def trick(self, n: int) -> range:
+        # the positions of the cards of the current trick after n cards are played, in the order they were played
+        n = min(n, len(self.cards))
+        return range(self.leads[n - 1], n) if n > 0 else range(0)
+
+    def played_mask(self, n: int) -> int:
+        # the cards played in the first n cards of the play
+        n = min(n, len(self.cards))
+        return self.played[n - 1] if n > 0 else 0
+
+    def revokes(self) -> List[int]:
+        # the positions of the cards that did not follow suit when they could have
+        return [position for position, followed in enumerate(self.followed) if not followed]
+
+
+# for testing
+if __name__ == '__main__':
+    import json
+    import sys
+    with open(sys.argv[1], 'r') as f:
+        deal = json.load(f)
+    play = Play(deal)
+    for position, index in enumerate(play.cards):
+        print(position + 1, dealmodel.card_name(index) if index >= 0 else '?', play.seat(position),
+              globals.directions[play.winners[position]] if play.winners[position] >= 0 else '',
+              '' if play.followed[position] else 'revoke', play.tricks[position])
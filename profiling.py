@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Timing of the stages of a run of main.py (--profile), with counts of the work done.
+
+    with profiling.Profile() as profile:
+        main.main(args)
+    print(profile.summary())
+
+While a Profile is active, the pipeline reports to it through the functions of this module
+    stage(name)             a context timing the code inside it
+    iterate(name, items)    the items of an iterable, timing the work of producing each one (e.g. parsing a deal)
+    count(name, n)          adds n to a counter
+    deal()                  a context timing the rendering of a single deal, for the percentiles
+and when no Profile is active they do nothing.  Stage times exclude the stages nested inside them, so
+they add up to no more than the time of the run.
+
+The stages are
+    parse       reading the input, parsing deals and storing them in the library
+    dd          solving deals for --dd
+    prepare     sorting the hands (main.prepare_deal)
+    copy        copying a deal before rotating and formatting it (buildhtml)
+    build       formatting html
+    cache       looking up and storing html in the render cache
+    write       writing files
+
+Profile can also run cProfile and tracemalloc over the run; tracemalloc slows everything down,
+so the stage times of a run measuring memory are not comparable with those of a run that does not.
+"""
+
+import contextlib
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+from typing import Iterable, Iterator, List
+
+# the Profile timing the current run, if any
+active = None
+
+STAGES = ['parse', 'dd', 'prepare', 'copy', 'build', 'cache', 'write']
+PERCENTILES = [50, 90, 99]
+
+NO_STAGE = contextlib.nullcontext()
+
+
+def percentile(values: List[float], p: int) -> float:
+    # the nearest-rank percentile of values, which are sorted
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, -(-p * len(values) // 100) - 1))]
+
+def deal_summary(seconds: List[float]) -> dict:
+    # statistics of the time taken to render each deal
+    ordered = sorted(seconds)
+    summary = { 'count': len(ordered), 'mean': round(sum(ordered) / len(ordered), 6) if ordered else 0.0 }
+    for p in PERCENTILES:
+        summary[f'p{p}'] = round(percentile(ordered, p), 6)
+    summary['max'] = round(ordered[-1], 6) if ordered else 0.0
+    return summary
+
+
+class Profile:
+    def __init__(self, cprofile: bool = False, memory: bool = False):
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.memory = memory
+        self.stages = {}
+        self.counts = {}
+        self.deal_seconds = []
+        self.seconds = 0.0
+        self.peak_bytes = None
+        # [name, start, time of nested stages] of each stage being timed
+        self.stack = []
+        self.started = 0.0
+
+    def __enter__(self):
+        global active
+        active = self
+        if self.memory:
+            tracemalloc.start()
+        if self.cprofile:
+            self.cprofile.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global active
+        self.seconds += time.perf_counter() - self.started
+        if self.cprofile:
+            self.cprofile.disable()
+        if self.memory:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        active = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        frame = [name, time.perf_counter(), 0.0]
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += elapsed - frame[2]
+            entry[1] += 1
+            if self.stack:
+                self.stack[-1][2] += elapsed
+
+    def iterate(self, name: str, items: Iterable) -> Iterator:
+        items = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, n: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    @contextlib.contextmanager
+    def deal(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.deal_seconds.append(time.perf_counter() - start)
+
+    def metrics(self) -> dict:
+        # the measurements as a json-serializable dictionary
+        # stages: { name: { 'seconds': ..., 'calls': ... } }, in pipeline order
+        stages = dict([(name, { 'seconds': round(seconds, 6), 'calls': calls })
+                       for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: stage_order(item[0]))])
+        metrics = { 'seconds': round(self.seconds, 6),
+                   'stages': stages,
+                   'counts': dict(self.counts),
+                   'deals': deal_summary(self.deal_seconds),
+                   'deal_seconds': [round(seconds, 6) for seconds in self.deal_seconds]
+                   }
+        if self.peak_bytes is not None:
+            metrics['peak_bytes'] = self.peak_bytes
+        return metrics
+
+    def functions(self, limit: int = 20) -> str:
+        # the functions taking the most time according to cProfile, as pstats prints them
+        if not self.cprofile:
+            return ''
+        out = io.StringIO()
+        pstats.Stats(self.cprofile, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def summary(self) -> str:
+        return summary(self.metrics())
+
+
+def stage_order(name: str) -> int:
+    return STAGES.index(name) if name in STAGES else len(STAGES)
+
+def aggregate(metrics: Iterable[dict]) -> dict:
+    # the metrics of several runs (e.g. the items of a batch) added together; the deal percentiles are those
+    #   of every deal of every run, and seconds is the sum of the times of the runs
+    total = { 'seconds': 0.0, 'stages': {}, 'counts': {}, 'deal_seconds': [], 'runs': 0 }
+    for run in metrics:
+        total['runs'] += 1
+        total['seconds'] += run['seconds']
+        for name, stage in run['stages'].items():
+            entry = total['stages'].setdefault(name, { 'seconds': 0.0, 'calls': 0 })
+            entry['seconds'] += stage['seconds']
+            entry['calls'] += stage['calls']
+        for name, n in run['counts'].items():
+            total['counts'][name] = total['counts'].get(name, 0) + n
+        total['deal_seconds'] += run['deal_seconds']
+        if 'peak_bytes' in run:
+            total['peak_bytes'] = max(total.get('peak_bytes', 0), run['peak_bytes'])
+    total['seconds'] = round(total['seconds'], 6)
+    total['stages'] = dict([(name, { 'seconds': round(stage['seconds'], 6), 'calls': stage['calls'] })
+                            for name, stage in sorted(total['stages'].items(), key=lambda item: stage_order(item[0]))])
+    total['deals'] = deal_summary(total['deal_seconds'])
+    return total
+
+def summary(metrics: dict) -> str:
+    # the metrics as text, e.g.
+    #   parse        0.012 s    4.1%        3 calls
+    #   ...
+    #   deals 3, cards played 36, files 3, bytes 26700
+    #   3 deals: mean 0.091 s, p50 0.088 s, p90 0.101 s, p99 0.101 s, max 0.101 s
+    lines = [f"Profile: {metrics['seconds']:.3f} s"]
+    for name, stage in metrics['stages'].items():
+        share = 100 * stage['seconds'] / metrics['seconds'] if metrics['seconds'] else 0.0
+        lines.append(f"  {name:<10} {stage['seconds']:>9.3f} s {share:>6.1f}% {stage['calls']:>8} calls")
+    lines.append('  ' + ', '.join(f'{name} {n}' for name, n in metrics['counts'].items()))
+    deals = metrics['deals']
+    if deals['count']:
+        lines.append(f"  {deals['count']} deals: mean {deals['mean']:.4f} s, " +
+                     ', '.join(f"p{p} {deals[f'p{p}']:.4f} s" for p in PERCENTILES) + f", max {deals['max']:.4f} s")
+    if 'peak_bytes' in metrics:
+        lines.append(f"  peak memory {metrics['peak_bytes'] / 1024:.0f} KiB")
+    return '\n'.join(lines)
+
+
+def stage(name: str):
+    return active.stage(name) if active else NO_STAGE
+
+def iterate(name: str, items: Iterable) -> Iterable:
+    return active.iterate(name, items) if active else items
+
+def count(name: str, n: int = 1):
+    if active:
+        active.count(name, n)
+
+def deal():
+    return active.deal() if active else NO_STAGE
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of rendered html, keyed by a hash of the deal and of the options that affect the output.
+
+Entries are stored as <cache dir>/<first two characters of key>/<key>.html.  Reading an entry marks it as
+recently used, and evict removes the least recently used entries once the cache grows beyond its size limit.
+
+For every output file written through the cache, a record of the key it was written from is kept, so that a
+file which already holds the cached html (and has not been touched since) is not written again.
+"""
+
+import hashlib
+import json
+import os
+
+# options of main.parse_args that change the html produced for a deal
+# (--name is applied to the deal itself before rendering)
+RENDER_OPTIONS = ['north', 'east', 'south', 'west', 'auction', 'auction_no_header', 'rotate', 'played',
+                  'vertical', 'gray', 'white', 'exclude', 'clear', 'replay', 'stats', 'dd']
+
+# the modules whose code determines the html; a change to any of them invalidates the cache
+RENDER_MODULES = ['buildhtml.py', 'constants.py', 'ddsolver.py', 'dealmodel.py', 'globals.py', 'handstats.py', 'layout.py', 'playengine.py', 'templates.py']
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.dealformatter', 'cache')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def code_version() -> str:
+    # hash of the source of the rendering modules
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in RENDER_MODULES:
+        with open(os.path.join(here, module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+VERSION = code_version()
+
+
+class RenderCache:
+    def __init__(self, directory: str = '', max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or DEFAULT_DIRECTORY
+        self.max_bytes = max_bytes
+        self.changed = False
+        os.makedirs(os.path.join(self.directory, 'records'), exist_ok=True)
+
+    def key(self, deal: dict, args, played=None) -> str:
+        # canonical hash of the deal and the options; played overrides args.played
+        options = dict([(option, getattr(args, option, None)) for option in RENDER_OPTIONS])
+        if played is not None:
+            options['played'] = played
+        canonical = json.dumps({ 'deal': deal, 'options': options, 'version': VERSION }, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.html')
+
+    def get(self, key: str):
+        # returns the cached html, or None
+        path = self.path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+        except FileNotFoundError:
+            return None
+        # mark as recently used
+        os.utime(path)
+        return html
+
+    def put(self, key: str, html: str):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first so that other processes never read a partial entry
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(temp, path)
+        self.changed = True
+
+    def record_path(self, filename: str) -> str:
+        name = hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, 'records', name)
+
+    def is_current(self, filename: str, key: str) -> bool:
+        # True if filename was last written through the cache from key and has not changed since
+        try:
+            with open(self.record_path(filename), 'r') as f:
+                record = json.load(f)
+            stat = os.stat(filename)
+        except (FileNotFoundError, ValueError):
+            return False
+        return record == { 'key': key, 'size': stat.st_size, 'mtime': stat.st_mtime_ns }
+
+    def record(self, filename: str, key: str):
+        stat = os.stat(filename)
+        with open(self.record_path(filename), 'w') as f:
+            json.dump({ 'key': key, 'size': stat.st_size, 'mtime': stat.st_mtime_ns }, f)
+
+    def evict(self):
+        # remove least recently used entries until the cache fits in max_bytes
+        if not self.changed:
+            return
+        entries = []
+        for folder in os.listdir(self.directory):
+            if folder == 'records' or not os.path.isdir(os.path.join(self.directory, folder)):
+                continue
+            for name in os.listdir(os.path.join(self.directory, folder)):
+                if not name.endswith('.html'):
+                    # entry still being written
+                    continue
+                path = os.path.join(self.directory, folder, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
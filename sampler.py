@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Sample the hands one seat cannot see, consistent with what it knows at some point of a deal, e.g. for
+articles on the opening lead or the play.
+
+    python sampler.py deal.json --seat West -n 10000 --seed 1 -j 4
+    python sampler.py session.pbn --board 7 --seat South --played 5 --constraints "East 5+ spades"
+    python sampler.py deal.json --seat West --render="-nsew" -o samples --show 6
+
+After n cards are played (--played), the seat knows
+    its own hand, and dummy's once the opening lead is made (the partner of declarer, from the auction),
+    the cards each seat has played, and that a seat that did not follow suit has no more of the suit led,
+and constraints drawn roughly from the auction (auction_constraints, e.g. "North 15-17 balanced" for a
+1NT opening; --no-auction leaves them out) together with any given with --constraints, in the language
+of dealgen.py.
+
+Each sample deals the unknown cards at random to the hidden seats and is kept if it is consistent with
+all of the above; cards that only one hidden seat can hold are given to it first.  The samples are made
+in blocks of BLOCK, block k from seed "<seed>:<k>", so a seed gives the same samples however many
+processes (-j) share the work.  The statistics are, for each suit, how often it splits each way between
+the hidden seats (lengths of their whole hands, in globals.directions order), the mean high card points
+of each hidden seat, and how often each hidden seat holds each unknown card.
+"""
+
+import argparse
+import concurrent.futures
+import dealgen
+import dealmodel
+import globals
+import json
+import playengine
+import random
+import shlex
+import sys
+
+from typing import List
+
+globals.initialize()
+
+BLOCK = 500
+
+# tries in a block before giving up on constraints that cannot be met
+MAX_TRIES = 1000000
+
+SUIT_NAMES = ['spades', 'hearts', 'diamonds', 'clubs']
+
+
+def auction_constraints(deal: dict) -> str:
+    # rough constraints on the hands from the auction, as dealgen.py constraints, e.g. "West 11- hcp, North 15-17 balanced"
+    # only the opening bid, the passes before it, the first pass of opener's partner and the first overcall are used
+    if deal.get('Dealer') not in globals.directions:
+        return ''
+    dealer = globals.directions.index(deal['Dealer'])
+    clauses = []
+    opener = None
+    responded = overcalled = False
+    for i, call in enumerate(call.upper() for call in deal.get('Auction', [])):
+        seat = (dealer + i) % 4
+        name = globals.directions[seat]
+        suit = SUIT_NAMES['SHDC'.index(call[1])] if call[1:2] in ('S', 'H', 'D', 'C') else ''
+        if opener is None:
+            if call == 'P':
+                clauses.append(f'{name} 11- hcp')
+            elif call[:1] in '1234567':
+                opener = seat
+                if opening_constraint(call, suit):
+                    clauses.append(f'{name} ' + opening_constraint(call, suit))
+        elif seat == (opener + 2) % 4 and not responded:
+            responded = True
+            if call == 'P':
+                clauses.append(f'{name} 7- hcp')
+        elif seat % 2 != opener % 2 and not overcalled and call != 'P':
+            overcalled = True
+            if call[:1] == '1' and suit:
+                clauses.append(f'{name} 8-17 hcp 5+ {suit}')
+            elif call == '1N':
+                clauses.append(f'{name} 15-18 balanced')
+    return ', '.join(clauses)
+
+def opening_constraint(call: str, suit: str) -> str:
+    level = int(call[0])
+    if call == '1N':
+        return '15-17 balanced'
+    if call == '2N':
+        return '20-21 balanced'
+    if call == '2C':
+        return '20+ hcp'
+    if level == 1:
+        return f"11-21 hcp {'5+ ' + suit if suit in ('spades', 'hearts') else ''}".strip()
+    if suit and level <= 4:
+        # weak two or pre-empt; openings at the five level and above say too little to constrain
+        return f"5-11 hcp {6 if level == 2 else 7}+ {suit}"
+    return ''
+
+
+class Setup:
+    # what the seat knows, in the form the sampling needs; picklable, for the worker processes
+    #   known      the cards known to be held by each seat (in globals.directions order)
+    #   forbidden  the cards each seat is known not to hold
+    #   hidden     the seats whose hands are not known
+    #   text       constraints in the language of dealgen.py, applied to the hidden seats
+    def __init__(self, deal: dict, seat: str, played: int, constraints: str = '', auction: bool = True):
+        self.seat = globals.directions.index(seat)
+        play = playengine.Play(deal)
+        played = max(0, min(played, len(play)))
+        hands = [None] * 4
+        for entry in deal.get('Seats', []):
+            if 'Hand' in entry:
+                hands[globals.directions.index(entry['Direction'])] = dealmodel.Hand.from_dict(entry['Hand']).mask
+        assert hands[self.seat] is not None, f"The hand of {seat} is not known"
+
+        visible = {self.seat}
+        if played and play.declarer >= 0:
+            visible.add((play.declarer + 2) % 4)
+        self.known = [hands[s] if s in visible and hands[s] is not None else 0 for s in range(4)]
+        self.hidden = [s for s in range(4) if s not in visible or hands[s] is None]
+        self.forbidden = [0, 0, 0, 0]
+        for position in range(played):
+            index = play.cards[position]
+            owner = play.seats[position]
+            if index < 0 or owner < 0:
+                continue
+            self.known[owner] |= 1 << index
+            led = play.cards[play.leads[position]]
+            if index // 13 != led // 13 and led >= 0:
+                # shown out: no more cards of the suit led than it has played
+                self.forbidden[owner] |= dealmodel.SUIT_MASK << (13 * (led // 13))
+        held = 0
+        for mask in self.known:
+            held |= mask
+        self.unknown = dealmodel.ALL_CARDS & ~held
+        for s in range(4):
+            self.forbidden[s] &= self.unknown
+        self.text = ', '.join(text for text in (auction_constraints(deal) if auction else '', constraints) if text)
+
+    def conditions(self) -> dict:
+        # { seat index: [conditions] } for the hidden seats
+        return dict([(globals.directions.index(direction), tests) for direction, tests in dealgen.parse_constraints(self.text).items()
+                     if globals.directions.index(direction) in self.hidden])
+
+
+def sample_block(setup: Setup, seed: str, count: int, keep: int = 0) -> dict:
+    # count samples consistent with the setup, made from a generator seeded with seed, and their statistics;
+    #   the first keep samples are returned as lists of masks
+    rng = random.Random(seed)
+    conditions = setup.conditions()
+    hands = list(setup.known)
+    needs = dict([(seat, 13 - bin(setup.known[seat]).count('1')) for seat in setup.hidden])
+
+    # cards that only one hidden seat may hold go to that seat
+    pool = []
+    for index in dealmodel.mask_indexes(setup.unknown):
+        allowed = [seat for seat in setup.hidden if not setup.forbidden[seat] >> index & 1]
+        assert allowed, f"No seat can hold {dealmodel.card_name(index)}"
+        if len(allowed) == 1:
+            hands[allowed[0]] |= 1 << index
+            needs[allowed[0]] -= 1
+        else:
+            pool.append(index)
+    assert all(need >= 0 for need in needs.values()), "The cards known do not fit the hands"
+    assert sum(needs.values()) == len(pool), "The cards known do not fit the hands"
+
+    stats = empty_stats(setup)
+    samples = []
+    tries = 0
+    while stats['samples'] < count:
+        tries += 1
+        assert tries <= MAX_TRIES, f"No layout found consistent with '{setup.text}' in {MAX_TRIES} tries"
+        rng.shuffle(pool)
+        layout = list(hands)
+        start = 0
+        for seat in setup.hidden:
+            for index in pool[start:start + needs[seat]]:
+                layout[seat] |= 1 << index
+            start += needs[seat]
+        if any(layout[seat] & setup.forbidden[seat] for seat in setup.hidden):
+            continue
+        if not all(all(test(dealgen.suits(layout[seat])) for test in tests) for seat, tests in conditions.items()):
+            continue
+        add_sample(stats, setup, layout)
+        if len(samples) < keep:
+            samples.append(layout)
+    stats['tries'] = tries
+    stats['layouts'] = samples
+    return stats
+
+def empty_stats(setup: Setup) -> dict:
+    return { 'samples': 0, 'tries': 0,
+            'seats': [globals.directions[seat] for seat in setup.hidden],
+            'splits': dict([(suit, {}) for suit in SUIT_NAMES]),
+            'hcp': dict([(globals.directions[seat], 0) for seat in setup.hidden]),
+            'cards': {},
+            'layouts': []
+            }
+
+def add_sample(stats: dict, setup: Setup, layout: List[int]):
+    stats['samples'] += 1
+    for suit, name in enumerate(SUIT_NAMES):
+        split = '-'.join(str(dealgen.SUIT_LENGTH[(layout[seat] >> (13 * suit)) & dealmodel.SUIT_MASK]) for seat in setup.hidden)
+        stats['splits'][name][split] = stats['splits'][name].get(split, 0) + 1
+    for seat in setup.hidden:
+        direction = globals.directions[seat]
+        stats['hcp'][direction] += sum(dealgen.SUIT_HCP[holding] for holding in dealgen.suits(layout[seat]))
+        for index in dealmodel.mask_indexes(layout[seat] & setup.unknown):
+            holders = stats['cards'].setdefault(dealmodel.card_name(index), {})
+            holders[direction] = holders.get(direction, 0) + 1
+
+def merge(total: dict, stats: dict) -> dict:
+    # add the statistics of a block to total
+    total['samples'] += stats['samples']
+    total['tries'] += stats['tries']
+    for suit, splits in stats['splits'].items():
+        for split, n in splits.items():
+            total['splits'][suit][split] = total['splits'][suit].get(split, 0) + n
+    for direction, points in stats['hcp'].items():
+        total['hcp'][direction] += points
+    for card, holders in stats['cards'].items():
+        totals = total['cards'].setdefault(card, {})
+        for direction, n in holders.items():
+            totals[direction] = totals.get(direction, 0) + n
+    total['layouts'] += stats['layouts']
+    return total
+
+def sample(setup: Setup, count: int, seed=0, jobs: int = 1, keep: int = 0) -> dict:
+    # the statistics of count samples, with the first keep layouts
+    blocks = [(setup, f'{seed}:{k}', min(BLOCK, count - start), keep if k == 0 else 0) for k, start in enumerate(range(0, count, BLOCK))]
+    total = empty_stats(setup)
+    if jobs <= 1 or len(blocks) <= 1:
+        for block in blocks:
+            merge(total, sample_block(*block))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            for stats in executor.map(sample_block, *zip(*blocks)):
+                merge(total, stats)
+    return total
+
+def sample_deals(deal: dict, setup: Setup, layouts: List[List[int]], played: int) -> List[dict]:
+    # copies of the deal holding the sampled layouts, with the play up to the cards known
+    deals = []
+    for i, layout in enumerate(layouts, 1):
+        copy = dict(deal)
+        copy['Board number'] = i
+        copy['Seats'] = [dict(seat, Hand=dealmodel.Hand(layout[globals.directions.index(seat['Direction'])]).to_dict())
+                         for seat in deal.get('Seats', [])]
+        copy['Play'] = deal.get('Play', [])[:played]
+        deals.append(copy)
+    return deals
+
+def summary(stats: dict) -> str:
+    count = stats['samples'] or 1
+    lines = [f"{stats['samples']} samples ({stats['tries']} tried); splits between {', '.join(stats['seats'])}"]
+    for suit, splits in stats['splits'].items():
+        ordered = sorted(splits.items(), key=lambda item: -item[1])
+        lines.append(f"  {suit:<9} " + '  '.join(f'{split} {100 * n / count:.1f}%' for split, n in ordered))
+    lines.append('  hcp       ' + '  '.join(f'{direction} {points / count:.1f}' for direction, points in stats['hcp'].items()))
+    return '\n'.join(lines)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter hidden hand sampler')
+    parser.add_argument('input', help='pbn, lin, json or dfc file holding the deal')
+    parser.add_argument('--board', type=int, default=None, help='the board of the file to use (default: the first)')
+    parser.add_argument('--seat', default='South', help='the seat whose view is sampled')
+    parser.add_argument('-p', '--played', type=int, default=0, help='number of cards played')
+    parser.add_argument('--constraints', default='', help='further constraints on the hidden hands, as for dealgen.py')
+    parser.add_argument('--no-auction', action='store_true', help='do not draw constraints from the auction')
+    parser.add_argument('-n', '--count', type=int, default=1000, help='number of samples')
+    parser.add_argument('--seed', default='0', help='seed; the same seed gives the same samples')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--json', default='', help='write the statistics to this json file')
+    parser.add_argument('--render', default=None, help='write html of sample layouts with these options to main.py, e.g. --render="-nsew"')
+    parser.add_argument('--show', type=int, default=4, help='with --render, the number of layouts to render')
+    parser.add_argument('-o', '--output', default='samples', help='with --render, the prefix of the html files')
+    return parser.parse_args(argv)
+
+def run(args):
+    import main
+    deals = main.read_file(args.input)
+    deal = next((deal for deal in deals if args.board is None or deal.get('Board number') == args.board), None)
+    assert deal, f"Board {args.board} is not in {args.input}"
+    seat = dealgen.SEAT_WORDS.get(args.seat.lower(), args.seat)
+    setup = Setup(deal, seat, args.played, args.constraints, not args.no_auction)
+    if setup.text:
+        print(f"Constraints: {setup.text}")
+    stats = sample(setup, args.count, args.seed, args.jobs, args.show if args.render is not None else 0)
+    print(summary(stats))
+    layouts = stats.pop('layouts')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(stats, f, indent=2)
+        print(f"Statistics written to {args.json}")
+    if args.render is not None:
+        render_args = main.parse_args(['-'] + shlex.split(args.render) + ['-p', str(args.played), '-o', args.output])
+        main.write_deals(sample_deals(deal, setup, layouts, args.played), render_args)
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+A local render server, so that each render does not pay for starting Python and importing the modules.
+
+Start it with
+    python server.py [--port 8765]
+and send requests with client.py, which takes the same arguments as main.py.
+
+Each request is a POST of a json object to one of the following paths; the reply is a json object.
+    /run        { "argv": [arguments to main.py], "cwd": <directory relative paths are relative to> }
+                    -> { "files": [files written] }
+    /parse-url  { "url": <BBO handviewer url> }                      -> { "deal": <deal> }
+    /parse-pbn  { "path": <pbn file> } or { "text": <pbn text> }     -> { "deals": [deals] }
+    /parse-lin  { "path": <lin file> } or { "text": <lin text> }     -> { "deals": [deals] }
+    /render     { "deal": <deal>, "options": "-nsewa -p4" }          -> { "html": <html> }
+                    with -p -1, the reply also holds "frames": [{ "played": n, "html": <html> }, ...]
+    /url        { "deal": <deal> }                                   -> { "url": <BBO handviewer url> }
+A failed request gets status 400 and the reply { "error": <message> }.
+GET /status replies { "status": "ok" }.
+
+The server listens on localhost only, but a web page open in a browser can still send requests to localhost,
+so a POST is only served if it
+    has Content-Type application/json, which a page cannot send to another site without the browser asking first;
+    has no Origin header, which browsers add to requests sent by pages;
+    carries the token the server chose when it started in its X-DealFormatter-Token header.
+A request that does not gets status 403.
+The token is written to ~/.dealformatter/server-<port>.token, readable by the user alone, where client.py reads it.
+
+Requests are handled on separate threads.
+"""
+
+import argparse
+import hmac
+import http.server
+import json
+import main
+import os
+import parselin
+import parsepbn
+import parseurl
+import secrets
+import shlex
+import sys
+
+DEFAULT_PORT = 8765
+TOKEN_HEADER = 'X-DealFormatter-Token'
+
+
+def token_path(port: int) -> str:
+    return os.path.join(os.path.expanduser('~'), '.dealformatter', f'server-{port}.token')
+
+def write_token(port: int) -> str:
+    # a new token for this start of the server, in a file only the user can read
+    token = secrets.token_urlsafe(32)
+    path = token_path(port)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    return token
+
+
+def resolve_paths(args, cwd: str):
+    # make the file names in args relative to the client's directory rather than the server's
+    if args.input not in ('*', '**') and not args.input.startswith(('http', 'lib:')):
+        args.input = os.path.join(cwd, args.input)
+    args.output = os.path.join(cwd, args.output)
+    if args.cache_dir:
+        args.cache_dir = os.path.join(cwd, args.cache_dir)
+    if args.library:
+        args.library = os.path.join(cwd, args.library)
+    if args.dd_cache:
+        args.dd_cache = os.path.join(cwd, args.dd_cache)
+    return args
+
+def option_list(options) -> list:
+    # options may be given as a string, e.g. "-nsewa -p4", or as a list
+    return shlex.split(options) if isinstance(options, str) else list(options)
+
+def run(request: dict) -> dict:
+    args = main.parse_args(request['argv'])
+    assert args.input != '*', 'Console input is not available through the server'
+    resolve_paths(args, request.get('cwd', os.getcwd()))
+    return { 'files': main.main(args) or [] }
+
+def parse_url(request: dict) -> dict:
+    return { 'deal': parseurl.parse(request['url']) }
+
+def parse_pbn(request: dict) -> dict:
+    if 'text' in request:
+        return { 'deals': list(parsepbn.read_deals(request['text'].splitlines())) }
+    return { 'deals': list(parsepbn.parse(request['path'])) }
+
+def parse_lin(request: dict) -> dict:
+    if 'text' in request:
+        return { 'deals': list(parselin.read_deals(parseurl.tokenize([request['text']]))) }
+    return { 'deals': list(parselin.parse(request['path'])) }
+
+def render(request: dict) -> dict:
+    args = main.parse_args(['-'] + option_list(request.get('options', [])))
+    deal = main.prepare_deal(request['deal'], args)
+    frames = list(main.render_frames(deal, args))
+    reply = { 'html': frames[0][1] if frames else '' }
+    if len(frames) > 1:
+        # --played -1 gives one page per card played
+        reply['frames'] = [{ 'played': n, 'html': html } for n, html in frames]
+    return reply
+
+def url(request: dict) -> dict:
+    return { 'url': main.build_url(request['deal']) }
+
+OPERATIONS = { '/run': run,
+        '/parse-url': parse_url,
+        '/parse-pbn': parse_pbn,
+        '/parse-lin': parse_lin,
+        '/render': render,
+        '/url': url
+        }
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    # the token of the server, set by serve
+    token = None
+
+    def reply(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/status':
+            self.reply(200, { 'status': 'ok' })
+        else:
+            self.reply(404, { 'error': f'Unknown path {self.path}' })
+
+    def refusal(self) -> str:
+        # why the request may not be served, or '' if it may
+        if self.headers.get('Content-Type', '').split(';')[0].strip().lower() != 'application/json':
+            return 'Requests must have Content-Type application/json'
+        if 'Origin' in self.headers:
+            return 'Requests from web pages are not served'
+        if not self.token or not hmac.compare_digest(self.headers.get(TOKEN_HEADER, '').encode('utf-8'), self.token.encode('utf-8')):
+            return f'Requests must carry the token of the server in {TOKEN_HEADER}'
+        return ''
+
+    def do_POST(self):
+        refusal = self.refusal()
+        if refusal:
+            self.reply(403, { 'error': refusal })
+            return
+        operation = OPERATIONS.get(self.path)
+        if operation is None:
+            self.reply(404, { 'error': f'Unknown path {self.path}' })
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            self.reply(200, operation(request))
+        except SystemExit:
+            # argparse reports bad options by exiting
+            self.reply(400, { 'error': 'Invalid options' })
+        except Exception as e:
+            self.reply(400, { 'error': f'{type(e).__name__}: {e}' })
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Deal Formatter render server')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    return parser.parse_args(argv)
+
+def serve(args):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', args.port), RequestHandler)
+    RequestHandler.token = write_token(args.port)
+    print(f"Deal Formatter server listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    try:
+        os.remove(token_path(args.port))
+    except OSError:
+        pass
+
+
+if __name__ == '__main__':
+    serve(parse_args(sys.argv[1:]))
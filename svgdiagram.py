@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+SVG backend for layouts (layout.build): the diagram, auction and double-dummy tricks as a standalone image.
+
+    svgdiagram.svg(page)
+
+The image is laid out like the html: North and South above and below the felt, West and East beside it,
+the auction and the double-dummy table below.  Text is measured at an average CHAR_WIDTH per character,
+since the fonts of the viewer are not known; grayed cards are drawn gray and whited cards white, keeping
+their place as they do in the html.
+"""
+
+import ddsolver
+import globals
+import html
+import layout
+import plaintext
+
+from typing import List, Tuple
+
+globals.initialize()
+
+FONT = 'system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif'
+FONT_SIZE = 14
+LINE_HEIGHT = 18
+CHAR_WIDTH = 8.5
+MARGIN = 12
+GAP = 16
+
+FELT_WIDTH = 120
+FELT_HEIGHT = 80
+CARD_WIDTH = 34
+CARD_HEIGHT = 20
+
+RED = '#c01616'
+STATE_COLORS = { layout.GRAY: '#aaa', layout.WHITE: '#fff' }
+
+# a block of the image: its elements, placed from (0, 0), with its width and height
+Block = Tuple[List[str], float, float]
+
+
+def number(value: float) -> str:
+    return f'{value:.1f}'.rstrip('0').rstrip('.')
+
+def place(block: Block, x: float, y: float) -> str:
+    elements, width, height = block
+    return f'<g transform="translate({number(x)},{number(y)})">' + ''.join(elements) + '</g>'
+
+def pip(suit: str) -> str:
+    symbol = plaintext.SYMBOLS[suit]
+    return f'<tspan fill="{RED}">{symbol}</tspan>' if suit in 'HD' else symbol
+
+def text(x: float, y: float, content: str, attributes: str = '') -> str:
+    return f'<text x="{number(x)}" y="{number(y)}"{" " + attributes if attributes else ""}>{content}</text>'
+
+def suit_content(suit: str, cards: list) -> Tuple[str, int]:
+    # the content of the text element of a suit, and its length in characters
+    ranks = []
+    length = 2
+    for rank, state in cards:
+        rank = '10' if rank == 'T' else rank
+        length += len(rank) + 1
+        ranks.append(f'<tspan fill="{STATE_COLORS[state]}">{rank}</tspan>' if state in STATE_COLORS else rank)
+    if not ranks:
+        ranks = ['--']
+        length += 2
+    return pip(suit) + ' ' + ' '.join(ranks), length
+
+def call_content(call: str) -> str:
+    # a call with its suit symbol colored
+    if call and call[0] in '1234567' and call[1:2] in 'SHDC':
+        return call[0] + pip(call[1]) + html.escape(call[2:])
+    return html.escape(plaintext.call_text(call, plaintext.SYMBOLS))
+
+def hand_block(box: layout.HandBox) -> Block:
+    elements = []
+    y = LINE_HEIGHT
+    elements.append(text(0, y, html.escape(box.direction.upper()), 'font-weight="bold"'))
+    widest = len(box.direction)
+    if box.player:
+        y += LINE_HEIGHT
+        elements.append(text(0, y, html.escape(box.player), 'font-style="italic"'))
+        widest = max(widest, len(box.player))
+    if box.suits is not None:
+        if box.stats:
+            y += LINE_HEIGHT
+            stats = f'{box.stats[0]} HCP, {box.stats[1]}'
+            elements.append(text(0, y, stats, 'font-size="12"'))
+            widest = max(widest, len(stats))
+        for suit, cards in box.suits:
+            y += LINE_HEIGHT
+            content, length = suit_content(suit, cards)
+            elements.append(text(0, y, content))
+            widest = max(widest, length)
+    return elements, widest * CHAR_WIDTH, y + LINE_HEIGHT / 3
+
+def felt_block(felt: list) -> Block:
+    # the felt, with the cards of the current trick at the side of the table of the seat that played them
+    elements = [f'<rect width="{FELT_WIDTH}" height="{FELT_HEIGHT}" rx="12" fill="#215b33" stroke="#134022" stroke-width="3"/>']
+    positions = { 'North': ((FELT_WIDTH - CARD_WIDTH) / 2, 4),
+                 'South': ((FELT_WIDTH - CARD_WIDTH) / 2, FELT_HEIGHT - CARD_HEIGHT - 4),
+                 'West': (4, (FELT_HEIGHT - CARD_HEIGHT) / 2),
+                 'East': (FELT_WIDTH - CARD_WIDTH - 4, (FELT_HEIGHT - CARD_HEIGHT) / 2) }
+    for direction, card in felt or []:
+        if direction not in positions:
+            continue
+        x, y = positions[direction]
+        rank = '10' if card[1] == 'T' else card[1:]
+        elements.append(f'<g transform="translate({number(x)},{number(y)})">'
+                        f'<rect width="{CARD_WIDTH}" height="{CARD_HEIGHT}" rx="4" fill="#fff" stroke="#d9d9d9"/>'
+                        + text(CARD_WIDTH / 2, 15, pip(card[0]) + rank, 'text-anchor="middle" font-weight="bold"') + '</g>')
+    return elements, FELT_WIDTH, FELT_HEIGHT
+
+def diagram_block(page: layout.Layout) -> Block:
+    # three columns: West, then North, the felt and South, then East; the middle row is centered vertically
+    hands = dict([(direction, hand_block(box)) for direction, box in page.hands.items()])
+    empty = ([], 0, 0)
+    north, west, east, south = [hands.get(direction, empty) for direction in ['North', 'West', 'East', 'South']]
+    felt = felt_block(page.felt)
+    left = max(west[1], FELT_WIDTH) + GAP
+    center = max(north[1], south[1], felt[1]) + GAP
+    middle = max(west[2], east[2], felt[2] + GAP)
+    top = north[2]
+
+    elements = [place(north, left, 0),
+                place(west, 0, top + (middle - west[2]) / 2),
+                place(felt, left, top + (middle - felt[2]) / 2),
+                place(east, left + center, top + (middle - east[2]) / 2),
+                place(south, left, top + middle)]
+    return elements, left + center + max(east[1], FELT_WIDTH), top + middle + south[2]
+
+def single_block(page: layout.Layout) -> Block:
+    # a hand on its own: a suit on each line if vertical, else all on one line
+    elements = []
+    x = y = 0
+    width = 0
+    for suit, cards in page.single.suits:
+        content, length = suit_content(suit, cards)
+        if page.vertical:
+            y += LINE_HEIGHT
+            elements.append(text(0, y, content))
+            width = max(width, length * CHAR_WIDTH)
+        else:
+            elements.append(text(x, LINE_HEIGHT, content))
+            x += (length + 2) * CHAR_WIDTH
+            width = x
+    return elements, width, (y if page.vertical else LINE_HEIGHT) + LINE_HEIGHT / 3
+
+def table_block(rows: List[List[str]], widths: List[float], anchor: str = 'start', styles: List[str] = ()) -> Block:
+    # rows of cells in columns of the widths given; styles are the attributes of the text of the first rows
+    elements = []
+    y = 0
+    for index, row in enumerate(rows):
+        y += LINE_HEIGHT
+        x = 0
+        for cell, width in zip(row, widths):
+            attributes = styles[index] if index < len(styles) else ''
+            if anchor == 'end':
+                attributes = ('text-anchor="end" ' + attributes).strip()
+            elements.append(text(x + (width - 6 if anchor == 'end' else 0), y, cell, attributes))
+            x += width
+    return elements, sum(widths), y + LINE_HEIGHT / 3
+
+def auction_block(auction: layout.Auction) -> Block:
+    rows = [[html.escape(name) for name in globals.directions]] if auction.directions else []
+    rows.append([html.escape(name) for name in auction.names])
+    cells = [call_content(cell) for cell in auction.cells]
+    cells += [''] * (-len(cells) % 4)
+    rows += [cells[i:i + 4] for i in range(0, len(cells), 4)]
+    words = [len(name) for name in auction.names] + [len(plaintext.call_text(cell, plaintext.SYMBOLS)) for cell in auction.cells]
+    width = max(words + [8]) * CHAR_WIDTH + 12
+    styles = (['font-weight="bold"'] if auction.directions else []) + ['font-style="italic"']
+    return table_block(rows, [width] * 4, styles=styles)
+
+def double_dummy_block(double_dummy: layout.DoubleDummy) -> Block:
+    header = [''] + ['NT' if strain == 'N' else pip(strain) for strain in ddsolver.STRAINS]
+    rows = [header] + plaintext.double_dummy_rows(double_dummy, plaintext.SYMBOLS)[1:]
+    elements, width, height = table_block(rows, [40] * len(header), anchor='end', styles=['font-weight="bold"'])
+    par = html.escape(layout.par_line(double_dummy, lambda contract: plaintext.contract_text(contract, plaintext.SYMBOLS)))
+    elements.append(text(0, height + LINE_HEIGHT, par))
+    return elements, max(width, len(par) * CHAR_WIDTH), height + LINE_HEIGHT * 4 / 3
+
+def svg(page: layout.Layout) -> str:
+    # the layout as an SVG document, its parts one below the other and centered
+    blocks = []
+    if page.single:
+        blocks.append(single_block(page))
+    elif page.hands is not None:
+        blocks.append(diagram_block(page))
+    if page.auction:
+        blocks.append(auction_block(page.auction))
+    if page.double_dummy:
+        blocks.append(double_dummy_block(page.double_dummy))
+
+    width = max([block[1] for block in blocks] + [0])
+    elements = []
+    y = MARGIN
+    for block in blocks:
+        elements.append(place(block, MARGIN + (width - block[1]) / 2, y))
+        y += block[2] + GAP
+    width = number(width + 2 * MARGIN)
+    height = number(y - GAP + MARGIN if blocks else 2 * MARGIN)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
+            f'font-family="{FONT}" font-size="{FONT_SIZE}">\n'
+            f'<rect width="100%" height="100%" fill="#fff"/>\n' + '\n'.join(elements) + '\n</svg>\n')
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+The html templates of constants.py, compiled once at import.
+
+A compiled template is a sequence of literal segments and named slots, so that rendering it appends
+chunks to a list (or writes them to a sink) instead of building new strings with str.format.
+    CALL.render_into(out, call='Pass') appends the same text as constants.CALL_TEMPLATE.format(call='Pass')
+"""
+
+import constants
+import string
+
+from typing import List
+
+
+class Template:
+    __slots__ = ('segments',)
+
+    def __init__(self, text: str):
+        # segments is a tuple of (literal, slot) pairs; slot is None after the last literal
+        self.segments = tuple((literal, slot) for literal, slot, spec, conversion in string.Formatter().parse(text))
+
+    def render_into(self, out: List[str], **values):
+        # append the chunks of the rendered template to out
+        for literal, slot in self.segments:
+            if literal:
+                out.append(literal)
+            if slot is not None:
+                out.append(str(values[slot]))
+
+    def render(self, **values) -> str:
+        out = []
+        self.render_into(out, **values)
+        return ''.join(out)
+
+
+HORIZONTAL_HAND = Template(constants.HORIZONTAL_HAND_TEMPLATE)
+CENTER_HAND = Template(constants.CENTER_HAND_TEMPLATE)
+WEST_HAND = Template(constants.WEST_HAND_TEMPLATE)
+EAST_HAND = Template(constants.EAST_HAND_TEMPLATE)
+AUCTION_DIRECTIONS = Template(constants.AUCTION_DIRECTIONS_TEMPLATE)
+AUCTION_NAMES = Template(constants.AUCTION_NAMES_TEMPLATE)
+AUCTION = Template(constants.AUCTION_TEMPLATE)
+CALL = Template(constants.CALL_TEMPLATE)
+CARD_TABLE_ENTRY = Template(constants.CARD_TABLE_ENTRY_TEMPLATE)
+HAND_DIRECTION = Template(constants.HAND_DIRECTION_TEMPLATE)
+HAND_NAME = Template(constants.HAND_NAME_TEMPLATE)
+HAND_STATS = Template(constants.HAND_STATS_TEMPLATE)
+REPLAY_INTRO = Template(constants.REPLAY_INTRO)
+REPLAY_CARD = Template(constants.REPLAY_CARD_TEMPLATE)
+REPLAY_VOID = Template(constants.REPLAY_VOID_TEMPLATE)
+REPLAY_CARD_TABLE_ENTRY = Template(constants.REPLAY_CARD_TABLE_ENTRY_TEMPLATE)
+REPLAY_CONTROLS = Template(constants.REPLAY_CONTROLS_TEMPLATE)
+BOARD_TITLE = Template(constants.BOARD_TITLE_TEMPLATE)
+DOUBLE_DUMMY = Template(constants.DOUBLE_DUMMY_TEMPLATE)
+DOUBLE_DUMMY_CELL = Template(constants.DOUBLE_DUMMY_CELL_TEMPLATE)
+DOUBLE_DUMMY_ROW = Template(constants.DOUBLE_DUMMY_ROW_TEMPLATE)
@@ -0,0 +1,19 @@
+import batch
+import pytest
+
+
+@pytest.mark.parametrize('item, argv', [
+    ({ 'input': 'a.pbn', 'options': '-nsewa' }, ['a.pbn', '-nsewa', '-o', 'output-3']),
+    ({ 'input': 'a.pbn', 'options': '-nsewa', 'output': 'board' }, ['a.pbn', '-nsewa', '-o', 'board']),
+    # every form argparse takes for the output, including short options clustered before it
+    ({ 'input': 'a.pbn', 'options': '-s -o out' }, ['a.pbn', '-s', '-o', 'out']),
+    ({ 'input': 'a.pbn', 'options': '-s -oout' }, ['a.pbn', '-s', '-oout']),
+    ({ 'input': 'a.pbn', 'options': '-so out' }, ['a.pbn', '-so', 'out']),
+    ({ 'input': 'a.pbn', 'options': '-nso out' }, ['a.pbn', '-nso', 'out']),
+    ({ 'input': 'a.pbn', 'options': ['-s', '--out=out'] }, ['a.pbn', '-s', '--out=out']),
+    ({ 'input': 'a.pbn', 'options': '-s -o output' }, ['a.pbn', '-s', '-o', 'output']),
+    # -p takes a value that is not an output
+    ({ 'input': 'a.pbn', 'options': '-s -p -1' }, ['a.pbn', '-s', '-p', '-1', '-o', 'output-3']),
+])
+def test_item_argv(item, argv):
+    assert batch.item_argv(item, 3) == argv
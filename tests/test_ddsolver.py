@@ -0,0 +1,164 @@
+import dealmodel
+import ddsolver
+import functools
+import pytest
+import random
+import re
+
+
+def trick_table(ns: dict, ew: dict = None) -> dict:
+    # a trick table from the tricks of North-South in each strain (both seats alike); East-West take
+    #   the rest unless given
+    ew = ew or {}
+    return dict([(strain, { 'North': ns.get(strain, 6), 'South': ns.get(strain, 6),
+                            'East': ew.get(strain, 13 - ns.get(strain, 6)), 'West': ew.get(strain, 13 - ns.get(strain, 6)) })
+                 for strain in ddsolver.STRAINS])
+
+
+@pytest.mark.parametrize('level, strain, tricks, vulnerable, doubled, score', [
+    (3, 'N', 9, False, False, 400),
+    (4, 'H', 11, True, False, 650),
+    (6, 'S', 12, False, False, 980),
+    (7, 'N', 13, True, False, 2220),
+    (2, 'C', 8, False, True, 180),
+    (4, 'S', 7, False, True, -500),
+    (5, 'C', 10, False, True, -100),
+    (5, 'S', 9, True, True, -500),
+    (3, 'D', 6, False, False, -150),
+])
+def test_contract_score(level, strain, tricks, vulnerable, doubled, score):
+    assert ddsolver.contract_score(level, strain, tricks, vulnerable, doubled) == score
+
+
+@pytest.mark.parametrize('table, vulnerable, dealer, expected', [
+    # nobody can make a contract: passed out
+    (trick_table({}, { 'C': 6, 'D': 6, 'H': 6, 'S': 6, 'N': 6 }), 'None', 'North', (0, [])),
+    # a game, with no sacrifice that pays
+    (trick_table({ 'N': 9 }, { 'C': 6, 'D': 6, 'H': 6, 'S': 6, 'N': 4 }), 'None', 'North', (400, ['3NN', '3NS'])),
+    (trick_table({ 'N': 9 }, { 'C': 6, 'D': 6, 'H': 6, 'S': 6, 'N': 4 }), 'NS', 'East', (600, ['3NN', '3NS'])),
+    # a grand slam
+    (trick_table({ 'C': 11, 'D': 11, 'H': 12, 'S': 13, 'N': 12 }), 'All', 'West', (2210, ['7SN', '7SS'])),
+    # East-West's game
+    (trick_table({ 'H': 3, 'S': 3, 'N': 5 }, { 'C': 6, 'D': 6 }), 'EW', 'North', (-620, ['4HE', '4HW', '4SE', '4SW'])),
+    # 5C doubled down one over the vulnerable 4H, rather than 4S doubled down three
+    (trick_table({ 'H': 10 }, { 'S': 7, 'C': 10 }), 'NS', 'North', (100, ['5CxE', '5CxW'])),
+    # North-South bid on to 5H over a sacrifice in 4S, and East-West sacrifice again in 5S or 5NT
+    (trick_table({ 'H': 11 }, { 'C': 9, 'D': 9, 'S': 9, 'N': 9 }), 'None', 'North', (300, ['5SxE', '5SxW', '5NxE', '5NxW'])),
+    # a partscore battle: 3H doubled down one beats letting North-South play 2S
+    (trick_table({ 'S': 8, 'H': 5 }, { 'N': 6 }), 'None', 'North', (100, ['3HxE', '3HxW'])),
+    # both sides can make 1NT and no more: the side that bids first plays it
+    (trick_table({ 'N': 7 }, { 'N': 7 }), 'None', 'North', (90, ['1NN', '1NS'])),
+    (trick_table({ 'N': 7 }, { 'N': 7 }), 'None', 'East', (-90, ['1NE', '1NW'])),
+    # the sacrifice would cost more than the game is worth
+    (trick_table({ 'H': 10 }, { 'S': 6 }), 'None', 'North', (420, ['4HN', '4HS'])),
+])
+def test_par(table, vulnerable, dealer, expected):
+    assert ddsolver.par(table, vulnerable, dealer) == expected
+
+
+def hands(*suits: str) -> list:
+    # card masks of North, East, South and West from their suits, e.g. hands('AKQ...', '3.KQ..', ...)
+    return [dealmodel.Hand.from_suits(hand.split('.')).mask for hand in suits]
+
+def brute_force(hands: list, leader: int, trump: int) -> int:
+    # the tricks the side of leader takes, trying every card of every seat
+    @functools.lru_cache(None)
+    def tricks(hands: tuple, leader: int) -> int:
+        if not hands[leader]:
+            return 0
+        def play(hands: tuple, seat: int, played: list) -> int:
+            if len(played) == 4:
+                winner, best = played[0]
+                for other, card in played[1:]:
+                    if card // 13 == best // 13 and card < best or card // 13 == trump and best // 13 != trump:
+                        winner, best = other, card
+                after = tricks(hands, winner)
+                return 1 + after if winner % 2 == leader % 2 else bin(hands[winner]).count('1') - after
+            cards = list(dealmodel.mask_indexes(hands[seat]))
+            if played:
+                cards = [card for card in cards if card // 13 == played[0][1] // 13] or cards
+            results = [play(hands[:seat] + (hands[seat] & ~(1 << card),) + hands[seat + 1:], (seat + 1) % 4, played + [(seat, card)])
+                       for card in cards]
+            return max(results) if seat % 2 == leader % 2 else min(results)
+        return play(hands, leader, [])
+    return tricks(tuple(hands), leader)
+
+
+@pytest.mark.parametrize('strain', ddsolver.STRAINS)
+def test_endings(strain):
+    # random three card endings against trying every card; one search answers them all, sharing its table
+    rng = random.Random(strain)
+    search = ddsolver.Search(ddsolver.STRAIN_SUIT[strain])
+    for _ in range(25):
+        ending = [0, 0, 0, 0]
+        for i, card in enumerate(rng.sample(range(52), 12)):
+            ending[i % 4] |= 1 << card
+        for leader in range(4):
+            assert search.tricks(list(ending), leader) == brute_force(ending, leader, ddsolver.STRAIN_SUIT[strain])
+
+
+@pytest.mark.parametrize('ending, leader, strain, expected', [
+    # North cashes three spades
+    (hands('AKQ...', '3.KQ..', '..AKQ.', '2.AJ..'), 0, 'N', 3),
+    # leading from West, East-West take their two hearts first
+    (hands('AKQ...', '3.KQ..', '..AKQ.', '2.AJ..'), 3, 'N', 2),
+    # South ruffs the heart lead
+    (hands('AKQ...', '3.KQ..', '..AK.2', '2.AJ..'), 3, 'C', 0),
+    # a simple squeeze: on the diamond ace West lets go of a spade or the heart king, setting up North's
+    #   spade two or heart queen
+    (hands('A2.Q..', '..543.', '3.2.A.', 'KQ.K..'), 2, 'N', 3),
+])
+def test_small_endings(ending, leader, strain, expected):
+    assert ddsolver.Search(ddsolver.STRAIN_SUIT[strain]).tricks(ending, leader) == expected
+
+
+# each seat holds a suit: the side holding the trumps takes every trick, and nobody takes a trick in notrump
+SUITS = hands('AKQJT98765432...', '.AKQJT98765432..', '..AKQJT98765432.', '...AKQJT98765432')
+# North holds the top cards of every suit; East-West make a trump trick only when one of them holds
+#   four trumps
+TOP_CARDS = hands('AKQJ.AKQ.AKQ.AKQ', 'T98.JT9.JT9.JT98', '765.8765.876.765', '432.432.5432.432')
+
+
+@pytest.mark.parametrize('deal, strain, expected', [
+    (SUITS, 'S', { 'North': 13, 'East': 0, 'South': 13, 'West': 0 }),
+    (SUITS, 'H', { 'North': 0, 'East': 13, 'South': 0, 'West': 13 }),
+    (SUITS, 'D', { 'North': 13, 'East': 0, 'South': 13, 'West': 0 }),
+    (SUITS, 'C', { 'North': 0, 'East': 13, 'South': 0, 'West': 13 }),
+    (SUITS, 'N', { 'North': 0, 'East': 0, 'South': 0, 'West': 0 }),
+    (TOP_CARDS, 'S', { 'North': 13, 'East': 0, 'South': 13, 'West': 0 }),
+    (TOP_CARDS, 'H', { 'North': 13, 'East': 0, 'South': 13, 'West': 0 }),
+    (TOP_CARDS, 'D', { 'North': 12, 'East': 1, 'South': 12, 'West': 1 }),
+    (TOP_CARDS, 'C', { 'North': 12, 'East': 1, 'South': 12, 'West': 1 }),
+    (TOP_CARDS, 'N', { 'North': 13, 'East': 0, 'South': 13, 'West': 0 }),
+])
+def test_strain_tricks(deal, strain, expected):
+    assert ddsolver.strain_tricks(deal, strain) == expected
+
+
+def test_transposition_table():
+    # a position met again is answered from the table, as is one differing only in small cards
+    #   (South's and West's small clubs swapped)
+    search = ddsolver.Search(ddsolver.STRAIN_SUIT['C'])
+    assert search.tricks(list(TOP_CARDS), 1) == 1
+    assert search.table
+    nodes = search.nodes
+    assert search.tricks(list(TOP_CARDS), 1) == 1
+    swapped = hands('AKQJ.AKQ.AKQ.AKQ', 'T98.JT9.JT9.JT98', '765.8765.876.764', '432.432.5432.532')
+    assert search.tricks(swapped, 1) == 1
+    assert search.nodes == nodes
+
+
+def test_render_dd(tmp_path, monkeypatch):
+    # main.py --dd solves the deal and shows its tricks and par below the auction
+    import main
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'deal.pbn').write_text('[Board "1"]\n[Dealer "N"]\n[Vulnerable "None"]\n'
+                                       '[Deal "N:AKQJ.AKQ.AKQ.AKQ T98.JT9.JT9.JT98 765.8765.876.765 432.432.5432.432"]\n'
+                                       '[Auction "N"]\n2C Pass 2D Pass\n7NT Pass Pass Pass\n')
+    main.main(main.parse_args(['deal.pbn', '-nsewa', '--dd', '--dd-cache', str(tmp_path / 'dd.json'),
+                               '--no-library', '--no-cache', '-o', 'out']))
+    html = (tmp_path / 'out-nsewa.html').read_text(encoding='utf-8')
+    assert 'Par NS 1520: 7 NT N, 7 NT S' in html
+    for direction, tricks in [('N', [12, 12, 13, 13, 13]), ('E', [1, 1, 0, 0, 0]), ('S', [12, 12, 13, 13, 13]), ('W', [1, 1, 0, 0, 0])]:
+        cells = ''.join(f'<td align="center" width="16%">{n}</td>' for n in tricks)
+        assert f'<td align="left" width="20%">{direction}</td>' + cells in re.sub(r'\n\s*', '', html)
@@ -0,0 +1,24 @@
+import benchmark
+import dealcodec
+import dealindex
+import handstats
+import os
+import pytest
+
+
+def test_stale_index(tmp_path):
+    # the index answers for the corpus it was built from, and refuses the corpus once it is written again
+    corpus = str(tmp_path / 'deals.dfc')
+    dealcodec.write_corpus(corpus, benchmark.corpus(1, 40))
+    dealindex.build(corpus, dealindex.default_path(corpus))
+    with dealcodec.Corpus(corpus) as deals:
+        expected = [n for n, deal in enumerate(deals)
+                    if any(seat['Direction'] == 'South' and handstats.hand_stats(seat['Hand'])['hcp'] >= 10 for seat in deal['Seats'])]
+    with dealindex.Index(corpus) as index:
+        assert index.query('South 10+ hcp') == expected
+
+    # a corpus of the same size written later is not the one indexed
+    status = os.stat(corpus)
+    os.utime(corpus, ns=(status.st_atime_ns, status.st_mtime_ns + 1_000_000_000))
+    with pytest.raises(AssertionError, match='build it again'):
+        dealindex.Index(corpus)
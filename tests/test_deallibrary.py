@@ -0,0 +1,44 @@
+import benchmark
+import deallibrary
+import main
+import parsepbn
+import sqlite3
+
+
+def write_pbn(path, deals):
+    # a pbn file of the deals, which have no auction or play
+    with open(path, 'w') as f:
+        for deal in deals:
+            hands = dict([(seat['Direction'], seat['Hand']) for seat in deal['Seats']])
+            f.write(f'[Board "{deal["Board number"]}"]\n[Dealer "{deal["Dealer"][0]}"]\n[Deal "N:' +
+                    ' '.join('.'.join(hands[direction][suit] for suit in ['Spades', 'Hearts', 'Diamonds', 'Clubs'])
+                             for direction in ['North', 'East', 'South', 'West']) + '"]\n\n')
+
+
+def test_store_is_opt_in(tmp_path, monkeypatch):
+    # deals are stored in the library only with --store, and can then be read back from it
+    monkeypatch.chdir(tmp_path)
+    write_pbn(tmp_path / 'deals.pbn', benchmark.corpus(1, 3))
+    library = str(tmp_path / 'library.sqlite')
+    main.main(main.parse_args(['deals.pbn', '-s', '--no-cache', '--library', library]))
+    assert not (tmp_path / 'library.sqlite').exists()
+    main.main(main.parse_args(['deals.pbn', '-s', '--no-cache', '--library', library, '--store']))
+    with deallibrary.DealLibrary(library) as stored:
+        assert [deal['Board number'] for key, deal in stored.find()] == [1, 2, 3]
+    assert len(main.main(main.parse_args(['lib:board=2', '-s', '--no-cache', '--library', library, '-o', 'again']))) == 1
+
+
+def test_locked_library(tmp_path, capsys):
+    # a library another process holds locked is left alone, the deals still being read
+    path = str(tmp_path / 'library.sqlite')
+    deallibrary.DealLibrary(path).close()
+    other = sqlite3.connect(path)
+    other.execute('BEGIN IMMEDIATE')
+    deals = list(parsepbn.read_deals(['[Board "1"]\n', '[Deal "N:AKQJ.AKQ.AKQ.AKQ T98.JT9.JT9.JT98 765.8765.876.765 432.432.5432.432"]\n']))
+    with deallibrary.DealLibrary(path, skip_locked=True, timeout=0.1) as library:
+        assert list(library.store(deals, 'deals.pbn', batch_size=1)) == deals
+        assert library.locked
+    assert 'locked by another process' in capsys.readouterr().err
+    other.rollback()
+    with deallibrary.DealLibrary(path) as library:
+        assert list(library.find()) == []
@@ -0,0 +1,54 @@
+import dealmodel
+import layout
+import parselin
+import parsepbn
+import parseurl
+import pytest
+
+LIN = ('st||pn|PSMartin,~Mwest,~Mnorth,~Meast|md|2SAK5HKT43DK7CAK62,SJ962H9DQ984CT754,SQ73HAQJ52DAJ5CJ9,'
+       'ST84H876DT632CQ83|sv|n|rh||ah|Board 12|mb|P|mb|1N|mb|P|mb|2C|mb|P|mb|2H|mb|P|mb|4H|mb|P|mb|P|mb|P|'
+       'pc|S4|pc|SA|pc|S2|pc|S3|pc|HK|pc|H9|pc|H2|pc|H6|mc|13|')
+
+PBN = '''[Event "Club"]
+[Board "3"]
+[West "Ann"]
+[North "Bob"]
+[East "Cy"]
+[South "Di"]
+[Dealer "S"]
+[Vulnerable "EW"]
+[Deal "N:AK5.KT43.K7.AK62 J962.9.Q984.T754 Q73.AQJ52.AJ5.J9 T84.876.T632.Q83"]
+[Declarer "N"]
+[Contract "4H"]
+[Auction "S"]
+P 1NT Pass 2C
+Pass 2H Pass 4H
+Pass Pass Pass
+[Play "E"]
+S2 S3 S4 SA
+'''
+
+
+def parsed_deals():
+    yield parseurl.parse('https://www.bridgebase.com/tools/handviewer.html?lin=' + LIN)
+    yield from parselin.read_deals(parseurl.tokenize([LIN]))
+    yield from parsepbn.read_deals(PBN.splitlines(keepends=True))
+
+
+@pytest.mark.parametrize('deal', list(parsed_deals()))
+def test_round_trip(deal):
+    assert dealmodel.Deal.from_dict(deal).to_dict() == deal
+
+
+@pytest.mark.parametrize('deal', list(parsed_deals()))
+def test_rotate(deal):
+    deal = dict(deal, Declarer='North', Vulnerable='NS', **{ 'Double dummy': { 'Spades': { 'North': 9, 'East': 4 } } })
+    for n in range(4):
+        expected = layout.rotate_deal(dict(deal, Seats=[dict(seat) for seat in deal['Seats']]), n)
+        assert dealmodel.Deal.from_dict(deal).rotate(n).to_dict() == expected
+    assert dealmodel.Deal.from_dict(deal).rotate(1).rotate(3).to_dict() == deal
+
+
+def test_sort_hands():
+    deal = { 'Dealer': 'North', 'Seats': [{ 'Direction': 'North', 'Hand': { 'Spades': '5ka', 'Hearts': 'xqx', 'Diamonds': '', 'Clubs': 't2' } }] }
+    assert dealmodel.sort_hands(deal)['Seats'][0]['Hand'] == { 'Spades': 'AK5', 'Hearts': 'QXX', 'Diamonds': '', 'Clubs': 'T2' }
@@ -0,0 +1,23 @@
+import buildhtml
+import copy
+import main
+import multiview
+import pytest
+
+# North's hand is not known, only the player
+DEAL = {'Board number': 3, 'Dealer': 'North', 'Auction': ['1S', 'P', '4S', 'P', 'P', 'P'],
+        'Seats': [{'Player': 'Ann', 'Direction': 'North'},
+                  {'Player': 'Bob', 'Direction': 'East', 'Hand': {'Spades': 'T84', 'Hearts': '876', 'Diamonds': 'T632', 'Clubs': 'Q83'}},
+                  {'Player': 'Cy', 'Direction': 'South', 'Hand': {'Spades': 'AK5', 'Hearts': 'KT43', 'Diamonds': 'K7', 'Clubs': 'AK62'}},
+                  {'Player': 'Di', 'Direction': 'West', 'Hand': {'Spades': 'J962', 'Hearts': '9', 'Diamonds': 'Q984', 'Clubs': 'T754'}}],
+        'Play': ['HK', 'H9']}
+
+
+@pytest.mark.parametrize('options', [['-p', '1'], ['-p', '2', '-W', '--stats'], ['-g', '-p', '2', '-x', 'd']])
+def test_views_match_runs(tmp_path, options):
+    # each view is what a run of main.py with its options writes, for a seat without a hand as for the others
+    args = main.parse_args(['x'] + options)
+    views = multiview.parse_views('nsewa,n,s,nr2,sv,nsAr1,ewr3', args)
+    multiview.write(copy.deepcopy(DEAL), views, str(tmp_path / 'mv'), args)
+    for name, view in views:
+        assert (tmp_path / f'mv-{name}.html').read_text() == buildhtml.build(copy.deepcopy(DEAL), view)
@@ -0,0 +1,24 @@
+import parsepbn
+import pytest
+
+
+@pytest.mark.parametrize('lines, expected', [
+    (['[Event "Club"] ; a comment\n'], ['[Event "Club"] ']),
+    (['[Event "Club"] {a comment} [Site "Home"]\n'], ['[Event "Club"]  [Site "Home"]']),
+    (['{a comment\n', 'over two lines} [Board "1"]\n'], [' [Board "1"]']),
+    # ; and { inside a quoted tag value are part of the value
+    (['[Event "Spring; Day 2"]\n'], ['[Event "Spring; Day 2"]']),
+    (['[Event "Swiss {A}"] {comment}\n'], ['[Event "Swiss {A}"] ']),
+    (['[Annotator "Ann \\"; Bob"] ; comment\n'], ['[Annotator "Ann \\"; Bob"] ']),
+    (['%Creator: export\n', '\n'], ['']),
+])
+def test_strip_comments(lines, expected):
+    assert list(parsepbn.strip_comments(lines)) == expected
+
+
+def test_quoted_values():
+    lines = ['[Event "Spring Sectional; Day {2}"]\n', '[Board "7"]\n', '[Dealer "S"]\n',
+             '[Deal "N:AKQJ.AKQ.AKQ.AKQ T98.JT9.JT9.JT98 765.8765.876.765 432.432.5432.432"]\n']
+    deal, = parsepbn.read_deals(lines)
+    assert deal['Event'] == 'Spring Sectional; Day {2}'
+    assert deal['Board number'] == 7 and deal['Dealer'] == 'South'
@@ -0,0 +1,56 @@
+import buildhtml
+import copy
+import layout
+import main
+import pytest
+import re
+
+DEAL = {'Board number': 12, 'Dealer': 'West', 'Auction': ['P', '1N', 'P', '2C', 'P', '2H', 'P', '3S', 'P', '4D', 'P', '4N', 'P', '5S', 'P', '7H', 'P', 'P', 'P'],
+        'Seats': [{'Player': 'Phillip', 'Direction': 'South', 'Hand': {'Spades': 'AK5', 'Hearts': 'KT43', 'Diamonds': 'K7', 'Clubs': 'AK62'}},
+                  {'Player': 'Robot', 'Direction': 'West', 'Hand': {'Spades': 'J962', 'Hearts': '9', 'Diamonds': 'Q984', 'Clubs': 'T754'}},
+                  {'Player': 'Robot', 'Direction': 'North', 'Hand': {'Spades': 'Q73', 'Hearts': 'AQJ52', 'Diamonds': 'AJ5', 'Clubs': 'J9'}},
+                  {'Player': 'Robot', 'Direction': 'East', 'Hand': {'Spades': 'T84', 'Hearts': '876', 'Diamonds': 'T632', 'Clubs': 'Q83'}}],
+        'Play': ['S4', 'SA', 'S2', 'S3', 'HK', 'H9', 'H2', 'H6', 'HA', 'C4', 'H7', 'HJ']}
+
+
+def shown(html: str, n: int) -> str:
+    # the suits of a replay as the style and script of its page show them once n cards are played
+    def card(match) -> str:
+        position, held, played, rank = match.groups()
+        state = held if int(position) > n else played
+        if state == layout.REMOVE:
+            return ''
+        return buildhtml.PLAYED_CARDS[state].format(rank) if state in buildhtml.PLAYED_CARDS else rank
+    html = re.sub(r'<span class="replay-card" data-card="(\d+)" data-held="(\w+)" data-played="(\w+)">([^<]*)</span>', card, html)
+    html = re.sub(r'<span class="replay-void" data-card="(\d+)">--</span>', lambda match: '--' if int(match.group(1)) <= n else '', html)
+    return spaced(html)
+
+def spaced(html: str) -> str:
+    # html with the spaces a browser would not show taken out
+    return re.sub(r' +(<br|&nbsp;|$)', r'\1', re.sub(' +', ' ', html), flags=re.M)
+
+
+@pytest.mark.parametrize('options', ['-nsewa', '-nsewa -W', '-nsewa -g', '-nsewa -W -r1', '-nsewa -x hc', '-s', '-n -W', '-sv -W'])
+def test_replay_matches_frames(options):
+    # after each card the replay shows every hand as the frame of that many cards (-p n) does
+    args = main.parse_args(['x', '--replay'] + options.split())
+    page = layout.replay(copy.deepcopy(DEAL), args)
+    boxes = [page.single] if page.single else list(page.hands.values())
+    for n in range(len(DEAL['Play']) + 1):
+        frame_args = copy.copy(args)
+        frame_args.played = n
+        frame = layout.build(copy.deepcopy(DEAL), frame_args)
+        frames = dict([(box.direction, box) for box in ([frame.single] if frame.single else frame.hands.values())])
+        for box in boxes:
+            assert layout.replay_state(box.suits, n) == frames[box.direction].suits
+            assert shown(buildhtml.format_replay_suits(box.suits), n) == spaced(buildhtml.format_suits(frames[box.direction].suits))
+
+
+def test_replay_white():
+    # with -W a card played leaves its place and is whited out at the end of its suit, as in the frames
+    args = main.parse_args(['x', '-s', '--replay', '-W'])
+    html = buildhtml.format_replay_suits(layout.replay(copy.deepcopy(DEAL), args).single.suits)
+    frame_args = main.parse_args(['x', '-s', '-W', '-p', '5'])
+    frame = buildhtml.format_suits(layout.build(copy.deepcopy(DEAL), frame_args).single.suits)
+    assert shown(html, 5) == spaced(frame)
+    assert '5 <span style="color: #fff;">A</span>' in frame
@@ -0,0 +1,22 @@
+import pytest
+import sampler
+
+
+@pytest.mark.parametrize('dealer, auction, expected', [
+    ('North', ['1N', 'P', '3N', 'P', 'P', 'P'], 'North 15-17 balanced'),
+    ('West', ['P', '1S', 'P', '2S', 'P', '4S', 'P', 'P', 'P'],
+        'West 11- hcp, North 11-21 hcp 5+ spades'),
+    ('East', ['1D', '1H', 'P', '2H', 'P', 'P', 'P'],
+        'East 11-21 hcp, South 8-17 hcp 5+ hearts, West 7- hcp'),
+    ('South', ['2H', 'P', 'P', 'P'], 'South 5-11 hcp 6+ hearts, North 7- hcp'),
+    ('South', ['2C', 'P', '2D', 'P', '2N', 'P', '3N', 'P', 'P', 'P'], 'South 20+ hcp'),
+    ('North', ['P', 'P', '3D', '3S', '5D', 'P', 'P', 'P'], 'North 11- hcp, East 11- hcp, South 5-11 hcp 7+ diamonds'),
+    ('East', ['4S', 'P', 'P', 'P'], 'East 5-11 hcp 7+ spades, West 7- hcp'),
+    # openings at the five level and above are left unconstrained
+    ('North', ['5C', 'P', 'P', 'P'], 'South 7- hcp'),
+    ('West', ['7S', 'P', 'P', 'P'], 'East 7- hcp'),
+    ('North', ['P', 'P', 'P', 'P'], 'North 11- hcp, East 11- hcp, South 11- hcp, West 11- hcp'),
+    ('Nowhere', ['1S', 'P', 'P', 'P'], ''),
+])
+def test_auction_constraints(dealer, auction, expected):
+    assert sampler.auction_constraints({ 'Dealer': dealer, 'Auction': auction }) == expected
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Notice changes to deal files, for main.py --watch.
+
+    with watcher.Watcher(['article.pbn', 'hands/']) as w:
+        for paths in w.changes(debounce=0.3):
+            ...     # paths is the set of files written, moved or deleted since the last change
+
+A path given may be a file or a directory; in a directory, every pbn, lin, json or dfc file is watched,
+including those created later.  On Linux the parent directories are watched through inotify, so that
+editors that save by writing a new file and renaming it over the old one are noticed too; elsewhere,
+or with poll=True (e.g. on network drives, where inotify hears nothing), the modification time and size
+of each file are checked every POLL_INTERVAL seconds.
+
+Editors often write a file several times in one save; changes arriving less than debounce seconds
+apart are reported together.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from typing import Dict, Iterable, Iterator, Set, Tuple
+
+EXTENSIONS = ('.pbn', '.lin', '.json', '.dfc')
+POLL_INTERVAL = 0.5
+
+# inotify events: a file written and closed, moved in or out of a directory, or deleted
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+EVENT = struct.Struct('iIII')
+
+
+def deal_files(paths: Iterable[str]) -> list:
+    # the files given and the deal files in the directories given, as absolute paths in order
+    files = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if is_deal_file(name))
+        else:
+            files.append(path)
+    return files
+
+def is_deal_file(name: str) -> bool:
+    return name.lower().endswith(EXTENSIONS) and not name.startswith('.')
+
+
+class Watcher:
+    def __init__(self, paths: Iterable[str], poll: bool = False):
+        paths = [os.path.abspath(path) for path in paths]
+        self.directories = set(path for path in paths if os.path.isdir(path))
+        self.files = set(path for path in paths if path not in self.directories)
+        self.inotify = None if poll else Inotify.open(self.directories | set(os.path.dirname(path) for path in self.files))
+        self.snapshot = {} if self.inotify else self.stat()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
+
+    def watches(self, path: str) -> bool:
+        return path in self.files or (os.path.dirname(path) in self.directories and is_deal_file(os.path.basename(path)))
+
+    def stat(self) -> Dict[str, Tuple[int, int]]:
+        # (modification time, size) of each file watched that exists
+        snapshot = {}
+        for path in deal_files(self.directories) + list(self.files):
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (info.st_mtime_ns, info.st_size)
+        return snapshot
+
+    def wait(self, timeout: float = None) -> Set[str]:
+        # the files changed, waiting for a change for up to timeout seconds (for ever if None);
+        #   an empty set if nothing changed in that time
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self.inotify:
+                changed = set(path for path in self.inotify.read(left) if self.watches(path))
+            else:
+                time.sleep(POLL_INTERVAL if left is None else min(POLL_INTERVAL, left))
+                snapshot = self.stat()
+                changed = set(path for path in self.snapshot.keys() | snapshot.keys() if self.snapshot.get(path) != snapshot.get(path))
+                self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def changes(self, debounce: float = 0.3) -> Iterator[Set[str]]:
+        # yields the files changed in each burst of changes, once debounce seconds pass without another
+        while True:
+            changed = self.wait()
+            while True:
+                more = self.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+            yield changed
+
+
+class Inotify:
+    # the events of the Linux inotify interface, through libc
+    def __init__(self, libc, fd: int, directories: Set[str]):
+        self.fd = fd
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), IN_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(error, os.strerror(error), directory)
+            self.directories[wd] = directory
+
+    @classmethod
+    def open(cls, directories: Set[str]) -> 'Inotify':
+        # an Inotify watching the directories, or None if inotify is not available
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            return cls(libc, fd, directories)
+        except (AttributeError, OSError):
+            return None
+
+    def close(self):
+        os.close(self.fd)
+
+    def read(self, timeout: float = None) -> Set[str]:
+        # the paths of the events that arrive within timeout seconds
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b'\0')
+            offset += EVENT.size + length
+            if wd in self.directories and name:
+                paths.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return paths
+
+
+# for testing
+if __name__ == '__main__':
+    with Watcher(sys.argv[1:] or ['.']) as w:
+        print('inotify' if w.inotify else 'polling')
+        for paths in w.changes():
+            print(sorted(paths))